@@ -1,32 +1,126 @@
-from fastapi import APIRouter, Query
-from fastapi.responses import Response
-import httpx
-from lib.config import get_openai_api_key
+import os
+import re
+from typing import Optional, Tuple
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from lib.config import get_openai_api_key, get_cache_dir
+from lib.http_client import get_http_client
+from lib.disk_cache import DiskCache
 
 router = APIRouter()
 
+# Container files are immutable per file id, so downloads are cached on disk up to this size
+CONTAINER_FILE_CACHE_MAX_BYTES = 500 * 1024 * 1024
+
+# Chunk size when streaming a cached file back to the client
+CHUNK_SIZE = 64 * 1024
+
+# Upstream headers passed through to the client
+PASSTHROUGH_HEADERS = ("content-type", "content-length", "content-range", "accept-ranges", "etag", "last-modified")
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+_cache: Optional[DiskCache] = None
+
+
+def _get_cache() -> DiskCache:
+    global _cache
+    if _cache is None:
+        _cache = DiskCache(os.path.join(get_cache_dir(), "container_files"), CONTAINER_FILE_CACHE_MAX_BYTES)
+    return _cache
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single "bytes=" range; None if unsatisfiable or unsupported"""
+    match = _RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if start == "":
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end:
+        return None
+    return start, end
+
+
+def _serve_cached(path, meta: dict, request: Request, headers: dict) -> Response:
+    """Serve a cached download, honouring If-None-Match and single byte ranges"""
+    etag = meta["etag"]
+    headers["ETag"] = etag
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    size = path.stat().st_size
+    headers["Accept-Ranges"] = "bytes"
+    start, end, status_code = 0, size - 1, 200
+    range_header = request.headers.get("range")
+    # Multiple ranges are answered with the full file, which clients must accept
+    if range_header and "," not in range_header:
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    def read_file():
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    return StreamingResponse(
+        read_file(),
+        status_code=status_code,
+        media_type=meta.get("content_type", "application/octet-stream"),
+        headers=headers,
+    )
+
 
 @router.get("/content")
 async def get_container_file_content(
+    request: Request,
     file_id: str = Query(..., alias="file_id"),
     container_id: str = Query(None, alias="container_id"),
     filename: str = Query(None),
 ):
-    """Get container file content"""
+    """Stream container file content, serving repeated downloads from the disk cache"""
     if not file_id:
         from fastapi.responses import JSONResponse
         return JSONResponse(
             content={"error": "Missing file_id"},
             status_code=400
         )
-    
+
     try:
+        headers = {"Content-Disposition": f"attachment; filename={filename or file_id}"}
+        cache = _get_cache()
+        cache_key = f"{container_id or ''}/{file_id}"
+        meta_key = f"{cache_key}:meta"
+
+        meta = await cache.aget_json(meta_key)
+        path = await cache.aget_path(cache_key) if meta else None
+        if path is not None:
+            return _serve_cached(path, meta, request, headers)
+
         url = (
             f"https://api.openai.com/v1/containers/{container_id}/files/{file_id}/content"
             if container_id
             else f"https://api.openai.com/v1/container-files/{file_id}/content"
         )
-        
+
         api_key = get_openai_api_key()
         if not api_key:
             from fastapi.responses import JSONResponse
@@ -34,24 +128,58 @@ async def get_container_file_content(
                 content={"error": "OPENAI_API_KEY not found"},
                 status_code=500
             )
-        
-        async with httpx.AsyncClient() as client:
-            res = await client.get(
-                url,
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                },
-            )
+
+        # Forward conditional and partial requests so resumed downloads only fetch what's missing
+        # identity: the bytes relayed (and cached) are exactly the file's bytes
+        upstream_headers = {"Authorization": f"Bearer {api_key}", "Accept-Encoding": "identity"}
+        for name in ("range", "if-none-match", "if-range"):
+            if request.headers.get(name):
+                upstream_headers[name] = request.headers[name]
+
+        client = get_http_client()
+        res = await client.send(client.build_request("GET", url, headers=upstream_headers), stream=True)
+        if res.status_code >= 400 and res.status_code != 416:
+            await res.aread()
+            await res.aclose()
             res.raise_for_status()
-            
-            content_type = res.headers.get("Content-Type", "application/octet-stream")
-            content_disposition = f"attachment; filename={filename or file_id}"
-            
-            return Response(
-                content=res.content,
-                media_type=content_type,
-                headers={"Content-Disposition": content_disposition},
-            )
+
+        for name in PASSTHROUGH_HEADERS:
+            if name in res.headers:
+                headers[name] = res.headers[name]
+        content_type = res.headers.get("Content-Type", "application/octet-stream")
+        # File ids are immutable, so the id is a valid ETag when upstream sends none
+        etag = res.headers.get("etag") or f'"{file_id}"'
+        if res.status_code in (200, 206):
+            headers["etag"] = etag
+
+        # Only complete downloads are cached; partial and 304 responses pass straight through
+        cacheable = res.status_code == 200
+        expected_size = int(res.headers["content-length"]) if "content-length" in res.headers else None
+
+        async def stream_body():
+            try:
+                if not cacheable:
+                    async for chunk in res.aiter_raw():
+                        yield chunk
+                    return
+                async with cache.open_for_write_async(cache_key) as f:
+                    written = 0
+                    async for chunk in res.aiter_raw():
+                        await f.write(chunk)
+                        written += len(chunk)
+                        yield chunk
+                    if expected_size is not None and written != expected_size:
+                        raise IOError(f"Download ended after {written} of {expected_size} bytes")
+                await cache.aset_json(meta_key, {"content_type": content_type, "etag": etag})
+            finally:
+                await res.aclose()
+
+        return StreamingResponse(
+            stream_body(),
+            status_code=res.status_code,
+            media_type=content_type,
+            headers=headers,
+        )
     except Exception as e:
         print(f"Error fetching container file: {e}")
         from fastapi.responses import JSONResponse
@@ -59,4 +187,3 @@ async def get_container_file_content(
             content={"error": "Failed to fetch file"},
             status_code=500
         )
-
@@ -1,41 +1,61 @@
-from fastapi import APIRouter, Query
+import json
 import httpx
-from typing import Optional
+from fastapi import APIRouter, Query
+from fastapi.responses import Response, StreamingResponse
+from typing import List, Optional
+from lib.http_client import get_http_client
+from lib.browser_pool import get_browser_pool
+from lib.scraping import normalize_render_profile, apply_render_profile, wait_until_ready
+from lib.batch_scrape import BATCH_DEADLINE_SECONDS, normalize_urls, scrape_many
+from lib.tool_cache import cached_tool
+from lib.geocoding import geocode
+from lib.content_extraction import EXTRACTOR_VERSION, extract_html, extract_from_response
+from lib.scrape_cache import (
+    scrape_cache_key,
+    get_cached_scrape,
+    is_fresh,
+    conditional_headers,
+    store_scrape,
+    mark_revalidated,
+    record_hit,
+    record_miss,
+)
 
 router = APIRouter()
 
+PLAYWRIGHT_MISSING_NOTE = (
+    "Playwright not installed. Install with: pip install playwright && playwright install. "
+    "Main content extracted without JavaScript rendering."
+)
+
 
 @router.get("/get_weather")
+@cached_tool("get_weather")
 async def get_weather(
     location: str = Query(...),
     unit: str = Query("celsius"),
 ):
     """Get weather for a location"""
     try:
-        # 1. Get coordinates for the city
-        async with httpx.AsyncClient() as client:
-            geo_res = await client.get(
-                f"https://nominatim.openstreetmap.org/search?q={location}&format=json"
-            )
-            geo_data = geo_res.json()
+        # 1. Get coordinates for the city (local index first, Nominatim only for new names)
+        coordinates = await geocode(location)
         
-        if not geo_data:
+        if coordinates is None:
             from fastapi.responses import JSONResponse
             return JSONResponse(
                 content={"error": "Invalid location"},
                 status_code=404
             )
         
-        lat = geo_data[0]["lat"]
-        lon = geo_data[0]["lon"]
+        lat, lon = coordinates
         
         # 2. Fetch weather data from Open-Meteo
-        async with httpx.AsyncClient() as client:
-            weather_res = await client.get(
-                f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&hourly=temperature_2m&temperature_unit={unit}"
-            )
-            weather_res.raise_for_status()
-            weather = weather_res.json()
+        client = get_http_client()
+        weather_res = await client.get(
+            f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&hourly=temperature_2m&temperature_unit={unit}"
+        )
+        weather_res.raise_for_status()
+        weather = weather_res.json()
         
         # 3. Get current UTC time in ISO format
         from datetime import datetime
@@ -69,10 +89,10 @@ async def get_weather(
 async def get_joke():
     """Get a programming joke"""
     try:
-        async with httpx.AsyncClient() as client:
-            joke_res = await client.get("https://v2.jokeapi.dev/joke/Programming")
-            joke_res.raise_for_status()
-            joke_data = joke_res.json()
+        client = get_http_client()
+        joke_res = await client.get("https://v2.jokeapi.dev/joke/Programming")
+        joke_res.raise_for_status()
+        joke_data = joke_res.json()
         
         # Format joke response based on its type
         joke = (
@@ -96,74 +116,95 @@ async def scrape_website(
     url: str = Query(..., description="URL to scrape"),
     wait_for_js: Optional[bool] = Query(None, description="Wait for JavaScript to execute"),
     wait_timeout: Optional[int] = Query(None, description="Timeout in seconds for page load"),
+    render_profile: Optional[str] = Query(None, description="Resources to load: text, no_media or full"),
+    wait_for_selector: Optional[str] = Query(None, description="CSS selector that marks the content as rendered"),
 ):
     """
     Scrape a website with optional JavaScript rendering using Playwright.
     This function can render JavaScript-heavy websites that the basic web_search tool cannot.
     """
     try:
-        # Try to import playwright
-        try:
-            from playwright.async_api import async_playwright
-            PLAYWRIGHT_AVAILABLE = True
-        except ImportError:
-            PLAYWRIGHT_AVAILABLE = False
+        pool = await get_browser_pool()
+        profile = normalize_render_profile(render_profile)
+        cache_key = scrape_cache_key(
+            url,
+            rendered=pool is not None,
+            wait_for_js=bool(wait_for_js),
+            render_profile=profile,
+            wait_for_selector=wait_for_selector or None,
+            extractor=EXTRACTOR_VERSION,
+        )
+        
+        # Serve repeated scrapes from the cache without touching the network or a browser
+        cached = await get_cached_scrape(cache_key)
+        if cached and is_fresh(cached):
+            record_hit()
+            return {**cached["result"], "cached": True}
         
-        if not PLAYWRIGHT_AVAILABLE:
+        # Stale entry with validators: a conditional request decides if it can be reused
+        validators = conditional_headers(cached)
+        if validators:
+            try:
+                client = get_http_client()
+                async with client.stream("GET", url, headers=validators, follow_redirects=True, timeout=10.0) as response:
+                    if response.status_code == 304:
+                        await mark_revalidated(cache_key, cached)
+                        return {**cached["result"], "cached": True}
+                    # The page changed. Without a browser its new body is the result; with
+                    # one the page is rendered below, like any miss on a rendered cache key
+                    if response.is_success and pool is None:
+                        record_miss()
+                        result = await fetched_result(url, response)
+                        await store_scrape(cache_key, result, response.headers)
+                        return result
+            except httpx.HTTPError as e:
+                # Revalidation is best effort, the page is fetched normally below
+                print(f"Revalidating {url} failed: {e}")
+        record_miss()
+        
+        if pool is None:
             # Fallback to basic HTTP request if Playwright not available
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url, follow_redirects=True)
+            client = get_http_client()
+            async with client.stream("GET", url, follow_redirects=True, timeout=30.0) as response:
                 response.raise_for_status()
-                return {
-                    "url": url,
-                    "content": response.text[:20000],  # Limit content size to fit token limits
-                    "note": "Playwright not installed. Install with: pip install playwright && playwright install. Content truncated to fit token limits.",
-                    "rendered": False,
-                }
+                result = await fetched_result(url, response)
+            await store_scrape(cache_key, result, response.headers)
+            return result
         
-        # Use Playwright for JavaScript rendering
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context(
-                viewport={"width": 1920, "height": 1080},
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            )
-            page = await context.new_page()
+        # Use a warm browser from the pool for JavaScript rendering
+        async with pool.page(
+            viewport={"width": 1920, "height": 1080},
+            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+        ) as page:
+            # Use defaults if not provided
+            should_wait_for_js = wait_for_js if wait_for_js is not None else False
+            timeout_seconds = wait_timeout if wait_timeout is not None else 30
             
-            try:
-                # Use defaults if not provided
-                should_wait_for_js = wait_for_js if wait_for_js is not None else False
-                timeout_seconds = wait_timeout if wait_timeout is not None else 30
-                
-                # Navigate to the page
-                await page.goto(url, wait_until="networkidle" if should_wait_for_js else "domcontentloaded", timeout=timeout_seconds * 1000)
-                
-                # Wait for JavaScript if requested
-                if should_wait_for_js:
-                    # Wait a bit for dynamic content to load
-                    await page.wait_for_timeout(2000)
-                
-                # Get the rendered content
-                content = await page.content()
-
-                # Also get visible text (cleaner for reading)
-                visible_text = await page.evaluate("() => document.body.innerText")
-
-                await browser.close()
-
-                # Prioritize text over HTML for better token efficiency
-                # Only include minimal HTML snippet
-                return {
-                    "url": url,
-                    "content": content[:5000],  # Just a small snippet of HTML for reference
-                    "text": visible_text[:20000],  # Main content - readable text only
-                    "rendered": True,
-                    "status": "success",
-                    "note": "Full content truncated to fit within token limits. Use 'text' field for clean content.",
-                }
-            except Exception as e:
-                await browser.close()
-                raise e
+            # Skip images, fonts, media and trackers the profile doesn't need
+            await apply_render_profile(page, profile)
+            
+            # Navigate to the page
+            navigation = await page.goto(url, wait_until="domcontentloaded", timeout=timeout_seconds * 1000)
+            
+            # Wait for JavaScript if requested: until the selector shows up or the DOM settles
+            if should_wait_for_js or wait_for_selector:
+                await wait_until_ready(page, wait_for_selector, timeout_seconds * 1000)
+            
+            # Get the rendered content
+            content = await page.content()
+            final_url = page.url
+
+        # Return readable main content and links rather than raw HTML
+        result = {
+            "url": url,
+            **extract_html(content, final_url),
+            "rendered": True,
+            "render_profile": profile,
+            "status": "success",
+        }
+        if navigation is not None and navigation.ok:
+            await store_scrape(cache_key, result, navigation.headers)
+        return result
                 
     except Exception as e:
         print(f"Error scraping website {url}: {e}")
@@ -179,3 +220,57 @@ async def scrape_website(
             status_code=500
         )
 
+
+async def fetched_result(url: str, response: httpx.Response) -> dict:
+    """Scrape result from a plain HTTP response, used when Playwright isn't available"""
+    # Parse while downloading and stop at the byte budget instead of buffering the page
+    extracted = await extract_from_response(response, str(response.url))
+    return {"url": url, **extracted, "note": PLAYWRIGHT_MISSING_NOTE, "rendered": False}
+
+
+async def scrape_websites_stream(
+    urls: List[str],
+    wait_for_js: Optional[bool] = None,
+    wait_timeout: Optional[int] = None,
+    render_profile: Optional[str] = None,
+    deadline_seconds: Optional[float] = None,
+):
+    """Scrape several URLs concurrently, yielding each page's result as it finishes"""
+    async def scrape(url: str):
+        result = await scrape_website(
+            url=url,
+            wait_for_js=wait_for_js,
+            wait_timeout=wait_timeout,
+            render_profile=render_profile,
+            wait_for_selector=None,
+        )
+        # Errors come back as JSONResponse from the single-page endpoint
+        if isinstance(result, Response):
+            return json.loads(result.body)
+        return result
+
+    async for result in scrape_many(
+        normalize_urls(urls),
+        scrape,
+        deadline_seconds=min(deadline_seconds or BATCH_DEADLINE_SECONDS, BATCH_DEADLINE_SECONDS),
+    ):
+        yield result
+
+
+@router.get("/scrape_websites")
+async def scrape_websites(
+    urls: List[str] = Query(..., description="URLs to scrape (repeat the parameter, at most 20)"),
+    wait_for_js: Optional[bool] = Query(None, description="Wait for JavaScript to execute"),
+    wait_timeout: Optional[int] = Query(None, description="Timeout in seconds for each page load"),
+    render_profile: Optional[str] = Query(None, description="Resources to load: text, no_media or full"),
+    deadline: Optional[float] = Query(None, description="Seconds the whole batch may take"),
+):
+    """
+    Scrape several websites concurrently. Results stream back as newline-delimited
+    JSON, one line per page in the order pages finish; "index" is the URL's position.
+    """
+    async def ndjson():
+        async for result in scrape_websites_stream(urls, wait_for_js, wait_timeout, render_profile, deadline):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Request, Query
 from fastapi.responses import RedirectResponse
-import httpx
 import time
 from lib.session import get_session_id, save_token_set, OAuthTokens
-from lib.connectors_auth import get_google_client_config, get_redirect_uri
+from lib.connectors_auth import get_google_client_config, get_redirect_uri, invalidate_cached_tokens
 from lib.config import get_node_env
+from lib.http_client import get_http_client
 
 router = APIRouter()
 
@@ -42,20 +42,19 @@ async def get_google_callback(
     try:
         redirect_uri = get_redirect_uri()
         
-        async with httpx.AsyncClient() as client:
-            token_response = await client.post(
-                config["token_endpoint"],
-                data={
-                    "client_id": config["client_id"],
-                    "client_secret": config["client_secret"],
-                    "code": code,
-                    "redirect_uri": redirect_uri,
-                    "grant_type": "authorization_code",
-                    "code_verifier": verifier,
-                },
-            )
-            token_response.raise_for_status()
-            token_data = token_response.json()
+        token_response = await get_http_client().post(
+            config["token_endpoint"],
+            data={
+                "client_id": config["client_id"],
+                "client_secret": config["client_secret"],
+                "code": code,
+                "redirect_uri": redirect_uri,
+                "grant_type": "authorization_code",
+                "code_verifier": verifier,
+            },
+        )
+        token_response.raise_for_status()
+        token_data = token_response.json()
         
         now = int(time.time() * 1000)  # milliseconds
         tokens = OAuthTokens(
@@ -71,8 +70,9 @@ async def get_google_callback(
             ),
         )
         
-        # Save tokens in memory
-        save_token_set(session_id, tokens)
+        # Save tokens in the session store
+        await save_token_set(session_id, tokens)
+        invalidate_cached_tokens(session_id)
         
         # Also persist tokens in httpOnly cookies
         cookie_options = {
@@ -9,7 +9,7 @@ router = APIRouter()
 async def get_google_status(request: Request):
     """Get Google OAuth connection status"""
     session_id = get_session_id(request)
-    token_set = get_token_set(session_id)
+    token_set = await get_token_set(session_id)
     access_token = request.cookies.get("gc_access_token")
     
     client_id = get_google_client_id()
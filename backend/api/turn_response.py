@@ -1,22 +1,144 @@
 from fastapi import APIRouter, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import asyncio
 import json
-from openai import OpenAI
 from lib.tools import get_tools
-from lib.config import get_openai_api_key
+from lib.tools.tools_handling import handle_tool, functions_map
+from lib.speculative_tools import SpeculativeCalls
+from lib.openai_client import get_async_openai_client
+from lib.conversation_state import save_last_response_id, clear_conversation
 from config.constants import get_developer_prompt, MODEL
 
 router = APIRouter()
 
+# Upper bound on model round trips per turn when function tools run on the server
+MAX_TOOL_STEPS = 8
+
+# Maximum number of function calls from one response executed at the same time
+TOOL_CONCURRENCY = 4
+
+# While tools run nothing else is sent, so an SSE comment keeps the client's read timeout from firing
+KEEPALIVE_SECONDS = 10
+
 
 class TurnRequest(BaseModel):
     messages: List[Dict[str, Any]]
     toolsState: Dict[str, Any]
+    # Conversation-state mode: messages only holds the items added since the
+    # previous response, which the backend chains onto with previous_response_id
+    conversationId: Optional[str] = None
+    previousResponseId: Optional[str] = None
+
+
+def sse_event(event_type: str, data: Dict[str, Any]) -> str:
+    """Format an event the way the clients expect it on the SSE stream"""
+    payload = json.dumps({
+        "event": event_type,
+        "data": data,
+    })
+    return f"data: {payload}\n\n"
+
+
+def to_input_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Strip output-only fields so an output item can be sent back as input"""
+    return {
+        key: value
+        for key, value in item.items()
+        if value is not None and key != "created_by"
+    }
+
+
+async def run_function_call(item: Dict[str, Any], started: Optional[asyncio.Task] = None) -> Dict[str, Any]:
+    """Execute a function_call item (or await its speculative run) and build its function_call_output item"""
+    name = item.get("name")
+    try:
+        if started is not None:
+            result = await started
+        else:
+            arguments = json.loads(item.get("arguments") or "{}")
+            result = await handle_tool(name, arguments)
+    except Exception as e:
+        print(f"Error executing function {name}: {e}")
+        result = {"error": str(e)}
+    return {
+        "type": "function_call_output",
+        "call_id": str(item.get("call_id")),
+        "output": json.dumps(result),
+    }
+
+
+def limited(semaphore: asyncio.Semaphore, run):
+    """Wrap a coroutine function so every call holds a slot of the semaphore"""
+    async def run_limited(*args):
+        async with semaphore:
+            return await run(*args)
+    return run_limited
+
+
+async def run_function_calls(
+    items: List[Dict[str, Any]],
+    started: Optional[Dict[str, asyncio.Task]] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+):
+    """Execute function calls concurrently, yielding (item, output_item) as each finishes.
+
+    Calls already started speculatively (by item id in started) are awaited instead of run
+    again; they hold a slot of the same semaphore while they run.
+    """
+    semaphore = semaphore or asyncio.Semaphore(TOOL_CONCURRENCY)
+    started = started or {}
+
+    async def run(item: Dict[str, Any]):
+        task = started.get(item.get("id"))
+        if task is not None:
+            return item, await run_function_call(item, task)
+        async with semaphore:
+            return item, await run_function_call(item)
+
+    tasks = [asyncio.create_task(run(item)) for item in items]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Don't leave tools running if the client went away
+        for task in list(tasks) + list(started.values()):
+            task.cancel()
 
 
-async def generate_stream(messages: List[Dict[str, Any]], tools_state: Dict[str, Any], request: Any):
+async def with_keepalive(iterator, interval: float = KEEPALIVE_SECONDS):
+    """Yield the iterator's items, and None whenever interval seconds pass without one"""
+    pending = asyncio.ensure_future(iterator.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait({pending}, timeout=interval)
+            if not done:
+                yield None
+                continue
+            try:
+                item = pending.result()
+            except StopAsyncIteration:
+                return
+            yield item
+            pending = asyncio.ensure_future(iterator.__anext__())
+    finally:
+        if not pending.done():
+            pending.cancel()
+            try:
+                await pending
+            except (asyncio.CancelledError, StopAsyncIteration):
+                pass
+        await iterator.aclose()
+
+
+async def generate_stream(
+    messages: List[Dict[str, Any]],
+    tools_state: Dict[str, Any],
+    request: Any,
+    conversation_id: Optional[str] = None,
+    previous_response_id: Optional[str] = None,
+):
     """Generate streaming response from OpenAI"""
     tools = await get_tools(tools_state, request)
 
@@ -50,59 +172,140 @@ async def generate_stream(messages: List[Dict[str, Any]], tools_state: Dict[str,
             content_preview = content[:100] + '...' if len(content) > 100 else content
             print(f"  Message {i}: type={msg_type}, content_len={len(content)}, preview={content_preview}")
     
-    api_key = get_openai_api_key()
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in secrets or environment variables")
-    openai_client = OpenAI(api_key=api_key)
-    
-    # Debug: Check if responses attribute exists
-    import openai
-    print(f"OpenAI SDK version: {openai.__version__}")
-    print(f"Client has 'responses' attribute: {hasattr(openai_client, 'responses')}")
-    if hasattr(openai_client, 'responses'):
-        print(f"Responses type: {type(openai_client.responses)}")
-    else:
-        print(f"Available client attributes: {[a for a in dir(openai_client) if not a.startswith('_')][:10]}")
-    
+    # When enabled, function tools run here and their outputs go straight back
+    # to the model, so the whole tool chain happens inside one SSE stream
+    run_tools_on_server = bool(tools_state.get("serverToolExecution", False))
+    parallel_tool_calls = bool(tools_state.get("parallelToolCalls", False))
+    input_items = list(messages)
+
+    # The client only sends a previous response id when it is sending deltas, and
+    # those deltas (e.g. outputs for that response's calls) only fit that response,
+    # so its id is used as is, even if this backend recorded a different one.
+    if previous_response_id:
+        print(f"Chaining on previous response {previous_response_id} (conversation {conversation_id})")
+
+    events = None
+    speculative = None
     try:
-        # OpenAI Responses API - accessed directly (same as TypeScript SDK)
-        if not hasattr(openai_client, 'responses'):
-            raise AttributeError(
-                f"OpenAI client does not have 'responses' attribute. "
-                f"SDK version: {openai.__version__}. "
-                f"Please upgrade: pip install --upgrade openai"
+        openai_client = get_async_openai_client()
+        for step in range(MAX_TOOL_STEPS):
+            request_options: Dict[str, Any] = {}
+            if previous_response_id:
+                request_options["previous_response_id"] = previous_response_id
+            events = await openai_client.responses.create(
+                model=MODEL,
+                input=input_items,
+                instructions=get_developer_prompt(),
+                tools=tools,
+                stream=True,
+                parallel_tool_calls=parallel_tool_calls,
+                **request_options,
             )
-        events = openai_client.responses.create(
-            model=MODEL,
-            input=messages,
-            instructions=get_developer_prompt(),
-            tools=tools,
-            stream=True,
-            parallel_tool_calls=False,
-        )
-        
-        for event in events:
-            # Convert event to dict
-            event_dict = event.model_dump() if hasattr(event, 'model_dump') else dict(event)
-            event_type = event_dict.get("type", getattr(event, "type", "unknown"))
-
-            # Log shell-related events
-            if "shell" in event_type.lower():
-                print(f"  🐚 Shell event: {event_type}")
-                if event_type == "response.output_item.done":
-                    item = event_dict.get("item", {})
-                    print(f"     Item type: {item.get('type')}, has output: {bool(item.get('output'))}")
-
-            data = json.dumps({
-                "event": event_type,
-                "data": event_dict,
-            })
-            yield f"data: {data}\n\n"
+
+            output_items = []
+            function_calls = []
+            started_calls = {}
+            response_id = None
+            # Idempotent tools start as soon as their streamed arguments are complete,
+            # sharing the step's TOOL_CONCURRENCY limit with the calls run afterwards
+            tool_slots = asyncio.Semaphore(TOOL_CONCURRENCY)
+            speculative = SpeculativeCalls(limited(tool_slots, handle_tool)) if run_tools_on_server else None
+            async for event in events:
+                # Convert event to dict
+                event_dict = event.model_dump() if hasattr(event, 'model_dump') else dict(event)
+                event_type = event_dict.get("type", getattr(event, "type", "unknown"))
+
+                # Log shell-related events
+                if "shell" in event_type.lower():
+                    print(f"  🐚 Shell event: {event_type}")
+                    if event_type == "response.output_item.done":
+                        item = event_dict.get("item", {})
+                        print(f"     Item type: {item.get('type')}, has output: {bool(item.get('output'))}")
+
+                if event_type == "response.completed":
+                    response_id = (event_dict.get("response") or {}).get("id")
+
+                if speculative is not None:
+                    speculative.observe(event_type, event_dict)
+
+                if run_tools_on_server and event_type == "response.output_item.done":
+                    item = event_dict.get("item") or {}
+                    output_items.append(to_input_item(item))
+                    if item.get("type") == "function_call" and item.get("name") in functions_map:
+                        function_calls.append(item)
+                        task = speculative.take(item)
+                        if task is not None:
+                            started_calls[item.get("id")] = task
+
+                yield sse_event(event_type, event_dict)
+
+            await events.close()
+            events = None
+            if speculative is not None:
+                speculative.cancel_all()
+
+            if not function_calls:
+                # Nothing left to answer on this response, so the next turn can chain on it
+                if conversation_id and response_id:
+                    await save_last_response_id(conversation_id, response_id)
+                break
+
+            if step == MAX_TOOL_STEPS - 1:
+                # No request is left to hand results back to the model, so running
+                # the calls would be wasted work: end the turn and tell the client
+                print(f"Stopping after {MAX_TOOL_STEPS} tool steps")
+                for task in started_calls.values():
+                    task.cancel()
+                yield sse_event("turn.step_limit", {
+                    "max_steps": MAX_TOOL_STEPS,
+                    "call_ids": [item.get("call_id") for item in function_calls],
+                })
+                break
+
+            # Feed this step's output and the tool results back to the model.
+            # When chaining, the model already has its output - send only the results.
+            print(f"Step {step + 1}: executing {len(function_calls)} function call(s) on the server")
+            if conversation_id and response_id:
+                previous_response_id = response_id
+                input_items = []
+            else:
+                input_items.extend(output_items)
+            for item in function_calls:
+                yield sse_event("function_call_output.in_progress", {
+                    "item_id": item.get("id"),
+                    "call_id": item.get("call_id"),
+                    "name": item.get("name"),
+                })
+
+            outputs = {}
+            async for finished in with_keepalive(run_function_calls(function_calls, started_calls, tool_slots)):
+                if finished is None:
+                    yield ": ping\n\n"
+                    continue
+                item, output_item = finished
+                outputs[item.get("call_id")] = output_item
+                yield sse_event("function_call_output.done", {
+                    "item_id": item.get("id"),
+                    "item": output_item,
+                })
+            # All outputs go back together, in the order the model made the calls
+            input_items.extend(outputs[item.get("call_id")] for item in function_calls)
     except Exception as e:
-        error_data = json.dumps({
-            "error": str(e)
-        })
+        error = {"error": str(e)}
+        if previous_response_id and getattr(e, "status_code", None) == 400:
+            # The chain is unusable (expired, unknown or missing tool outputs):
+            # forget it so the next turn starts over with the full history
+            if conversation_id:
+                await clear_conversation(conversation_id)
+            error["conversation_reset"] = True
+        error_data = json.dumps(error)
         yield f"data: {error_data}\n\n"
+    finally:
+        # Release the upstream connection if the client disconnects mid-stream
+        if events is not None:
+            await events.close()
+        if speculative is not None:
+            speculative.cancel_all()
 
 
 @router.post("")
@@ -110,7 +313,13 @@ async def post_turn_response(request: TurnRequest, http_request: Request):
     """Handle turn response with streaming"""
     try:
         return StreamingResponse(
-            generate_stream(request.messages, request.toolsState, http_request),
+            generate_stream(
+                request.messages,
+                request.toolsState,
+                http_request,
+                conversation_id=request.conversationId,
+                previous_response_id=request.previousResponseId,
+            ),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
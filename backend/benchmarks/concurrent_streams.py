@@ -0,0 +1,112 @@
+"""
+Concurrent SSE stream throughput: blocking client vs shared AsyncOpenAI client.
+
+Simulates an upstream that emits EVENTS events with EVENT_DELAY seconds between
+them and runs N concurrent turns through one event loop (one uvicorn worker).
+The "before" path iterates a synchronous stream inside the async generator, as
+the backend used to; the "after" path is the real generate_stream.
+
+Run from the backend directory:
+    python -m benchmarks.concurrent_streams --streams 200
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import time
+
+from api import turn_response
+
+EVENTS = 20
+EVENT_DELAY = 0.01
+
+
+class _FakeEvent:
+    def __init__(self, index: int):
+        self.type = "response.output_text.delta"
+        self._index = index
+
+    def model_dump(self):
+        return {"type": self.type, "delta": f"token{self._index} ", "item_id": "msg_bench"}
+
+
+class _SyncStream:
+    def __iter__(self):
+        for i in range(EVENTS):
+            time.sleep(EVENT_DELAY)
+            yield _FakeEvent(i)
+
+
+class _AsyncStream:
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        for i in range(EVENTS):
+            await asyncio.sleep(EVENT_DELAY)
+            yield _FakeEvent(i)
+
+    async def close(self):
+        pass
+
+
+class _AsyncResponses:
+    async def create(self, **kwargs):
+        return _AsyncStream()
+
+
+class _FakeAsyncClient:
+    responses = _AsyncResponses()
+
+
+async def _blocking_generate_stream(messages, tools_state, request):
+    """The previous implementation: a sync stream iterated on the event loop"""
+    for event in _SyncStream():
+        data = json.dumps({"event": event.type, "data": event.model_dump()})
+        yield f"data: {data}\n\n"
+
+
+async def _no_tools(tools_state, request=None):
+    return []
+
+
+async def _consume(stream) -> int:
+    count = 0
+    async for _ in stream:
+        count += 1
+    return count
+
+
+async def _run(label: str, make_stream, streams: int):
+    # generate_stream logs every turn; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        counts = await asyncio.gather(*[_consume(make_stream()) for _ in range(streams)])
+        elapsed = time.perf_counter() - start
+    total = sum(counts)
+    print(
+        f"{label:>8}: {streams} streams, {total} events in {elapsed:.2f}s "
+        f"-> {streams / elapsed:.1f} streams/s, {total / elapsed:.0f} events/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--streams", type=int, default=200, help="Concurrent turns to run")
+    args = parser.parse_args()
+
+    turn_response.get_tools = _no_tools
+    turn_response.get_async_openai_client = lambda: _FakeAsyncClient()
+    messages = [{"role": "user", "content": "benchmark"}]
+
+    async def bench():
+        # The blocking path serializes streams, so cap it to keep the run short
+        await _run("before", lambda: _blocking_generate_stream(messages, {}, None), min(args.streams, 20))
+        await _run("after", lambda: turn_response.generate_stream(messages, {}, None), args.streams)
+
+    asyncio.run(bench())
+
+
+if __name__ == "__main__":
+    main()
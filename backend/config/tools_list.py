@@ -16,11 +16,24 @@ tools_list = [
                 "enum": ["celsius", "fahrenheit"],
             },
         },
+        # Result caching (lib/tool_cache.py): fresh for ttl seconds, then served
+        # stale for up to stale_ttl more while refreshed in the background. The
+        # result is the current UTC hour's temperature, so entries never outlive that hour.
+        "cache": {
+            "ttl": 600,
+            "stale_ttl": 300,
+            "key": {"location": "casefold", "unit": "lower"},
+            "per": "utc_hour",
+        },
+        # Cheap and idempotent: may start while the model is still streaming (lib/speculative_tools.py)
+        "speculative": True,
     },
     {
         "name": "get_joke",
         "description": "Get a programming joke",
         "parameters": {},
+        # No "cache": every call should return a new joke
+        "speculative": True,
     },
     {
         "name": "scrape_website",
@@ -38,6 +51,35 @@ tools_list = [
                 "type": "integer",
                 "description": "Timeout in seconds for page load. Defaults to 30 seconds if not specified.",
             },
+            "render_profile": {
+                "type": "string",
+                "description": "Which resources to load. 'text' loads only markup and scripts (fastest, best for reading text), 'no_media' also loads stylesheets, 'full' loads everything including images and fonts.",
+                "enum": ["text", "no_media", "full"],
+            },
+            "wait_for_selector": {
+                "type": "string",
+                "description": "CSS selector of an element that appears once the content has rendered, e.g. '#results'. Use an empty string to wait until the page stops changing instead.",
+            },
+        },
+    },
+    {
+        "name": "scrape_websites",
+        "description": "Scrape several websites at once (up to 20) and get the readable content of each. Prefer this over repeated scrape_website calls when you need multiple pages, e.g. for research across sources. Pages are fetched concurrently; any page not finished within the deadline is reported with status 'timeout'.",
+        "parameters": {
+            "urls": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Full URLs of the websites to scrape (e.g., ['https://example.com/a', 'https://example.org/b'])",
+            },
+            "wait_for_js": {
+                "type": "boolean",
+                "description": "Whether to wait for JavaScript to execute and render content on every page. Defaults to false if not specified.",
+            },
+            "render_profile": {
+                "type": "string",
+                "description": "Which resources to load on every page: 'text', 'no_media' or 'full'.",
+                "enum": ["text", "no_media", "full"],
+            },
         },
     },
 ]
@@ -0,0 +1,84 @@
+"""Concurrent multi-URL scraping with per-host politeness and an overall deadline"""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+from urllib.parse import urlparse
+
+# Most URLs one batch may contain
+BATCH_MAX_URLS = 20
+
+# Pages scraped at the same time across the batch, and per host
+BATCH_CONCURRENCY = 6
+BATCH_PER_HOST_CONCURRENCY = 2
+
+# Whole batch deadline; pages still running then are reported as timed out
+BATCH_DEADLINE_SECONDS = 60
+
+
+def normalize_urls(urls: List[str]) -> List[str]:
+    """Drop blanks and duplicates (keeping order) and cap the batch size"""
+    seen = set()
+    unique = []
+    for url in urls:
+        url = (url or "").strip()
+        if url and url not in seen:
+            seen.add(url)
+            unique.append(url)
+    return unique[:BATCH_MAX_URLS]
+
+
+async def scrape_many(
+    urls: List[str],
+    scrape: Callable[[str], Awaitable[Dict[str, Any]]],
+    deadline_seconds: float = BATCH_DEADLINE_SECONDS,
+    concurrency: int = BATCH_CONCURRENCY,
+    per_host_concurrency: int = BATCH_PER_HOST_CONCURRENCY,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Scrape URLs concurrently, yielding each result as soon as its page finishes.
+
+    Every yielded dict carries the URL's position in the batch as "index".
+    Once the deadline passes, unfinished pages are cancelled and yielded with
+    status "timeout", so callers always get exactly one result per URL.
+    """
+    started = time.perf_counter()
+    global_slots = asyncio.Semaphore(concurrency)
+    host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    async def run(index: int, url: str) -> Dict[str, Any]:
+        host = urlparse(url).hostname or ""
+        host_slot = host_slots.setdefault(host, asyncio.Semaphore(per_host_concurrency))
+        # Take the per-host slot first so one slow host doesn't hold global slots while queued
+        async with host_slot, global_slots:
+            page_started = time.perf_counter()
+            try:
+                result = await scrape(url)
+            except Exception as e:
+                result = {"url": url, "status": "error", "error": str(e)}
+        return {
+            "index": index,
+            **result,
+            "elapsed_ms": round((time.perf_counter() - page_started) * 1000),
+        }
+
+    tasks = {asyncio.create_task(run(index, url)): (index, url) for index, url in enumerate(urls)}
+    try:
+        pending = set(tasks)
+        while pending:
+            remaining = deadline_seconds - (time.perf_counter() - started)
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+
+        for task in sorted(pending, key=lambda t: tasks[t][0]):
+            index, url = tasks[task]
+            yield {
+                "index": index,
+                "url": url,
+                "status": "timeout",
+                "error": f"Not finished within the {deadline_seconds}s batch deadline",
+            }
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,196 @@
+"""Warm Playwright browser pool used by scrape_website"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+try:
+    from playwright.async_api import async_playwright
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+# Browsers kept running, and pages each of them renders at the same time
+BROWSER_POOL_SIZE = 2
+PAGES_PER_BROWSER = 4
+
+# Restart a browser after it has rendered this many pages, to cap memory growth
+MAX_PAGES_PER_BROWSER = 100
+
+# How long a scrape may wait in the queue for a free page slot
+QUEUE_TIMEOUT_SECONDS = 30
+
+
+class _PooledBrowser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.active = 0
+        self.pages_served = 0
+        self.crashed = False
+        browser.on("disconnected", self._on_disconnected)
+
+    def _on_disconnected(self, *args):
+        self.crashed = True
+
+    @property
+    def usable(self) -> bool:
+        return not self.crashed and self.pages_served < MAX_PAGES_PER_BROWSER
+
+
+class BrowserPool:
+    """A fixed set of running Chromium browsers handing out isolated pages.
+
+    Each scrape gets a fresh browser context (no shared cookies or storage) on an
+    already running browser, so only the first scrape pays for browser startup.
+    Concurrency is capped by a queue; browsers are recycled after
+    MAX_PAGES_PER_BROWSER pages or when they crash.
+    """
+
+    def __init__(self, size: int = BROWSER_POOL_SIZE, pages_per_browser: int = PAGES_PER_BROWSER):
+        self.size = size
+        self._slots = asyncio.Semaphore(size * pages_per_browser)
+        self._lock = asyncio.Lock()
+        self._playwright = None
+        self._browsers: List[_PooledBrowser] = []
+        self._waiting = 0
+        self.stats = {"pages_served": 0, "recycled": 0, "crashed": 0, "queue_timeouts": 0}
+
+    async def start(self):
+        self._playwright = await async_playwright().start()
+        for _ in range(self.size):
+            self._browsers.append(await self._launch())
+
+    async def stop(self):
+        async with self._lock:
+            for pooled in self._browsers:
+                await self._close_browser(pooled)
+            self._browsers = []
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+    async def _launch(self) -> _PooledBrowser:
+        browser = await self._playwright.chromium.launch(headless=True)
+        return _PooledBrowser(browser)
+
+    async def _close_browser(self, pooled: _PooledBrowser):
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            print(f"Error closing browser: {e}")
+
+    async def _acquire_browser(self) -> _PooledBrowser:
+        async with self._lock:
+            # Replace browsers that crashed or are worn out once they are idle
+            for index, pooled in enumerate(self._browsers):
+                if pooled.usable or pooled.active:
+                    continue
+                if pooled.crashed:
+                    self.stats["crashed"] += 1
+                else:
+                    self.stats["recycled"] += 1
+                await self._close_browser(pooled)
+                self._browsers[index] = await self._launch()
+
+            candidates = [pooled for pooled in self._browsers if pooled.usable]
+            if not candidates:
+                # Every browser is retiring with pages in flight - add a fresh one
+                pooled = await self._launch()
+                self._browsers.append(pooled)
+                candidates = [pooled]
+
+            pooled = min(candidates, key=lambda b: b.active)
+            pooled.active += 1
+            return pooled
+
+    async def _release_browser(self, pooled: _PooledBrowser):
+        async with self._lock:
+            pooled.active -= 1
+            pooled.pages_served += 1
+            self.stats["pages_served"] += 1
+            # Drop browsers that were added above the pool size once they drain
+            if not pooled.usable and not pooled.active and len(self._browsers) > self.size:
+                self._browsers.remove(pooled)
+                self.stats["recycled"] += 1
+                await self._close_browser(pooled)
+
+    @asynccontextmanager
+    async def page(self, **context_options: Any):
+        """Borrow a page in a fresh browser context; waits in the queue if the pool is busy"""
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            self.stats["queue_timeouts"] += 1
+            raise RuntimeError("Scrape queue is full, try again later")
+        finally:
+            self._waiting -= 1
+
+        try:
+            pooled = await self._acquire_browser()
+            try:
+                context = await pooled.browser.new_context(**context_options)
+                try:
+                    yield await context.new_page()
+                finally:
+                    try:
+                        await context.close()
+                    except Exception:
+                        # The browser went away mid-scrape, it is replaced on next acquire
+                        pass
+            finally:
+                await self._release_browser(pooled)
+        finally:
+            self._slots.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "browsers": len(self._browsers),
+            "active_pages": sum(pooled.active for pooled in self._browsers),
+            "queued": self._waiting,
+        }
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = asyncio.Lock()
+_start_failed = False
+
+
+async def start_browser_pool() -> Optional[BrowserPool]:
+    """Start the shared browser pool; returns None if Playwright can't run here"""
+    global _pool, _start_failed
+    if not PLAYWRIGHT_AVAILABLE or _start_failed:
+        return None
+    async with _pool_lock:
+        if _pool is None:
+            pool = BrowserPool()
+            try:
+                await pool.start()
+            except Exception as e:
+                # Don't retry on every scrape - browsers are usually just not installed
+                print(f"Warning: could not start browser pool: {e}")
+                print("Install browsers with: python -m playwright install chromium")
+                _start_failed = True
+                await pool.stop()
+                return None
+            _pool = pool
+    return _pool
+
+
+async def get_browser_pool() -> Optional[BrowserPool]:
+    """Get the shared browser pool, starting it lazily if startup didn't"""
+    return _pool or await start_browser_pool()
+
+
+async def stop_browser_pool():
+    """Close all pooled browsers (called once at shutdown)"""
+    global _pool
+    if _pool is not None:
+        await _pool.stop()
+        _pool = None
+
+
+def get_browser_pool_stats() -> Dict[str, Any]:
+    if _pool is None:
+        return {"running": False, "playwright_available": PLAYWRIGHT_AVAILABLE}
+    return {"running": True, **_pool.get_stats()}
@@ -173,3 +173,17 @@ def get_node_env() -> str:
     """Get NODE_ENV (development or production)"""
     return get_secret("NODE_ENV", "development")
 
+
+def get_session_store_url() -> str:
+    """Get the session store URL (memory://, sqlite:///path.db or redis://host:port/db)"""
+    return get_secret("SESSION_STORE_URL", "memory://")
+
+
+def get_cache_dir() -> str:
+    """Get the directory for on-disk caches (scrapes, tool results, files)"""
+    return get_secret("CACHE_DIR", ".cache")
+
+
+def get_geocoding_gazetteer() -> Optional[str]:
+    """Get the optional gazetteer file (CSV or GeoNames TSV) that seeds the geocoding index"""
+    return get_secret("GEOCODING_GAZETTEER")
@@ -1,6 +1,10 @@
+from collections import OrderedDict
 from typing import Optional, Dict
-import httpx
-from lib.session import get_token_set, save_token_set, get_session_id
+import asyncio
+import hashlib
+import time
+from lib.http_client import get_http_client
+from lib.session import get_token_set, save_token_set, get_session_id, OAuthTokens
 from lib.config import get_google_client_id, get_google_client_secret, get_google_redirect_uri
 
 GOOGLE_SCOPES = [
@@ -44,65 +48,198 @@ def get_redirect_uri() -> str:
 # Refresh when close to expiry (30s) or when missing access token but we have a refresh token
 EXPIRY_SKEW_MS = 30_000
 
+# Refresh in the background this long before expiry, so turns never wait on the token endpoint
+REFRESH_AHEAD_MS = 5 * 60_000
+
+# Only sessions used within this window are refreshed ahead of expiry; idle
+# sessions stop refreshing and refresh on their next use instead
+REFRESH_IDLE_MS = 60 * 60_000
+
+# Upper bound on sessions whose tokens are cached in this process
+MAX_CACHED_SESSIONS = 10_000
+
+_token_cache: "OrderedDict[str, FreshTokens]" = OrderedDict()
+_last_used: Dict[str, int] = {}
+_inflight_refreshes: Dict[str, asyncio.Task] = {}
+_scheduled_refreshes: Dict[str, asyncio.Task] = {}
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _make_tokens(access_token, refresh_token, expires_at) -> FreshTokens:
+    tokens = FreshTokens()
+    tokens.accessToken = access_token
+    tokens.refreshToken = refresh_token
+    tokens.expiresAt = expires_at
+    return tokens
+
+
+def _cache_key(session_id: Optional[str], refresh_token: Optional[str]) -> Optional[str]:
+    """Cache per session; cookie-only clients are keyed by their refresh token"""
+    if session_id:
+        return session_id
+    if refresh_token:
+        return "rt:" + hashlib.sha256(refresh_token.encode("utf-8")).hexdigest()
+    return None
+
+
+def _is_expiring_soon(expires_at: Optional[int], now: int) -> bool:
+    return expires_at is not None and now > expires_at - EXPIRY_SKEW_MS
+
+
+def _cache_tokens(key: str, tokens: FreshTokens):
+    _token_cache[key] = tokens
+    _token_cache.move_to_end(key)
+    while len(_token_cache) > MAX_CACHED_SESSIONS:
+        evicted_key, _ = _token_cache.popitem(last=False)
+        _forget(evicted_key)
+
+
+def _forget(key: str):
+    """Stop tracking and refreshing a cache key"""
+    _last_used.pop(key, None)
+    scheduled = _scheduled_refreshes.pop(key, None)
+    if scheduled:
+        scheduled.cancel()
+
+
+def invalidate_cached_tokens(session_id: Optional[str]):
+    """Drop cached tokens for a session, e.g. after it reconnected with new tokens or was cleared"""
+    if not session_id:
+        return
+    _token_cache.pop(session_id, None)
+    _forget(session_id)
+
+
+async def _request_token_refresh(refresh_token: str) -> dict:
+    """Exchange a refresh token at Google's token endpoint"""
+    config = get_google_client_config()
+    response = await get_http_client().post(
+        config["token_endpoint"],
+        data={
+            "client_id": config["client_id"],
+            "client_secret": config["client_secret"],
+            "refresh_token": refresh_token,
+            "grant_type": "refresh_token",
+        },
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def _do_refresh(key: str, session_id: Optional[str], tokens: FreshTokens, persist: bool) -> FreshTokens:
+    now = _now_ms()
+    try:
+        refreshed = await _request_token_refresh(tokens.refreshToken)
+    except Exception as e:
+        # If refresh fails, fall through and return whatever we have
+        print(f"Google token refresh failed: {e}")
+        return tokens
+
+    if persist and session_id:
+        # The session may have been cleared or reconnected while the request was out
+        current = await get_token_set(session_id)
+        if current is None or current.refresh_token != tokens.refreshToken:
+            print("Google token refresh discarded: session changed meanwhile")
+            return tokens
+
+    fresh = _make_tokens(
+        refreshed.get("access_token") or tokens.accessToken,
+        refreshed.get("refresh_token") or tokens.refreshToken,
+        (
+            now + refreshed.get("expires_in", 0) * 1000
+            if refreshed.get("expires_in")
+            else tokens.expiresAt
+        ),
+    )
+    _cache_tokens(key, fresh)
+
+    # Note: In FastAPI, we'd need to set cookies in the response
+    # This is handled in the callback endpoint
+    if persist and session_id:
+        await save_token_set(
+            session_id,
+            OAuthTokens(
+                access_token=fresh.accessToken,
+                refresh_token=fresh.refreshToken,
+                expires_at=fresh.expiresAt,
+            ),
+        )
+
+    _schedule_refresh(key, session_id, fresh, persist)
+    return fresh
+
+
+async def _refresh_tokens(key: str, session_id: Optional[str], tokens: FreshTokens, persist: bool) -> FreshTokens:
+    """Refresh once per session - concurrent callers share the in-flight request"""
+    task = _inflight_refreshes.get(key)
+    if task is None:
+        task = asyncio.create_task(_do_refresh(key, session_id, tokens, persist))
+        _inflight_refreshes[key] = task
+        task.add_done_callback(lambda _: _inflight_refreshes.pop(key, None))
+    # Shield so one cancelled turn doesn't cancel the refresh for everyone else
+    return await asyncio.shield(task)
+
+
+def _schedule_refresh(key: str, session_id: Optional[str], tokens: FreshTokens, persist: bool):
+    """Refresh shortly before the access token expires, off the request path"""
+    if not tokens.refreshToken or tokens.expiresAt is None:
+        return
+
+    delay = max(0.0, (tokens.expiresAt - REFRESH_AHEAD_MS - _now_ms()) / 1000)
+
+    async def refresh_later():
+        await asyncio.sleep(delay)
+        _scheduled_refreshes.pop(key, None)
+        if _now_ms() - _last_used.get(key, 0) > REFRESH_IDLE_MS:
+            return
+        await _refresh_tokens(key, session_id, tokens, persist)
+
+    scheduled = _scheduled_refreshes.get(key)
+    if scheduled:
+        scheduled.cancel()
+    _scheduled_refreshes[key] = asyncio.create_task(refresh_later())
+
 
 async def get_fresh_access_token(request) -> FreshTokens:
     """Get fresh access token, refreshing if needed"""
     session_id = get_session_id(request)
-    token_set = get_token_set(session_id)
+    refresh_token = request.cookies.get("gc_refresh_token")
+    key = _cache_key(session_id, refresh_token)
+    now = _now_ms()
+    if key:
+        _last_used[key] = now
+
+    # Fast path: a cached token that is still valid, no store lookup or network call
+    cached = _token_cache.get(key) if key else None
+    if cached and cached.accessToken and not _is_expiring_soon(cached.expiresAt, now):
+        _token_cache.move_to_end(key)
+        return cached
+
+    token_set = await get_token_set(session_id)
     
     access_token = request.cookies.get("gc_access_token") or (token_set.access_token if token_set else None)
-    refresh_token = request.cookies.get("gc_refresh_token") or (token_set.refresh_token if token_set else None)
+    refresh_token = refresh_token or (token_set.refresh_token if token_set else None)
     expires_at_str = request.cookies.get("gc_expires_at")
     expires_at = int(expires_at_str) if expires_at_str else (token_set.expires_at if token_set else None)
     
-    import time
-    now = int(time.time() * 1000)  # milliseconds
-    is_expiring_soon = expires_at is not None and now > expires_at - EXPIRY_SKEW_MS
+    tokens = _make_tokens(access_token, refresh_token, expires_at)
+    if not key:
+        key = _cache_key(session_id, refresh_token)
+        if not key:
+            return tokens
+        _last_used[key] = now
+
+    is_expiring_soon = _is_expiring_soon(expires_at, now)
     should_refresh = bool(refresh_token and (not access_token or is_expiring_soon))
+    persist = bool(session_id and token_set)
     
     if should_refresh:
-        try:
-            config = get_google_client_config()
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    config["token_endpoint"],
-                    data={
-                        "client_id": config["client_id"],
-                        "client_secret": config["client_secret"],
-                        "refresh_token": refresh_token,
-                        "grant_type": "refresh_token",
-                    },
-                )
-                response.raise_for_status()
-                refreshed = response.json()
-                
-                access_token = refreshed.get("access_token") or access_token
-                refresh_token = refreshed.get("refresh_token") or refresh_token
-                expires_at = (
-                    now + refreshed.get("expires_in", 0) * 1000
-                    if refreshed.get("expires_in")
-                    else expires_at
-                )
-                
-                # Note: In FastAPI, we'd need to set cookies in the response
-                # This is handled in the callback endpoint
-                if session_id and token_set:
-                    from lib.session import OAuthTokens
-                    save_token_set(
-                        session_id,
-                        OAuthTokens(
-                            access_token=access_token,
-                            refresh_token=refresh_token,
-                            expires_at=expires_at,
-                        ),
-                    )
-        except Exception:
-            # If refresh fails, fall through and return whatever we have
-            pass
-    
-    tokens = FreshTokens()
-    tokens.accessToken = access_token
-    tokens.refreshToken = refresh_token
-    tokens.expiresAt = expires_at
-    return tokens
+        return await _refresh_tokens(key, session_id, tokens, persist)
 
+    _cache_tokens(key, tokens)
+    if key not in _scheduled_refreshes:
+        _schedule_refresh(key, session_id, tokens, persist)
+    return tokens
@@ -0,0 +1,307 @@
+"""Streaming main-content extraction for scraped pages"""
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional
+from urllib.parse import urljoin, urldefrag
+
+# Stop reading a page after this many bytes - main content is almost always near the top
+MAX_FETCH_BYTES = 1024 * 1024
+
+# Output budget: extracted text and links together stay under this many tokens
+MAX_CONTENT_TOKENS = 4000
+MAX_LINKS = 40
+
+# Rough token estimate for English text, good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+# Bumped whenever the output format changes, so cached results are not reused
+EXTRACTOR_VERSION = 2
+
+# Elements whose text is never shown
+_INVISIBLE_TAGS = {"script", "style", "noscript", "template", "svg", "canvas", "iframe", "object"}
+# Elements that never contain main content
+_SKIP_TAGS = {"nav", "footer", "header", "aside", "button", "select", "dialog"}
+# Page-level containers: their class/id/role describe the page, not boilerplate
+# (WordPress puts "has-sidebar" on <body>), so they are never skipped for it
+_CONTAINER_TAGS = {"html", "body", "main", "article"}
+# class/id/role values that mark boilerplate containers
+_BOILERPLATE = re.compile(
+    r"(^|[\s_-])(nav|navbar|menu|footer|header|sidebar|breadcrumbs?|cookie|consent|banner|"
+    r"advert|ads?|promo|share|social|related|comments?|subscribe|newsletter|popup|modal)($|[\s_-])",
+    re.IGNORECASE,
+)
+_BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search", "dialog"}
+_MAIN_TAGS = {"main", "article"}
+_VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param",
+    "source", "track", "wbr",
+}
+_BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "dl", "dt", "dd", "table",
+    "tr", "td", "th", "blockquote", "pre", "figure", "figcaption", "br", "hr",
+    "h1", "h2", "h3", "h4", "h5", "h6",
+}
+_WHITESPACE = re.compile(r"\s+")
+
+
+class _Block:
+    def __init__(self, in_main: bool, prefix: str = ""):
+        self.parts: List[str] = []
+        self.link_chars = 0
+        self.in_main = in_main
+        self.prefix = prefix
+
+    @property
+    def text(self) -> str:
+        return _WHITESPACE.sub(" ", "".join(self.parts)).strip()
+
+
+class MainContentExtractor(HTMLParser):
+    """Incremental HTML parser that keeps readable blocks and links, dropping boilerplate.
+
+    Feed it chunks as they arrive; nav/footer/script and elements whose class, id
+    or role look like boilerplate are skipped, and link-heavy blocks (menus, tag
+    clouds) are dropped the way readability does. If the page has a <main> or
+    <article>, only blocks inside it are kept. When the filters leave nothing,
+    the page's full visible text is returned instead.
+    """
+
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.title = ""
+        self.links: List[Dict[str, str]] = []
+        self._seen_links = set()
+        self._blocks: List[_Block] = []
+        self._block: Optional[_Block] = None
+        self._skip_tag: Optional[str] = None
+        self._skip_depth = 0
+        self._invisible_tag: Optional[str] = None
+        self._invisible_depth = 0
+        # All visible text, boilerplate included, for pages the filters empty out
+        self._visible_parts: List[str] = []
+        self._main_depth = 0
+        self._saw_main = False
+        self._in_title = False
+        self._link_href: Optional[str] = None
+        self._link_text: List[str] = []
+        self._heading_prefix = ""
+
+    def _is_invisible(self, tag: str, attrs: Dict[str, Optional[str]]) -> bool:
+        return tag in _INVISIBLE_TAGS or "hidden" in attrs or attrs.get("aria-hidden") == "true"
+
+    def _is_boilerplate(self, tag: str, attrs: Dict[str, Optional[str]]) -> bool:
+        if tag in _SKIP_TAGS:
+            # <header> inside an article is usually the article's own title
+            return not (tag == "header" and self._main_depth)
+        if tag in _CONTAINER_TAGS:
+            return False
+        if (attrs.get("role") or "").lower() in _BOILERPLATE_ROLES:
+            return True
+        return bool(_BOILERPLATE.search(" ".join(filter(None, (attrs.get("class"), attrs.get("id"))))))
+
+    def _flush_block(self, prefix: str = ""):
+        if self._block is not None and self._block.text:
+            self._blocks.append(self._block)
+        self._block = _Block(self._main_depth > 0, prefix)
+
+    def handle_starttag(self, tag, attrs):
+        if self._invisible_tag is not None:
+            if tag == self._invisible_tag:
+                self._invisible_depth += 1
+            return
+        attrs = dict(attrs)
+        if tag not in _VOID_TAGS and self._is_invisible(tag, attrs):
+            self._invisible_tag = tag
+            self._invisible_depth = 1
+            return
+        if tag in _BLOCK_TAGS:
+            self._visible_parts.append("\n")
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+        if tag == "title":
+            self._in_title = True
+            return
+        if tag not in _VOID_TAGS and self._is_boilerplate(tag, attrs):
+            self._skip_tag = tag
+            self._skip_depth = 1
+            return
+        if tag in _MAIN_TAGS:
+            self._main_depth += 1
+            self._saw_main = True
+        if tag in _BLOCK_TAGS:
+            prefix = ""
+            if tag[0] == "h" and tag[1:].isdigit():
+                prefix = "#" * int(tag[1:]) + " "
+            elif tag == "li":
+                prefix = "- "
+            self._flush_block(prefix)
+        if tag == "a":
+            href = attrs.get("href")
+            self._link_href = href
+            self._link_text = []
+
+    def handle_endtag(self, tag):
+        if self._invisible_tag is not None:
+            if tag == self._invisible_tag:
+                self._invisible_depth -= 1
+                if self._invisible_depth == 0:
+                    self._invisible_tag = None
+            return
+        if tag in _BLOCK_TAGS:
+            self._visible_parts.append("\n")
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if self._skip_depth == 0:
+                    self._skip_tag = None
+            return
+        if tag == "title":
+            self._in_title = False
+            return
+        if tag == "a" and self._link_href is not None:
+            self._add_link(self._link_href, "".join(self._link_text))
+            self._link_href = None
+        if tag in _BLOCK_TAGS:
+            self._flush_block()
+        if tag in _MAIN_TAGS and self._main_depth:
+            self._main_depth -= 1
+
+    def handle_data(self, data):
+        if self._invisible_tag is not None:
+            return
+        if self._in_title:
+            self.title += data
+            return
+        self._visible_parts.append(data)
+        if self._skip_tag is not None:
+            return
+        if self._block is None:
+            self._block = _Block(self._main_depth > 0)
+        self._block.parts.append(data)
+        if self._link_href is not None:
+            self._link_text.append(data)
+            self._block.link_chars += len(data.strip())
+
+    def _add_link(self, href: str, text: str):
+        href = href.strip()
+        if not href or href.startswith(("#", "javascript:", "mailto:", "tel:", "data:")):
+            return
+        url = urldefrag(urljoin(self.base_url, href)).url
+        text = _WHITESPACE.sub(" ", text).strip()
+        if not text or url in self._seen_links:
+            return
+        self._seen_links.add(url)
+        self.links.append({"text": text, "url": url})
+
+    def _content_blocks(self) -> List[_Block]:
+        self._flush_block()
+        blocks = self._blocks
+        if self._saw_main and any(block.in_main for block in blocks):
+            blocks = [block for block in blocks if block.in_main]
+        kept = []
+        for block in blocks:
+            text = block.text
+            # Link-dominated blocks are menus and link lists, not content
+            if block.link_chars > 0.5 * len(text) and len(text) < 200:
+                continue
+            kept.append(block)
+        return kept
+
+    def result(self, max_tokens: int = MAX_CONTENT_TOKENS, max_links: int = MAX_LINKS) -> Dict[str, Any]:
+        """Readable text and links, trimmed to the token budget"""
+        budget = max_tokens * CHARS_PER_TOKEN
+        lines = []
+        used = 0
+        truncated = False
+        content = [block.prefix + block.text for block in self._content_blocks()]
+        if not content:
+            # The filters removed everything (e.g. the whole page is one boilerplate-looking wrapper)
+            content = [
+                line for line in (_WHITESPACE.sub(" ", line).strip() for line in "".join(self._visible_parts).split("\n"))
+                if line
+            ]
+        for line in content:
+            if used + len(line) > budget:
+                remaining = budget - used
+                if remaining > 80:
+                    lines.append(line[:remaining].rsplit(" ", 1)[0] + " ...")
+                truncated = True
+                break
+            lines.append(line)
+            used += len(line) + 1
+
+        # Links share whatever budget the text left, but always get a few
+        link_budget = max(budget - used, budget // 10)
+        links = []
+        for link in self.links[:max_links]:
+            cost = len(link["text"]) + len(link["url"]) + 4
+            if cost > link_budget:
+                break
+            links.append(link)
+            link_budget -= cost
+
+        return {
+            "title": _WHITESPACE.sub(" ", self.title).strip(),
+            "text": "\n".join(lines),
+            "links": links,
+            "truncated": truncated or len(links) < len(self.links),
+        }
+
+
+def _is_html(content_type: str) -> bool:
+    return not content_type or "html" in content_type or "xml" in content_type
+
+
+def extract_html(html: str, base_url: str, max_tokens: int = MAX_CONTENT_TOKENS) -> Dict[str, Any]:
+    """Extract main content from an already rendered page (e.g. Playwright's page.content())"""
+    extractor = MainContentExtractor(base_url)
+    extractor.feed(html[:MAX_FETCH_BYTES])
+    extractor.close()
+    return extractor.result(max_tokens)
+
+
+async def extract_from_response(
+    response,
+    base_url: str,
+    max_bytes: int = MAX_FETCH_BYTES,
+    max_tokens: int = MAX_CONTENT_TOKENS,
+) -> Dict[str, Any]:
+    """Parse a streamed httpx response as it arrives, reading at most max_bytes of the body"""
+    content_type = response.headers.get("content-type", "").lower()
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+    extractor = MainContentExtractor(base_url) if _is_html(content_type) else None
+    plain_text: List[str] = []
+    bytes_read = 0
+    complete = True
+
+    async for chunk in response.aiter_bytes():
+        chunk = chunk[:max_bytes - bytes_read]
+        bytes_read += len(chunk)
+        text = decoder.decode(chunk)
+        if extractor is not None:
+            extractor.feed(text)
+        else:
+            plain_text.append(text)
+        if bytes_read >= max_bytes:
+            complete = False
+            break
+
+    tail = decoder.decode(b"", final=True)
+    if extractor is None:
+        # Plain text or JSON: nothing to strip, only the budget applies
+        text = "".join(plain_text) + tail
+        budget = max_tokens * CHARS_PER_TOKEN
+        result = {"title": "", "text": text[:budget], "links": [], "truncated": len(text) > budget}
+    else:
+        extractor.feed(tail)
+        extractor.close()
+        result = extractor.result(max_tokens)
+
+    result["bytes_read"] = bytes_read
+    if not complete:
+        result["truncated"] = True
+    return result
@@ -0,0 +1,33 @@
+"""Last response id per conversation, used to chain turns with previous_response_id"""
+from typing import Optional
+from lib.session_store import get_session_store
+
+# Kept in the session store so every worker can continue any conversation.
+# Stored responses are retained by OpenAI for 30 days.
+CONVERSATION_KEY_PREFIX = "conversation:"
+CONVERSATION_TTL_SECONDS = 60 * 60 * 24 * 30
+
+
+async def get_last_response_id(conversation_id: Optional[str]) -> Optional[str]:
+    """Get the id of the last completed response in a conversation"""
+    if not conversation_id:
+        return None
+    data = await get_session_store().get(CONVERSATION_KEY_PREFIX + conversation_id)
+    return data.get("last_response_id") if data else None
+
+
+async def save_last_response_id(conversation_id: Optional[str], response_id: Optional[str]):
+    """Remember the last completed response in a conversation"""
+    if not conversation_id or not response_id:
+        return
+    await get_session_store().set(
+        CONVERSATION_KEY_PREFIX + conversation_id,
+        {"last_response_id": response_id},
+        ttl=CONVERSATION_TTL_SECONDS,
+    )
+
+
+async def clear_conversation(conversation_id: Optional[str]):
+    """Forget a conversation"""
+    if conversation_id:
+        await get_session_store().delete(CONVERSATION_KEY_PREFIX + conversation_id)
@@ -0,0 +1,186 @@
+"""Size-bounded on-disk LRU cache shared by the backend's caches"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Optional
+
+
+# Eviction frees space down to this fraction of max_bytes, so the next writes don't evict again
+EVICT_TO_FRACTION = 0.9
+
+
+class DiskCache:
+    """Content-addressed files under one directory, evicted least recently used first.
+
+    Keys are hashed into file names, so any string (URL, options, ids) can be a key.
+    The directory is scanned once, at startup (oldest mtime first); after that an
+    in-memory index of file sizes in recency order decides what to evict, so a
+    write never rescans the directory. Reads also refresh a file's mtime, which
+    orders the next startup scan. Concurrent processes sharing the directory only
+    ever see complete files (writes go through a rename).
+
+    The methods do blocking file I/O; async code uses the a* variants and
+    open_for_write_async, which run it in a worker thread.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[Path, int]" = OrderedDict()
+        self._size = 0
+        entries = []
+        for path in self._files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(entries):
+            self._track(path, size)
+
+    def _files(self):
+        return (path for path in self.directory.glob("*/*") if path.is_file() and not path.name.startswith("."))
+
+    def _track(self, path: Path, size: int):
+        """Record a file's size as most recently used (call with the lock held, or from __init__)"""
+        self._size += size - self._index.pop(path, 0)
+        self._index[path] = size
+
+    def path_for(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.directory / digest[:2] / digest
+
+    def get_path(self, key: str) -> Optional[Path]:
+        """Path of a cached file (marked as recently used), or None"""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._size -= self._index.pop(path, 0)
+            return None
+        with self._lock:
+            if path in self._index:
+                self._index.move_to_end(path)
+            else:
+                # Written by another process sharing the directory
+                try:
+                    self._track(path, path.stat().st_size)
+                except FileNotFoundError:
+                    return None
+        return path
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def set_bytes(self, key: str, data: bytes):
+        with self.open_for_write(key) as f:
+            f.write(data)
+
+    def get_json(self, key: str) -> Optional[Any]:
+        data = self.get_bytes(key)
+        if data is None:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            self.delete(key)
+            return None
+
+    def set_json(self, key: str, value: Any):
+        self.set_bytes(key, json.dumps(value).encode("utf-8"))
+
+    async def aget_path(self, key: str) -> Optional[Path]:
+        return await asyncio.to_thread(self.get_path, key)
+
+    async def aget_json(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self.get_json, key)
+
+    async def aset_json(self, key: str, value: Any):
+        await asyncio.to_thread(self.set_json, key, value)
+
+    @contextmanager
+    def open_for_write(self, key: str):
+        """Write a cache file incrementally; it only becomes visible if the block succeeds"""
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                yield f
+                size = f.tell()
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        with self._lock:
+            self._track(path, size)
+        self._evict()
+
+    def open_for_write_async(self, key: str) -> "AsyncCacheWriter":
+        """open_for_write for async code: async with cache.open_for_write_async(key) as f: await f.write(data)"""
+        return AsyncCacheWriter(self.open_for_write(key))
+
+    def delete(self, key: str):
+        path = self.path_for(key)
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._size -= self._index.pop(path, 0)
+
+    def _evict(self):
+        with self._lock:
+            if self._size <= self.max_bytes:
+                return
+            victims = []
+            target = self.max_bytes * EVICT_TO_FRACTION
+            while self._index and self._size > target:
+                path, size = self._index.popitem(last=False)
+                self._size -= size
+                victims.append(path)
+        for path in victims:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+
+class AsyncCacheWriter:
+    """Wraps open_for_write so opening, each write and the final rename run in a worker thread"""
+
+    def __init__(self, manager):
+        self._manager = manager
+        self._file = None
+
+    async def __aenter__(self) -> "AsyncCacheWriter":
+        self._file = await asyncio.to_thread(self._manager.__enter__)
+        return self
+
+    async def write(self, data: bytes):
+        await asyncio.to_thread(self._file.write, data)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return await asyncio.to_thread(self._manager.__exit__, exc_type, exc, tb)
@@ -0,0 +1,287 @@
+"""Persistent location -> coordinates index for get_weather, filled from Nominatim"""
+import asyncio
+import csv
+import difflib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from lib.config import get_cache_dir, get_geocoding_gazetteer
+from lib.http_client import get_http_client
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+# Nominatim's usage policy: at most one request per second, with an identifying User-Agent
+NOMINATIM_MIN_INTERVAL_SECONDS = 1.0
+NOMINATIM_USER_AGENT = "openai-responses-starter-app/1.0"
+
+# Names Nominatim didn't know are remembered this long before asking again
+NEGATIVE_TTL_SECONDS = 24 * 60 * 60
+
+# Fuzzy matching: minimum similarity, and only for names at least this long
+FUZZY_CUTOFF = 0.88
+FUZZY_MIN_LENGTH = 4
+
+_PUNCTUATION = re.compile(r"[^\w\s,]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_location(name: str) -> str:
+    """Accent-stripped, case-folded, punctuation-free form used as the index key"""
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    ascii_name = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    cleaned = _PUNCTUATION.sub(" ", ascii_name.casefold())
+    cleaned = re.sub(r"\s*,\s*", ", ", cleaned)
+    return _WHITESPACE.sub(" ", cleaned).strip(" ,")
+
+
+def _split_qualifier(key: str) -> Tuple[str, str]:
+    """'paris, fr' -> ('paris', 'fr'); the qualifier is '' for a bare place name"""
+    place, _, qualifier = key.partition(", ")
+    return place, qualifier
+
+
+class GeocodingIndex:
+    """SQLite-backed location index with exact and fuzzy name lookup.
+
+    Keys are normalized names. Entries come from an offline gazetteer (the
+    most populous place wins for duplicate names) or from Nominatim answers
+    to earlier queries. Unknown names are stored as negative entries so
+    typos don't hit Nominatim on every call. Fuzzy matching only applies to
+    the place name: a qualifier ("springfield, il") must match exactly.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS places ("
+            " key TEXT PRIMARY KEY,"
+            " lat REAL,"
+            " lon REAL,"
+            " population INTEGER NOT NULL DEFAULT 0,"
+            " source TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        # Fuzzy candidates (place names) bucketed by first letter and qualifier, loaded on first use
+        self._names: Optional[Dict[Tuple[str, str], List[str]]] = None
+
+    def _load_names(self) -> Dict[Tuple[str, str], List[str]]:
+        if self._names is None:
+            names = defaultdict(list)
+            with self._lock:
+                rows = self._conn.execute("SELECT key FROM places WHERE lat IS NOT NULL").fetchall()
+            for (key,) in rows:
+                place, qualifier = _split_qualifier(key)
+                names[place[0], qualifier].append(place)
+            self._names = names
+        return self._names
+
+    def lookup(self, name: str) -> Tuple[Optional[Tuple[float, float]], str]:
+        """Coordinates for a name and how they were found: exact, fuzzy, negative or miss"""
+        key = normalize_location(name)
+        if not key:
+            return None, "negative"
+        with self._lock:
+            row = self._conn.execute("SELECT lat, lon, updated_at FROM places WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            lat, lon, updated_at = row
+            if lat is not None:
+                return (lat, lon), "exact"
+            if time.time() - updated_at < NEGATIVE_TTL_SECONDS:
+                return None, "negative"
+
+        place, qualifier = _split_qualifier(key)
+        if len(place) >= FUZZY_MIN_LENGTH:
+            candidates = [
+                candidate for candidate in self._load_names().get((place[0], qualifier), ())
+                if abs(len(candidate) - len(place)) <= 3
+            ]
+            matches = difflib.get_close_matches(place, candidates, n=1, cutoff=FUZZY_CUTOFF)
+            if matches:
+                match = f"{matches[0]}, {qualifier}" if qualifier else matches[0]
+                with self._lock:
+                    row = self._conn.execute("SELECT lat, lon FROM places WHERE key = ?", (match,)).fetchone()
+                if row is not None:
+                    return (row[0], row[1]), "fuzzy"
+        return None, "miss"
+
+    def add(self, name: str, coordinates: Optional[Tuple[float, float]], source: str, population: int = 0):
+        """Remember coordinates for a name (None records that the name is unknown)"""
+        key = normalize_location(name)
+        if not key:
+            return
+        lat, lon = coordinates if coordinates else (None, None)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO places (key, lat, lon, population, source, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, lat, lon, population, source, time.time()),
+            )
+        if coordinates and self._names is not None:
+            place, qualifier = _split_qualifier(key)
+            if place not in self._names[place[0], qualifier]:
+                self._names[place[0], qualifier].append(place)
+
+    def seed(self, path: str) -> int:
+        """Load a gazetteer: CSV with name,lat,lon[,population] columns or a GeoNames cities*.txt dump.
+        Gazetteer places replace cached Nominatim answers for the same name."""
+        rows = self._read_gazetteer(path)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO places (key, lat, lon, population, source, updated_at)"
+                    " VALUES (?, ?, ?, ?, 'gazetteer', ?)"
+                    " ON CONFLICT(key) DO UPDATE SET lat = excluded.lat, lon = excluded.lon,"
+                    " population = excluded.population, source = excluded.source, updated_at = excluded.updated_at"
+                    " WHERE places.source != 'gazetteer' OR excluded.population > places.population",
+                    ((key, lat, lon, population, time.time()) for key, lat, lon, population in rows),
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('gazetteer', ?)",
+                    (self._gazetteer_version(path),),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            count = self._conn.execute("SELECT COUNT(*) FROM places WHERE source = 'gazetteer'").fetchone()[0]
+        self._names = None
+        return count
+
+    def is_seeded_from(self, path: str) -> bool:
+        """Whether this exact gazetteer file (same path, size and mtime) was already loaded"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'gazetteer'").fetchone()
+        return row is not None and row[0] == self._gazetteer_version(path)
+
+    @staticmethod
+    def _gazetteer_version(path: str) -> str:
+        stat = os.stat(path)
+        return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    @staticmethod
+    def _read_gazetteer(path: str):
+        with open(path, newline="", encoding="utf-8") as f:
+            if path.endswith(".csv"):
+                for row in csv.DictReader(f):
+                    key = normalize_location(row["name"])
+                    if key:
+                        yield key, float(row["lat"]), float(row["lon"]), int(row.get("population") or 0)
+                return
+            # GeoNames: geonameid, name, asciiname, alternatenames, latitude, longitude, ..., population (15th)
+            for line in f:
+                columns = line.rstrip("\n").split("\t")
+                if len(columns) < 15:
+                    continue
+                lat, lon, population = float(columns[4]), float(columns[5]), int(columns[14] or 0)
+                for name in {columns[1], columns[2]}:
+                    key = normalize_location(name)
+                    if key:
+                        yield key, lat, lon, population
+                        # "Paris, FR" style queries
+                        yield f"{key}, {columns[8].lower()}", lat, lon, population
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM places WHERE lat IS NOT NULL").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_index: Optional[GeocodingIndex] = None
+_nominatim_lock = asyncio.Lock()
+_last_nominatim_request = 0.0
+_stats = {"exact": 0, "fuzzy": 0, "negative": 0, "nominatim": 0, "nominatim_misses": 0}
+
+
+def get_geocoding_index() -> GeocodingIndex:
+    """Get the shared index, seeding it from GEOCODING_GAZETTEER the first time"""
+    global _index
+    if _index is None:
+        os.makedirs(get_cache_dir(), exist_ok=True)
+        _index = GeocodingIndex(os.path.join(get_cache_dir(), "geocoding.db"))
+        gazetteer = get_geocoding_gazetteer()
+        # Nominatim answers don't count: a new or changed gazetteer file is always loaded
+        if gazetteer and not _index.is_seeded_from(gazetteer):
+            print(f"Seeding geocoding index from {gazetteer}")
+            print(f"Geocoding index: {_index.seed(gazetteer)} places")
+    return _index
+
+
+def close_geocoding_index():
+    """Close the shared index (called once at shutdown)"""
+    global _index
+    if _index is not None:
+        _index.close()
+        _index = None
+
+
+async def _query_nominatim(location: str) -> Optional[Tuple[float, float]]:
+    global _last_nominatim_request
+    # Serialize lookups and space them out to stay within the rate limit
+    async with _nominatim_lock:
+        wait = NOMINATIM_MIN_INTERVAL_SECONDS - (time.monotonic() - _last_nominatim_request)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        try:
+            client = get_http_client()
+            res = await client.get(
+                NOMINATIM_URL,
+                params={"q": location, "format": "json", "limit": 1},
+                headers={"User-Agent": NOMINATIM_USER_AGENT},
+            )
+        finally:
+            _last_nominatim_request = time.monotonic()
+    res.raise_for_status()
+    results = res.json()
+    if not results:
+        return None
+    return float(results[0]["lat"]), float(results[0]["lon"])
+
+
+async def geocode(location: str) -> Optional[Tuple[float, float]]:
+    """Coordinates for a location name: from the local index, else from Nominatim (and remembered)"""
+    index = get_geocoding_index()
+    # SQLite queries (and the first load of fuzzy candidates) run in a worker thread
+    coordinates, match = await asyncio.to_thread(index.lookup, location)
+    if match != "miss":
+        _stats[match] += 1
+        return coordinates
+
+    coordinates = await _query_nominatim(location)
+    if coordinates is None:
+        _stats["nominatim_misses"] += 1
+    else:
+        _stats["nominatim"] += 1
+    await asyncio.to_thread(index.add, location, coordinates, "nominatim")
+    return coordinates
+
+
+def get_geocoding_stats() -> Dict[str, Any]:
+    lookups = sum(_stats.values())
+    local = _stats["exact"] + _stats["fuzzy"] + _stats["negative"]
+    return {
+        **_stats,
+        "local_rate": round(local / lookups, 3) if lookups else None,
+        "places": _index.count() if _index is not None else None,
+    }
+
+
+if __name__ == "__main__":
+    # Seed the index ahead of time: python -m lib.geocoding cities15000.txt
+    import sys
+
+    if len(sys.argv) != 2:
+        print("Usage: python -m lib.geocoding <gazetteer.csv | geonames cities.txt>")
+        sys.exit(1)
+    print(f"Geocoding index: {get_geocoding_index().seed(sys.argv[1])} places")
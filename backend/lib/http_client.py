@@ -0,0 +1,205 @@
+"""Shared outbound HTTP connection pool managed by the FastAPI lifespan"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+import httpx
+
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Pool sizing: total connections, idle connections kept alive, and how long they stay idle
+MAX_CONNECTIONS = 200
+MAX_KEEPALIVE_CONNECTIONS = 50
+KEEPALIVE_EXPIRY_SECONDS = 60.0
+
+# No single upstream (e.g. Nominatim) may take more than this many connections
+MAX_CONNECTIONS_PER_HOST = 20
+
+# Per-host limits and stats are kept for at most this many hosts; idle ones are dropped first
+MAX_TRACKED_HOSTS = 1000
+
+DEFAULT_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+
+
+class _HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.active = 0
+        self.waiting = 0
+        self.total_ms = 0.0
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body that frees the per-host slot once it is closed"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class PerHostLimitTransport(httpx.AsyncBaseTransport):
+    """Pooled transport with a per-host concurrency cap and request statistics.
+
+    A request holds its host's slot until its response body is closed. Waiting
+    for a slot is bounded by the request's pool timeout (httpx.PoolTimeout).
+    """
+
+    def __init__(
+        self,
+        max_per_host: int = MAX_CONNECTIONS_PER_HOST,
+        max_hosts: int = MAX_TRACKED_HOSTS,
+        **transport_kwargs: Any,
+    ):
+        self._transport = httpx.AsyncHTTPTransport(**transport_kwargs)
+        self._max_per_host = max_per_host
+        self._max_hosts = max_hosts
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.host_stats: "OrderedDict[str, _HostStats]" = OrderedDict()
+
+    def _host_slot(self, host: str):
+        """The semaphore and stats of a host, dropping idle hosts beyond max_hosts"""
+        stats = self.host_stats.get(host)
+        if stats is not None:
+            self.host_stats.move_to_end(host)
+            return self._semaphores[host], stats
+        stats = self.host_stats[host] = _HostStats()
+        semaphore = self._semaphores[host] = asyncio.Semaphore(self._max_per_host)
+        excess = len(self.host_stats) - self._max_hosts
+        if excess > 0:
+            idle = []
+            for name, other in self.host_stats.items():
+                if len(idle) == excess:
+                    break
+                if other.active == 0 and other.waiting == 0 and name != host:
+                    idle.append(name)
+            for name in idle:
+                del self.host_stats[name]
+                del self._semaphores[name]
+        return semaphore, stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        semaphore, stats = self._host_slot(request.url.host)
+        started = time.perf_counter()
+        if semaphore.locked():
+            timeout = request.extensions.get("timeout", {}).get("pool", DEFAULT_TIMEOUT.pool)
+            stats.waiting += 1
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout)
+            except asyncio.TimeoutError:
+                stats.errors += 1
+                raise httpx.PoolTimeout(
+                    f"No free connection slot for {request.url.host} within {timeout}s", request=request
+                )
+            finally:
+                stats.waiting -= 1
+        else:
+            await semaphore.acquire()
+        stats.requests += 1
+        stats.active += 1
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                stats.active -= 1
+                stats.total_ms += (time.perf_counter() - started) * 1000
+                semaphore.release()
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            stats.errors += 1
+            release()
+            raise
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, release),
+            extensions=response.extensions,
+        )
+
+    def connection_stats(self) -> Dict[str, int]:
+        connections = getattr(getattr(self._transport, "_pool", None), "connections", [])
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {"open": len(connections), "idle": idle, "in_use": len(connections) - idle}
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+_client: Optional[httpx.AsyncClient] = None
+_transport: Optional[PerHostLimitTransport] = None
+
+
+def init_http_client() -> httpx.AsyncClient:
+    """Create the shared AsyncClient (called once at startup)"""
+    global _client, _transport
+    if _client is not None:
+        return _client
+
+    _transport = PerHostLimitTransport(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+        ),
+    )
+    _client = httpx.AsyncClient(transport=_transport, timeout=DEFAULT_TIMEOUT)
+    return _client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared AsyncClient, creating it lazily if startup didn't"""
+    return _client or init_http_client()
+
+
+async def close_http_client():
+    """Close the shared AsyncClient (called once at shutdown)"""
+    global _client, _transport
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _transport = None
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Connection and per-host request statistics for the shared pool"""
+    if _transport is None:
+        return {"initialized": False}
+    return {
+        "initialized": True,
+        "http2": HTTP2_AVAILABLE,
+        "connections": _transport.connection_stats(),
+        "hosts": {
+            host: {
+                "requests": stats.requests,
+                "errors": stats.errors,
+                "active": stats.active,
+                "avg_ms": (
+                    round(stats.total_ms / (stats.requests - stats.active), 1)
+                    if stats.requests > stats.active
+                    else None
+                ),
+            }
+            for host, stats in _transport.host_stats.items()
+        },
+    }
@@ -0,0 +1,37 @@
+"""Process-wide async OpenAI client managed by the FastAPI lifespan"""
+from typing import Optional
+from openai import AsyncOpenAI
+from lib.config import get_openai_api_key
+
+_async_client: Optional[AsyncOpenAI] = None
+
+
+def init_openai_client() -> Optional[AsyncOpenAI]:
+    """Create the shared AsyncOpenAI client (called once at startup)"""
+    global _async_client
+    if _async_client is not None:
+        return _async_client
+
+    api_key = get_openai_api_key()
+    if not api_key:
+        print("Warning: OPENAI_API_KEY not found, async OpenAI client not initialized")
+        return None
+
+    _async_client = AsyncOpenAI(api_key=api_key)
+    return _async_client
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """Get the shared AsyncOpenAI client, creating it lazily if startup didn't"""
+    client = _async_client or init_openai_client()
+    if client is None:
+        raise ValueError("OPENAI_API_KEY not found in secrets or environment variables")
+    return client
+
+
+async def close_openai_client():
+    """Close the shared AsyncOpenAI client (called once at shutdown)"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
@@ -0,0 +1,86 @@
+"""On-disk cache of scrape_website results with HTTP revalidation"""
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+from lib.config import get_cache_dir
+from lib.disk_cache import DiskCache
+
+# Results are served without any network access for this long; after that,
+# entries with an ETag/Last-Modified are revalidated instead of re-rendered
+SCRAPE_CACHE_TTL_SECONDS = 10 * 60
+
+# Total size of cached results, least recently used entries are evicted first
+SCRAPE_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+_cache: Optional[DiskCache] = None
+_stats = {"hits": 0, "misses": 0, "revalidated": 0, "stores": 0}
+
+
+def _get_cache() -> DiskCache:
+    global _cache
+    if _cache is None:
+        _cache = DiskCache(os.path.join(get_cache_dir(), "scrape"), SCRAPE_CACHE_MAX_BYTES)
+    return _cache
+
+
+def scrape_cache_key(url: str, **options: Any) -> str:
+    """Key a scrape by its URL and every option that changes the result"""
+    return json.dumps({"url": url, **options}, sort_keys=True)
+
+
+async def get_cached_scrape(key: str) -> Optional[Dict[str, Any]]:
+    """Get a cache entry (fresh or stale) - check is_fresh before serving it as-is"""
+    return await _get_cache().aget_json(key)
+
+
+def is_fresh(entry: Dict[str, Any]) -> bool:
+    return time.time() - entry.get("stored_at", 0) < SCRAPE_CACHE_TTL_SECONDS
+
+
+def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Validators for a conditional request that revalidates a stale entry"""
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+async def store_scrape(key: str, result: Dict[str, Any], response_headers: Optional[Any] = None):
+    """Cache a successful scrape result along with the validators the origin sent"""
+    response_headers = response_headers or {}
+    if "no-store" in (response_headers.get("cache-control") or "").lower():
+        return
+    await _get_cache().aset_json(key, {
+        "result": result,
+        "stored_at": time.time(),
+        "etag": response_headers.get("etag"),
+        "last_modified": response_headers.get("last-modified"),
+    })
+    _stats["stores"] += 1
+
+
+async def mark_revalidated(key: str, entry: Dict[str, Any]):
+    """The origin answered 304 - the entry is fresh again"""
+    entry["stored_at"] = time.time()
+    await _get_cache().aset_json(key, entry)
+    _stats["revalidated"] += 1
+
+
+def record_hit():
+    _stats["hits"] += 1
+
+
+def record_miss():
+    _stats["misses"] += 1
+
+
+def get_scrape_cache_stats() -> Dict[str, Any]:
+    lookups = _stats["hits"] + _stats["revalidated"] + _stats["misses"]
+    return {
+        **_stats,
+        "hit_rate": round((_stats["hits"] + _stats["revalidated"]) / lookups, 3) if lookups else None,
+        "size_bytes": _cache.size if _cache is not None else 0,
+    }
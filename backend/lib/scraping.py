@@ -0,0 +1,103 @@
+"""Render profiles and readiness detection for Playwright scrapes"""
+from typing import Optional
+from urllib.parse import urlparse
+
+# Resource types each profile lets through; everything else is aborted
+# text:     markup and scripts only, enough for JavaScript-rendered text
+# no_media: also stylesheets, for layout-dependent content
+# full:     everything (images, fonts, media, trackers)
+RENDER_PROFILES = {
+    "text": {"document", "script", "xhr", "fetch", "eventsource", "websocket", "other"},
+    "no_media": {"document", "script", "xhr", "fetch", "eventsource", "websocket", "other", "stylesheet"},
+    "full": None,
+}
+DEFAULT_RENDER_PROFILE = "no_media"
+
+# Analytics, ads and tag managers never contribute page text
+TRACKER_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "facebook.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "segment.com",
+    "segment.io",
+    "mixpanel.com",
+    "amplitude.com",
+    "fullstory.com",
+    "newrelic.com",
+    "nr-data.net",
+    "optimizely.com",
+    "scorecardresearch.com",
+    "quantserve.com",
+    "criteo.com",
+    "taboola.com",
+    "outbrain.com",
+)
+
+# Readiness: consider the page rendered once the DOM has been quiet this long
+DOM_QUIET_MS = 500
+# ...but never wait longer than this for it to settle
+DOM_SETTLE_TIMEOUT_MS = 5000
+
+_WAIT_FOR_DOM_QUIET = """
+([quietMs, timeoutMs]) => new Promise((resolve) => {
+    let quietTimer = null;
+    const done = (settled) => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(deadline);
+        resolve(settled);
+    };
+    const observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => done(true), quietMs);
+    });
+    observer.observe(document.documentElement, {
+        childList: true, subtree: true, attributes: true, characterData: true,
+    });
+    quietTimer = setTimeout(() => done(true), quietMs);
+    const deadline = setTimeout(() => done(false), timeoutMs);
+})
+"""
+
+
+def normalize_render_profile(profile: Optional[str]) -> str:
+    return profile if profile in RENDER_PROFILES else DEFAULT_RENDER_PROFILE
+
+
+def is_tracker(url: str) -> bool:
+    host = urlparse(url).hostname or ""
+    return any(host == domain or host.endswith("." + domain) for domain in TRACKER_DOMAINS)
+
+
+async def apply_render_profile(page, profile: str):
+    """Abort requests the profile doesn't need before they hit the network"""
+    allowed = RENDER_PROFILES[profile]
+    if allowed is None:
+        return
+
+    async def handle_route(route):
+        request = route.request
+        if request.resource_type not in allowed or is_tracker(request.url):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await page.route("**/*", handle_route)
+
+
+async def wait_until_ready(page, wait_for_selector: Optional[str], timeout_ms: int):
+    """Wait for a selector if given, otherwise until DOM mutations go quiet"""
+    if wait_for_selector:
+        await page.wait_for_selector(wait_for_selector, timeout=timeout_ms)
+        return
+    settled = await page.evaluate(
+        _WAIT_FOR_DOM_QUIET,
+        [DOM_QUIET_MS, min(DOM_SETTLE_TIMEOUT_MS, timeout_ms)],
+    )
+    if not settled:
+        print(f"DOM still changing after {DOM_SETTLE_TIMEOUT_MS}ms, using current content")
@@ -1,10 +1,10 @@
-from typing import Optional, Dict
+from typing import Optional
 import secrets
-from datetime import datetime, timedelta
+from lib.session_store import get_session_store
 
-# Simple in-memory storage for demo purposes only.
-# In production, replace with a persistent/session store (Redis, database, etc.)
-session_store: Dict[str, "OAuthTokens"] = {}
+# Tokens live in the configured session store (SESSION_STORE_URL), so any
+# worker or node can serve any session
+TOKEN_KEY_PREFIX = "tokens:"
 
 
 class OAuthTokens:
@@ -45,20 +45,25 @@ def get_session_id(request) -> Optional[str]:
     return request.cookies.get("responses_starter_session_id")
 
 
-def save_token_set(session_id: str, token_set: OAuthTokens):
+async def save_token_set(session_id: str, token_set: OAuthTokens):
     """Save OAuth tokens for a session"""
-    session_store[session_id] = token_set
+    await get_session_store().set(TOKEN_KEY_PREFIX + session_id, token_set.to_dict())
 
 
-def get_token_set(session_id: Optional[str]) -> Optional[OAuthTokens]:
+async def get_token_set(session_id: Optional[str]) -> Optional[OAuthTokens]:
     """Get OAuth tokens for a session"""
     if not session_id:
         return None
-    return session_store.get(session_id)
+    data = await get_session_store().get(TOKEN_KEY_PREFIX + session_id)
+    return OAuthTokens(**data) if data else None
 
 
-def clear_session(session_id: Optional[str]):
-    """Clear session data"""
+async def clear_session(session_id: Optional[str]):
+    """Clear session data, including its cached tokens and scheduled refresh"""
+    # Imported here: connectors_auth depends on this module
+    from lib.connectors_auth import invalidate_cached_tokens
+
     if session_id:
-        session_store.pop(session_id, None)
+        await get_session_store().delete(TOKEN_KEY_PREFIX + session_id)
+        invalidate_cached_tokens(session_id)
 
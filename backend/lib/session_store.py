@@ -0,0 +1,229 @@
+"""
+Pluggable key-value store for per-session data (OAuth tokens, conversation state).
+
+The backend is selected with SESSION_STORE_URL:
+- memory://                    In-process LRU with TTL eviction (single worker only)
+- sqlite:///path/to/sessions.db  Local SQLite file in WAL mode (several workers on one node)
+- redis://host:6379/0          Any Redis-protocol server (several nodes, no sticky sessions)
+
+Values are JSON-serializable dicts. The store is used from async request
+handlers, so its methods are coroutines: SQLite calls run in a worker
+thread and Redis uses the asyncio client, keeping the event loop free.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from lib.config import get_session_store_url
+
+# Default lifetime of a session entry, matches the 7 day OAuth cookies
+DEFAULT_TTL_SECONDS = 60 * 60 * 24 * 7
+
+# Upper bound on entries kept by the in-memory store
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+class SessionStore:
+    """Interface implemented by every session store backend"""
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None):
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU store, entries expire after their TTL"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, default_ttl: int = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None):
+        expires_at = time.time() + (ttl or self.default_ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite store in WAL mode, shared by all workers on a node.
+    Queries run in worker threads, each with its own connection."""
+
+    # Expired rows are purged on roughly one write in this many
+    PURGE_EVERY = 100
+
+    def __init__(self, path: str, default_ttl: int = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._writes = 0
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Only ever used from this thread; close() may run on another one
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None):
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self._delete, key)
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT value FROM sessions WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _set(self, key: str, value: Dict[str, Any], ttl: Optional[int]):
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), now + (ttl or self.default_ttl)),
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+
+    def _delete(self, key: str):
+        self._connection().execute("DELETE FROM sessions WHERE key = ?", (key,))
+
+    async def close(self):
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        # Threads that used a closed connection open a new one
+        self._local = threading.local()
+
+
+class RedisSessionStore(SessionStore):
+    """Store backed by any Redis-protocol server, shared by all nodes"""
+
+    def __init__(self, url: str, default_ttl: int = DEFAULT_TTL_SECONDS, prefix: str = "responses_starter:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise ImportError(
+                "SESSION_STORE_URL uses redis:// but the redis package is not installed. "
+                "Install with: pip install redis"
+            )
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = await self._client.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None):
+        await self._client.set(self.prefix + key, json.dumps(value), ex=ttl or self.default_ttl)
+
+    async def delete(self, key: str):
+        await self._client.delete(self.prefix + key)
+
+    async def close(self):
+        await self._client.aclose()
+
+
+def create_session_store(url: str) -> SessionStore:
+    """Create a session store from a URL (memory://, sqlite:///path, redis://host)"""
+    parsed = urlparse(url)
+
+    if parsed.scheme in ("", "memory"):
+        # memory://?max_entries=50000
+        options = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        return MemorySessionStore(max_entries=int(options.get("max_entries", DEFAULT_MAX_ENTRIES)))
+    if parsed.scheme == "sqlite":
+        path = parsed.path
+        if parsed.netloc:
+            path = parsed.netloc + path
+        elif path.startswith("//"):
+            # sqlite:////abs/path.db
+            path = path[1:]
+        else:
+            # sqlite:///relative/path.db
+            path = path.lstrip("/")
+        return SQLiteSessionStore(path or "sessions.db")
+    if parsed.scheme in ("redis", "rediss", "unix"):
+        return RedisSessionStore(url)
+    raise ValueError(f"Unsupported SESSION_STORE_URL scheme: {parsed.scheme}")
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Get the process-wide session store, created from SESSION_STORE_URL on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                url = get_session_store_url()
+                _store = create_session_store(url)
+                print(f"Session store: {type(_store).__name__} ({urlparse(url).scheme or 'memory'})")
+    return _store
+
+
+async def close_session_store():
+    """Close the process-wide session store (called once at shutdown)"""
+    global _store
+    if _store is not None:
+        await _store.close()
+        _store = None
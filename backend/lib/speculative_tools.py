@@ -0,0 +1,136 @@
+"""Speculative execution of idempotent function tools (marked "speculative" in config/tools_list.py)"""
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from config.tools_list import tools_list
+
+_JSON_TYPES = {
+    "string": str,
+    "boolean": bool,
+    "integer": int,
+    "number": (int, float),
+    "array": list,
+    "object": dict,
+}
+
+_stats = {"started": 0, "reused": 0, "discarded": 0}
+
+
+def _get_tool(tool_name: str) -> Optional[Dict[str, Any]]:
+    for tool in tools_list:
+        if tool["name"] == tool_name:
+            return tool
+    return None
+
+
+def is_speculative(tool_name: str) -> bool:
+    """Whether a tool may run before the model has finished its call"""
+    tool = _get_tool(tool_name)
+    return bool(tool and tool.get("speculative"))
+
+
+def _matches(schema: Dict[str, Any], value: Any) -> bool:
+    expected = _JSON_TYPES.get(schema.get("type"))
+    if expected is not None:
+        # bool is an int in Python, but not a JSON integer
+        if not isinstance(value, expected) or (isinstance(value, bool) and schema["type"] != "boolean"):
+            return False
+    if "enum" in schema and value not in schema["enum"]:
+        return False
+    if isinstance(value, list) and "items" in schema:
+        return all(_matches(schema["items"], item) for item in value)
+    return True
+
+
+def validate_arguments(tool_name: str, arguments: Any) -> bool:
+    """Check arguments against the tool's strict schema: every parameter present, no others"""
+    tool = _get_tool(tool_name)
+    if tool is None or not isinstance(arguments, dict):
+        return False
+    parameters = tool["parameters"]
+    if set(arguments) != set(parameters):
+        return False
+    return all(_matches(parameters[name], value) for name, value in arguments.items())
+
+
+class SpeculativeCalls:
+    """Start function calls from their streamed arguments, for one model response.
+
+    Feed every stream event to observe(). Once the arguments of a speculative
+    tool form a complete, schema-valid object, run(name, arguments) starts as
+    a task while the model keeps streaming. take(item) hands the task over when
+    the item is done, if the final arguments are the ones it started with;
+    otherwise the task is cancelled and the call runs normally.
+    """
+
+    def __init__(self, run: Callable[[str, Dict[str, Any]], Awaitable[Any]]):
+        self._run = run
+        self._streaming: Dict[str, Tuple[str, List[str]]] = {}
+        self._started: Dict[str, Tuple[Dict[str, Any], asyncio.Task]] = {}
+
+    def observe(self, event_type: str, event: Dict[str, Any]):
+        if event_type == "response.output_item.added":
+            item = event.get("item") or {}
+            if item.get("type") == "function_call" and is_speculative(item.get("name")):
+                self._streaming[item.get("id")] = (item.get("name"), [])
+        elif event_type == "response.function_call_arguments.delta":
+            streaming = self._streaming.get(event.get("item_id"))
+            if streaming is None:
+                return
+            delta = event.get("delta") or ""
+            streaming[1].append(delta)
+            # An object can only be complete at a closing brace, so only then try to parse it
+            if delta.rstrip().endswith("}"):
+                self._try_start(event.get("item_id"), "".join(streaming[1]))
+        elif event_type == "response.function_call_arguments.done":
+            if event.get("item_id") in self._streaming:
+                self._try_start(event.get("item_id"), event.get("arguments") or "")
+
+    def _try_start(self, item_id: str, arguments_json: str):
+        name, _ = self._streaming[item_id]
+        try:
+            arguments = json.loads(arguments_json)
+        except json.JSONDecodeError:
+            return
+        if not validate_arguments(name, arguments):
+            return
+        del self._streaming[item_id]
+        print(f"Speculatively starting {name} {arguments}")
+        _stats["started"] += 1
+        self._started[item_id] = (arguments, asyncio.create_task(self._run(name, arguments)))
+
+    def take(self, item: Dict[str, Any]) -> Optional[asyncio.Task]:
+        """The task started for a completed function_call item, if its final arguments match"""
+        self._streaming.pop(item.get("id"), None)
+        started = self._started.pop(item.get("id"), None)
+        if started is None:
+            return None
+        arguments, task = started
+        try:
+            final_arguments = json.loads(item.get("arguments") or "{}")
+        except json.JSONDecodeError:
+            final_arguments = None
+        if final_arguments != arguments:
+            print(f"Discarding speculative {item.get('name')}: final arguments differ")
+            _discard(task)
+            return None
+        _stats["reused"] += 1
+        return task
+
+    def cancel_all(self):
+        """Drop calls the model never completed (e.g. the stream failed)"""
+        for _, task in self._started.values():
+            _discard(task)
+        self._started.clear()
+        self._streaming.clear()
+
+
+def _discard(task: asyncio.Task):
+    _stats["discarded"] += 1
+    task.cancel()
+    # A result nobody will read must not be reported as an unretrieved exception
+    task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+
+def get_speculation_stats() -> Dict[str, int]:
+    return dict(_stats)
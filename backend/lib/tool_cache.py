@@ -0,0 +1,204 @@
+"""Declarative TTL/LRU result cache for function tools (policies live in config/tools_list.py)"""
+import asyncio
+import functools
+import inspect
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from fastapi.responses import Response
+from config.tools_list import tools_list
+from lib.config import get_cache_dir
+from lib.disk_cache import DiskCache
+
+# In-memory tier: most recently used results across all tools
+MEMORY_MAX_ENTRIES = 1000
+
+# On-disk tier: survives restarts and is shared by workers on one node
+DISK_MAX_BYTES = 50 * 1024 * 1024
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Argument normalizers a policy can name in its "key" mapping
+NORMALIZERS: Dict[str, Callable[[Any], Any]] = {
+    "exact": lambda value: value,
+    "lower": lambda value: str(value).strip().lower() if value is not None else None,
+    # Case-folded with collapsed whitespace: "  New  York" and "new york" share an entry
+    "casefold": lambda value: _WHITESPACE.sub(" ", str(value)).strip().casefold() if value is not None else None,
+}
+
+
+# Time buckets a policy can add to its key with "per", for results that depend on the current time
+TIME_BUCKETS: Dict[str, Callable[[], str]] = {
+    "utc_hour": lambda: time.strftime("%Y-%m-%dT%H", time.gmtime(time.time())),
+}
+
+
+class _ToolStats:
+    def __init__(self):
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.saved_ms = 0.0
+
+
+_memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_disk: Optional[DiskCache] = None
+_inflight: Dict[str, asyncio.Task] = {}
+_stats: Dict[str, _ToolStats] = {}
+
+
+def _get_disk() -> DiskCache:
+    global _disk
+    if _disk is None:
+        _disk = DiskCache(os.path.join(get_cache_dir(), "tools"), DISK_MAX_BYTES)
+    return _disk
+
+
+def get_cache_policy(tool_name: str) -> Optional[Dict[str, Any]]:
+    """The "cache" entry of a tool in tools_list, or None if its results aren't cached"""
+    for tool in tools_list:
+        if tool["name"] == tool_name:
+            return tool.get("cache")
+    return None
+
+
+def _make_key(tool_name: str, policy: Dict[str, Any], arguments: Dict[str, Any]) -> str:
+    spec = policy.get("key")
+    if spec is None:
+        spec = {name: "exact" for name in arguments}
+    normalized = {name: NORMALIZERS[normalizer](arguments.get(name)) for name, normalizer in spec.items()}
+    if policy.get("per"):
+        # A new bucket is a new entry: nothing from a previous bucket is served, not even stale
+        normalized["_per"] = TIME_BUCKETS[policy["per"]]()
+    return f"{tool_name}:{json.dumps(normalized, sort_keys=True, default=str)}"
+
+
+async def _lookup(key: str) -> Optional[Dict[str, Any]]:
+    entry = _memory.get(key)
+    if entry is not None:
+        _memory.move_to_end(key)
+        return entry
+    entry = await _get_disk().aget_json(key)
+    if entry is not None:
+        _remember(key, entry)
+    return entry
+
+
+def _remember(key: str, entry: Dict[str, Any]):
+    _memory[key] = entry
+    _memory.move_to_end(key)
+    while len(_memory) > MEMORY_MAX_ENTRIES:
+        _memory.popitem(last=False)
+
+
+async def _store(key: str, entry: Dict[str, Any]):
+    _remember(key, entry)
+    try:
+        await _get_disk().aset_json(key, entry)
+    except (OSError, TypeError) as e:
+        print(f"Warning: could not write tool cache entry to disk: {e}")
+
+
+def _compute(key: str, call: Callable[[], Any]) -> asyncio.Task:
+    """Run the tool once per key at a time; concurrent callers share the result"""
+    task = _inflight.get(key)
+    if task is not None:
+        return task
+
+    async def run():
+        started = time.perf_counter()
+        try:
+            result = await call()
+        finally:
+            _inflight.pop(key, None)
+        # Error responses (JSONResponse) are never cached
+        if not isinstance(result, Response):
+            await _store(key, {
+                "value": result,
+                "stored_at": time.time(),
+                "elapsed_ms": (time.perf_counter() - started) * 1000,
+            })
+        return result
+
+    task = _inflight[key] = asyncio.create_task(run())
+    return task
+
+
+def _refresh_in_background(key: str, call: Callable[[], Any]):
+    task = _compute(key, call)
+
+    def log_failure(done: asyncio.Task):
+        if not done.cancelled() and done.exception() is not None:
+            print(f"Background refresh of {key} failed: {done.exception()}")
+
+    task.add_done_callback(log_failure)
+
+
+def cached_tool(tool_name: str):
+    """Cache a tool endpoint's results according to its policy in tools_list.
+
+    A policy has a "ttl" (seconds a result is served as-is), an optional
+    "stale_ttl" (seconds after that during which the old result is still served
+    while a refresh runs in the background) and an optional "key" mapping of
+    argument name to normalizer; arguments not in "key" don't affect the entry.
+    An optional "per" names a TIME_BUCKETS entry that is added to the key.
+    """
+    policy = get_cache_policy(tool_name)
+
+    def decorator(fn):
+        if policy is None:
+            return fn
+        signature = inspect.signature(fn)
+        stats = _stats.setdefault(tool_name, _ToolStats())
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            arguments = signature.bind(*args, **kwargs).arguments
+            key = _make_key(tool_name, policy, arguments)
+            call = functools.partial(fn, *args, **kwargs)
+
+            entry = await _lookup(key)
+            if entry is not None:
+                age = time.time() - entry["stored_at"]
+                if age < policy["ttl"]:
+                    stats.hits += 1
+                    stats.saved_ms += entry.get("elapsed_ms", 0)
+                    return entry["value"]
+                if age < policy["ttl"] + policy.get("stale_ttl", 0):
+                    stats.stale_hits += 1
+                    stats.saved_ms += entry.get("elapsed_ms", 0)
+                    if key not in _inflight:
+                        stats.refreshes += 1
+                        _refresh_in_background(key, call)
+                    return entry["value"]
+
+            stats.misses += 1
+            return await asyncio.shield(_compute(key, call))
+
+        return wrapper
+
+    return decorator
+
+
+def get_tool_cache_stats() -> Dict[str, Any]:
+    """Per-tool hit rate and time saved by serving cached results"""
+    tools = {}
+    for tool_name, stats in _stats.items():
+        lookups = stats.hits + stats.stale_hits + stats.misses
+        tools[tool_name] = {
+            "hits": stats.hits,
+            "stale_hits": stats.stale_hits,
+            "misses": stats.misses,
+            "background_refreshes": stats.refreshes,
+            "hit_rate": round((stats.hits + stats.stale_hits) / lookups, 3) if lookups else None,
+            "latency_saved_ms": round(stats.saved_ms),
+        }
+    return {
+        "memory_entries": len(_memory),
+        "disk_bytes": _disk.size if _disk is not None else 0,
+        "tools": tools,
+    }
@@ -0,0 +1,66 @@
+"""Server-side execution of function tools defined in config/tools_list.py"""
+import json
+from typing import Any, Dict
+from fastapi.responses import Response
+from api import functions
+
+
+async def get_weather(location: str = "", unit: str = "celsius", **kwargs):
+    return await functions.get_weather(location=location, unit=unit)
+
+
+async def get_joke(**kwargs):
+    return await functions.get_joke()
+
+
+async def scrape_website(
+    url: str = "",
+    wait_for_js=None,
+    wait_timeout=None,
+    render_profile=None,
+    wait_for_selector=None,
+    **kwargs,
+):
+    return await functions.scrape_website(
+        url=url,
+        wait_for_js=wait_for_js,
+        wait_timeout=wait_timeout,
+        render_profile=render_profile,
+        wait_for_selector=wait_for_selector or None,
+    )
+
+
+async def scrape_websites(urls=None, wait_for_js=None, render_profile=None, **kwargs):
+    results = [
+        result
+        async for result in functions.scrape_websites_stream(
+            urls or [],
+            wait_for_js=wait_for_js,
+            render_profile=render_profile,
+        )
+    ]
+    # The model reads pages in the order it asked for them
+    return {"results": sorted(results, key=lambda result: result["index"])}
+
+
+# One function per tool in tools_list - parameters are passed as keyword arguments
+functions_map = {
+    "get_weather": get_weather,
+    "get_joke": get_joke,
+    "scrape_website": scrape_website,
+    "scrape_websites": scrape_websites,
+}
+
+
+async def handle_tool(tool_name: str, parameters: Dict[str, Any]) -> Any:
+    """Run a function tool and return its JSON-serializable result"""
+    print(f"Handle tool {tool_name} {parameters}")
+    if tool_name not in functions_map:
+        raise ValueError(f"Unknown tool: {tool_name}")
+
+    result = await functions_map[tool_name](**(parameters or {}))
+
+    # Endpoints report errors as JSONResponse - unwrap them into plain dicts
+    if isinstance(result, Response):
+        return json.loads(result.body)
+    return result
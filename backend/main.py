@@ -1,7 +1,7 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-import os
 
 from api import (
     turn_response,
@@ -12,8 +12,33 @@ from api import (
     functions,
     container_files,
 )
+from lib.openai_client import init_openai_client, close_openai_client
+from lib.session_store import get_session_store, close_session_store
+from lib.http_client import init_http_client, close_http_client, get_pool_stats
+from lib.browser_pool import start_browser_pool, stop_browser_pool, get_browser_pool_stats
+from lib.scrape_cache import get_scrape_cache_stats
+from lib.tool_cache import get_tool_cache_stats
+from lib.geocoding import get_geocoding_index, close_geocoding_index, get_geocoding_stats
+from lib.speculative_tools import get_speculation_stats
 
-app = FastAPI(title="OpenAI Responses Starter App Backend")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared clients on startup and release them on shutdown"""
+    init_openai_client()
+    init_http_client()
+    get_session_store()
+    get_geocoding_index()
+    await start_browser_pool()
+    yield
+    await stop_browser_pool()
+    await close_openai_client()
+    await close_http_client()
+    await close_session_store()
+    close_geocoding_index()
+
+
+app = FastAPI(title="OpenAI Responses Starter App Backend", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -47,6 +72,18 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/stats")
+async def stats():
+    return {
+        "http_pool": get_pool_stats(),
+        "browser_pool": get_browser_pool_stats(),
+        "scrape_cache": get_scrape_cache_stats(),
+        "tool_cache": get_tool_cache_stats(),
+        "geocoding": await asyncio.to_thread(get_geocoding_stats),
+        "speculative_tools": get_speculation_stats(),
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,44 @@
+from lib.content_extraction import extract_html
+
+ARTICLE = "<p>" + "The quick brown fox jumps over the lazy dog. " * 5 + "</p>"
+
+
+def test_wordpress_body_classes_do_not_hide_the_article():
+    html = (
+        '<html><body class="post-template-default single has-sidebar">'
+        '<nav><a href="/">Home</a></nav>'
+        f"<main><article><h1>Title</h1>{ARTICLE}</article></main>"
+        '<footer>Copyright</footer></body></html>'
+    )
+    result = extract_html(html, "https://example.com/post")
+    assert "# Title" in result["text"]
+    assert "quick brown fox" in result["text"]
+    assert "Copyright" not in result["text"]
+
+
+def test_container_tags_ignore_boilerplate_ids():
+    html = f'<main id="main-menu-wrapper"><article class="post has-sidebar">{ARTICLE}</article></main>'
+    assert "quick brown fox" in extract_html(html, "https://example.com")["text"]
+
+
+def test_aspnet_form_wrapper_is_kept():
+    html = f'<html><body><form id="aspnetForm" method="post"><div class="content">{ARTICLE}</div></form></body></html>'
+    assert "quick brown fox" in extract_html(html, "https://example.com")["text"]
+
+
+def test_falls_back_to_visible_text_when_everything_is_filtered():
+    html = (
+        '<body><div class="page-wrapper sidebar-layout">'
+        "<p>Only paragraph on the page.</p><script>var hidden = 1;</script>"
+        '<p hidden>Not shown</p></div></body>'
+    )
+    result = extract_html(html, "https://example.com")
+    assert result["text"] == "Only paragraph on the page."
+
+
+def test_boilerplate_still_removed_next_to_content():
+    html = f'<body><div class="sidebar">Related posts</div><div>{ARTICLE}</div><script>x()</script></body>'
+    text = extract_html(html, "https://example.com")["text"]
+    assert "quick brown fox" in text
+    assert "Related posts" not in text
+    assert "x()" not in text
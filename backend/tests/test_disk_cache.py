@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from lib.disk_cache import DiskCache
+
+
+def test_evicts_least_recently_used_down_to_the_low_water_mark(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1000)
+    for i in range(10):
+        cache.set_bytes(f"k{i}", b"x" * 100)
+    assert cache.size == 1000
+    cache.get_bytes("k0")
+
+    cache.set_bytes("k10", b"x" * 100)
+    # 1100 bytes -> evicted to 900: k1 and k2 go, k0 was just read
+    assert cache.size == 900
+    assert cache.get_bytes("k0") is not None
+    assert cache.get_bytes("k1") is None and cache.get_bytes("k2") is None
+    assert cache.get_bytes("k3") is not None
+
+    # There is room again, so the next write evicts nothing
+    cache.set_bytes("k11", b"x" * 100)
+    assert cache.size == 1000
+
+
+def test_index_is_rebuilt_from_the_directory(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1000)
+    cache.set_json("a", {"n": 1})
+    cache.set_bytes("b", b"x" * 10)
+    cache.delete("b")
+    reopened = DiskCache(str(tmp_path), max_bytes=1000)
+    assert reopened.size == cache.size
+    assert reopened.get_json("a") == {"n": 1}
+
+
+def test_async_writer_only_publishes_complete_files(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1000)
+
+    async def run():
+        async with cache.open_for_write_async("done") as f:
+            await f.write(b"abc")
+            await f.write(b"def")
+        with pytest.raises(IOError):
+            async with cache.open_for_write_async("broken") as f:
+                await f.write(b"abc")
+                raise IOError("download ended early")
+        assert (await cache.aget_path("done")).read_bytes() == b"abcdef"
+        assert await cache.aget_path("broken") is None
+
+    asyncio.run(run())
+    assert cache.size == 6
+    assert not list(tmp_path.glob("*/.tmp-*"))
@@ -0,0 +1,54 @@
+import asyncio
+import os
+import lib.geocoding as geocoding
+from lib.geocoding import GeocodingIndex
+
+
+def make_index(tmp_path, rows):
+    gazetteer = tmp_path / "places.csv"
+    gazetteer.write_text("name,lat,lon,population\n" + "".join(f"{row}\n" for row in rows), encoding="utf-8")
+    index = GeocodingIndex(str(tmp_path / "geocoding.db"))
+    return index, str(gazetteer)
+
+
+def test_fuzzy_match_keeps_the_qualifier(tmp_path):
+    index, gazetteer = make_index(tmp_path, ['"Saint Petersburg, ru",59.9,30.3,5000000'])
+    index.seed(gazetteer)
+    assert index.lookup("Saint Petersbrug, RU") == ((59.9, 30.3), "fuzzy")
+    assert index.lookup("Saint Petersburg, FL") == (None, "miss")
+
+
+def test_gazetteer_loads_after_nominatim_answers_were_cached(tmp_path):
+    index, gazetteer = make_index(tmp_path, ["Springfield,39.8,-89.6,100000"])
+    index.add("Springfield", None, "nominatim")
+    index.add("Somewhere", (1.0, 2.0), "nominatim")
+    assert not index.is_seeded_from(gazetteer)
+
+    index.seed(gazetteer)
+    assert index.is_seeded_from(gazetteer)
+    assert index.lookup("springfield") == ((39.8, -89.6), "exact")
+
+    with open(gazetteer, "a", encoding="utf-8") as f:
+        f.write("Shelbyville,39.4,-88.8,5000\n")
+    os.utime(gazetteer, ns=(0, 0))
+    assert not index.is_seeded_from(gazetteer)
+    index.close()
+
+
+def test_geocode_remembers_nominatim_answers(tmp_path, monkeypatch):
+    index = GeocodingIndex(str(tmp_path / "geocoding.db"))
+    queries = []
+
+    async def query_nominatim(location):
+        queries.append(location)
+        return (48.85, 2.35)
+
+    monkeypatch.setattr(geocoding, "get_geocoding_index", lambda: index)
+    monkeypatch.setattr(geocoding, "_query_nominatim", query_nominatim)
+
+    async def run():
+        return [await geocoding.geocode("Paris"), await geocoding.geocode("paris")]
+
+    assert asyncio.run(run()) == [(48.85, 2.35), (48.85, 2.35)]
+    assert queries == ["Paris"]
+    index.close()
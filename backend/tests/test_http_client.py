@@ -0,0 +1,42 @@
+import asyncio
+import httpx
+import pytest
+from lib.http_client import PerHostLimitTransport
+
+
+def make_client(**kwargs):
+    transport = PerHostLimitTransport(**kwargs)
+    transport._transport = httpx.MockTransport(lambda request: httpx.Response(200, content=b"ok"))
+    return transport, httpx.AsyncClient(transport=transport)
+
+
+def test_waiting_for_a_host_slot_times_out():
+    transport, client = make_client(max_per_host=1)
+
+    async def run():
+        async with client.stream("GET", "https://slow.test/file"):
+            # The open body holds the only slot for the host
+            with pytest.raises(httpx.PoolTimeout):
+                await client.get("https://slow.test/other", timeout=httpx.Timeout(5.0, pool=0.05))
+            response = await client.get("https://other.test/")
+            assert response.status_code == 200
+        assert (await client.get("https://slow.test/other")).status_code == 200
+        await client.aclose()
+
+    asyncio.run(run())
+    assert transport.host_stats["slow.test"].errors == 1
+
+
+def test_idle_hosts_are_dropped_beyond_the_limit():
+    transport, client = make_client(max_hosts=3)
+
+    async def run():
+        async with client.stream("GET", "https://busy.test/"):
+            for i in range(10):
+                await client.get(f"https://host{i}.test/")
+            # The host with an open response is kept even though it is the oldest
+            assert list(transport.host_stats) == ["busy.test", "host8.test", "host9.test"]
+        await client.aclose()
+
+    asyncio.run(run())
+    assert set(transport._semaphores) == set(transport.host_stats)
@@ -0,0 +1,75 @@
+import asyncio
+import time
+import pytest
+from lib.session_store import MemorySessionStore, SQLiteSessionStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        store = MemorySessionStore(max_entries=2)
+    else:
+        store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    yield store
+    asyncio.run(store.close())
+
+
+def test_round_trip(store):
+    async def run():
+        assert await store.get("tokens:a") is None
+        await store.set("tokens:a", {"access_token": "x", "expires_at": 1})
+        assert await store.get("tokens:a") == {"access_token": "x", "expires_at": 1}
+        await store.set("tokens:a", {"access_token": "y"})
+        assert await store.get("tokens:a") == {"access_token": "y"}
+        await store.delete("tokens:a")
+        assert await store.get("tokens:a") is None
+
+    asyncio.run(run())
+
+
+def test_entries_expire_after_their_ttl(store, monkeypatch):
+    async def run():
+        await store.set("conversation:a", {"last_response_id": "resp_1"}, ttl=60)
+        await store.set("conversation:b", {"last_response_id": "resp_2"})
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 61)
+        assert await store.get("conversation:a") is None
+        assert await store.get("conversation:b") == {"last_response_id": "resp_2"}
+
+    asyncio.run(run())
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemorySessionStore(max_entries=2)
+
+    async def run():
+        await store.set("a", {"n": 1})
+        await store.set("b", {"n": 2})
+        await store.get("a")
+        await store.set("c", {"n": 3})
+        assert await store.get("b") is None
+        assert await store.get("a") == {"n": 1}
+
+    asyncio.run(run())
+
+
+def test_redis_store_sets_ttls_and_closes():
+    fakeredis = pytest.importorskip("fakeredis")
+    from lib.session_store import RedisSessionStore
+
+    store = RedisSessionStore("redis://localhost:6379/0", default_ttl=3600)
+    store._client = fakeredis.FakeAsyncRedis()
+
+    async def run():
+        assert await store.get("tokens:a") is None
+        await store.set("tokens:a", {"access_token": "x"}, ttl=60)
+        await store.set("conversation:b", {"last_response_id": "resp_1"})
+        assert await store.get("tokens:a") == {"access_token": "x"}
+        assert 0 < await store._client.ttl(store.prefix + "tokens:a") <= 60
+        assert 60 < await store._client.ttl(store.prefix + "conversation:b") <= 3600
+        await store.delete("tokens:a")
+        assert await store.get("tokens:a") is None
+        assert await store.get("conversation:b") == {"last_response_id": "resp_1"}
+        await store.close()
+
+    asyncio.run(run())
@@ -0,0 +1,17 @@
+import time
+from lib.tool_cache import _make_key, get_cache_policy
+
+
+def test_weather_entries_are_keyed_by_the_current_utc_hour(monkeypatch):
+    policy = get_cache_policy("get_weather")
+    arguments = {"location": "  New  York", "unit": "Celsius"}
+    now = 1_700_000_000 - 1_700_000_000 % 3600
+
+    monkeypatch.setattr(time, "time", lambda: now + 10)
+    key = _make_key("get_weather", policy, arguments)
+    assert key == _make_key("get_weather", policy, {"location": "new york", "unit": "celsius"})
+
+    monkeypatch.setattr(time, "time", lambda: now + 3599)
+    assert _make_key("get_weather", policy, arguments) == key
+    monkeypatch.setattr(time, "time", lambda: now + 3600)
+    assert _make_key("get_weather", policy, arguments) != key
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import pytest
+import api.turn_response as turn_response
+
+
+class FakeEvent:
+    def __init__(self, data):
+        self.data = data
+
+    def model_dump(self):
+        return self.data
+
+
+class FakeStream:
+    def __init__(self, events):
+        self.events = events
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for event in self.events:
+            yield FakeEvent(event)
+
+    async def close(self):
+        pass
+
+
+class FakeResponses:
+    """Answers every request with a get_joke call, numbering the responses"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        number = len(self.requests)
+        call = {
+            "type": "function_call",
+            "id": f"fc_{number}",
+            "call_id": f"call_{number}",
+            "name": "get_joke",
+            "arguments": "{}",
+        }
+        return FakeStream([
+            {"type": "response.output_item.done", "item": call},
+            {"type": "response.completed", "response": {"id": f"resp_{number}"}},
+        ])
+
+
+@pytest.fixture
+def responses(monkeypatch):
+    responses = FakeResponses()
+    tool_calls = []
+
+    async def handle_tool(name, arguments):
+        tool_calls.append(name)
+        return {"joke": "ok"}
+
+    async def get_tools(tools_state, request):
+        return []
+
+    monkeypatch.setattr(turn_response, "get_async_openai_client", lambda: type("Client", (), {"responses": responses})())
+    monkeypatch.setattr(turn_response, "handle_tool", handle_tool)
+    monkeypatch.setattr(turn_response, "get_tools", get_tools)
+    monkeypatch.setattr(turn_response, "MAX_TOOL_STEPS", 2)
+    responses.tool_calls = tool_calls
+    return responses
+
+
+def run_turn(**kwargs):
+    async def collect():
+        return [chunk async for chunk in turn_response.generate_stream(request=None, **kwargs)]
+
+    events = []
+    for chunk in asyncio.run(collect()):
+        if chunk.startswith("data: "):
+            events.append(json.loads(chunk[len("data: "):]))
+    return events
+
+
+def test_last_step_ends_the_turn_without_running_tools(responses):
+    events = run_turn(messages=[{"role": "user", "content": "jokes"}], tools_state={"serverToolExecution": True})
+
+    names = [event.get("event") for event in events]
+    assert len(responses.requests) == 2
+    # Only the first step's call runs; the second step's would never reach the model
+    assert responses.tool_calls == ["get_joke"]
+    assert names.count("function_call_output.done") == 1
+    assert events[-1] == {"event": "turn.step_limit", "data": {"max_steps": 2, "call_ids": ["call_2"]}}
+
+
+def test_chaining_after_the_step_limit_uses_the_clients_response_id(responses):
+    from lib.conversation_state import save_last_response_id, get_last_response_id
+
+    asyncio.run(save_last_response_id("conv", "resp_previous_turn"))
+    events = run_turn(
+        messages=[{"role": "user", "content": "jokes"}],
+        tools_state={"serverToolExecution": True},
+        conversation_id="conv",
+        previous_response_id="resp_previous_turn",
+    )
+    assert events[-1]["event"] == "turn.step_limit"
+    # The last step still has an unanswered call, so it is not recorded
+    assert asyncio.run(get_last_response_id("conv")) == "resp_previous_turn"
+
+    # The client chains its next turn on the last response it saw, answering that call
+    output = {"type": "function_call_output", "call_id": "call_2", "output": "{}"}
+    run_turn(
+        messages=[output, {"role": "user", "content": "more"}],
+        tools_state={"serverToolExecution": True},
+        conversation_id="conv",
+        previous_response_id="resp_2",
+    )
+    assert responses.requests[2]["previous_response_id"] == "resp_2"
+    assert responses.requests[2]["input"][0] == output
@@ -0,0 +1,128 @@
+"""
+SSE decoding throughput: previous string/bytes buffering vs lib.sse.SSEDecoder.
+
+Replays a recorded /api/turn_response stream, cut into network-sized chunks,
+through each parser and checks they all decode the same events. Without
+--file a stream shaped like a real turn is generated: text deltas, output
+items and a large tool output (a scraped page) that spans many chunks.
+
+Record a real stream with:
+    curl -N -X POST localhost:8000/api/turn_response -H 'Content-Type: application/json' \\
+        -d '{"messages": [{"role": "user", "content": "hi"}], "toolsState": {}}' > stream.sse
+
+Run from the frontend directory:
+    python -m benchmarks.sse_decoder --events 20000
+    python -m benchmarks.sse_decoder --file stream.sse
+"""
+import argparse
+import json
+import random
+import time
+
+from lib.sse import iter_sse_events
+
+
+def generate_stream(events: int, tool_output_bytes: int) -> bytes:
+    parts = []
+    for i in range(events):
+        if i == events // 2:
+            payload = {
+                "event": "function_call_output.done",
+                "data": {"item_id": "fc_1", "item": {"type": "function_call_output", "output": "x" * tool_output_bytes}},
+            }
+        elif i % 500 == 0:
+            payload = {"event": "response.output_item.added", "data": {"item": {"id": f"msg_{i}", "type": "message"}}}
+        else:
+            payload = {"event": "response.output_text.delta", "data": {"delta": f" token{i}", "item_id": "msg_1"}}
+        parts.append(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+    return b"".join(parts)
+
+
+def chunk_stream(raw: bytes, max_chunk: int, seed: int = 0):
+    rng = random.Random(seed)
+    chunks = []
+    i = 0
+    while i < len(raw):
+        size = rng.randint(1, max_chunk)
+        chunks.append(raw[i:i + size])
+        i += size
+    return chunks
+
+
+def accumulate_then_split(chunks):
+    """The old realtime path: raw_content += chunk, then split the whole content"""
+    raw_content = b""
+    for chunk in chunks:
+        raw_content += chunk
+    events = []
+    for message in raw_content.decode("utf-8").split("\n\n"):
+        for line in message.split("\n"):
+            line = line.strip()
+            if line.startswith("data: "):
+                events.append(line[6:].strip())
+    return events
+
+
+def string_resplit(chunks):
+    """Incremental str buffer that re-splits the whole buffer on every chunk"""
+    buffer = ""
+    events = []
+    for chunk in chunks:
+        buffer += chunk.decode("utf-8", "ignore")
+        messages = buffer.split("\n\n")
+        buffer = messages.pop()
+        for message in messages:
+            for line in message.split("\n"):
+                if line.startswith("data: "):
+                    events.append(line[6:])
+    return events
+
+
+def sse_decoder(chunks):
+    return [event.data for event in iter_sse_events(chunks)]
+
+
+PARSERS = {
+    "accumulate_then_split": accumulate_then_split,
+    "string_resplit": string_resplit,
+    "SSEDecoder": sse_decoder,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000, help="Events in the generated stream")
+    parser.add_argument("--tool-output-kb", type=int, default=2048, help="Size of the large tool output event")
+    parser.add_argument("--chunk", type=int, default=1400, help="Maximum bytes per network chunk")
+    parser.add_argument("--file", help="Replay a recorded SSE stream instead of generating one")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per parser (best is reported)")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, "rb") as f:
+            raw = f.read()
+    else:
+        raw = generate_stream(args.events, args.tool_output_kb * 1024)
+    chunks = chunk_stream(raw, args.chunk)
+    print(f"Stream: {len(raw) / 1e6:.1f} MB in {len(chunks)} chunks")
+
+    expected = None
+    for name, parse in PARSERS.items():
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            events = parse(chunks)
+            best = min(best, time.perf_counter() - started)
+        # The multi-line aware decoder must agree with the simple parsers on this stream
+        if expected is None:
+            expected = events
+        elif events != expected:
+            raise SystemExit(f"{name} decoded different events")
+        print(
+            f"{name:>22}: {len(events)} events in {best * 1000:8.1f} ms "
+            f"({len(events) / best:10.0f} events/s, {len(raw) / best / 1e6:7.1f} MB/s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
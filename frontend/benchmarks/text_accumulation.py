@@ -0,0 +1,77 @@
+"""
+Streamed text accumulation: per-delta string concatenation vs lib.text_buffer.TextBuffer.
+
+Simulates a long answer arriving as small deltas. The concatenation strategy
+is what the handlers in lib/assistant.py used to do (the text lives in a
+message dict, so every delta copies the whole text); TextBuffer appends the
+delta and joins only when the text is read. --render-every materializes the
+buffer every N deltas, as the throttled live view does while streaming.
+
+Run from the frontend directory:
+    python -m benchmarks.text_accumulation --tokens 50000
+    python -m benchmarks.text_accumulation --tokens 50000 --render-every 200
+"""
+import argparse
+import random
+import time
+
+from lib.text_buffer import TextBuffer
+
+
+def generate_deltas(tokens: int, seed: int = 0):
+    rng = random.Random(seed)
+    words = ["the", "stream", "of", "tokens", "response", "function", "output", "value", "\n", "```", "data"]
+    return [" " + rng.choice(words) for _ in range(tokens)]
+
+
+def concatenate(deltas, render_every):
+    message = {"content": [{"type": "output_text", "text": ""}]}
+    part = message["content"][0]
+    for i, delta in enumerate(deltas, 1):
+        part["text"] = part.get("text", "") + delta
+        if render_every and i % render_every == 0:
+            len(part["text"])
+    return part["text"]
+
+
+def text_buffer(deltas, render_every):
+    message = {"content": [{"type": "output_text", "text": ""}]}
+    buffer = TextBuffer(message["content"][0]["text"])
+    for i, delta in enumerate(deltas, 1):
+        buffer.append(delta)
+        if render_every and i % render_every == 0:
+            len(buffer.getvalue())
+    message["content"][0]["text"] = buffer.getvalue()
+    return message["content"][0]["text"]
+
+
+STRATEGIES = {
+    "concatenate": concatenate,
+    "TextBuffer": text_buffer,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=50000, help="Deltas in the simulated response")
+    parser.add_argument("--render-every", type=int, default=0, help="Materialize the text every N deltas (0: only at the end)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per strategy (best is reported)")
+    args = parser.parse_args()
+
+    deltas = generate_deltas(args.tokens)
+    expected = "".join(deltas)
+    print(f"Response: {args.tokens} deltas, {len(expected) / 1e3:.0f} KB")
+
+    for name, accumulate in STRATEGIES.items():
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            text = accumulate(deltas, args.render_every)
+            best = min(best, time.perf_counter() - started)
+        if text != expected:
+            raise SystemExit(f"{name} produced different text")
+        print(f"{name:>12}: {best * 1000:8.1f} ms ({args.tokens / best:10.0f} deltas/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,27 @@
 """Chat interface page"""
+import time
 import streamlit as st
-from utils.state import get_tools_state
+from utils.state import get_tools_state, reset_conversation_state, add_chat_message
 from utils.config import get_api_base_url
 from config.constants import INITIAL_MESSAGE
+from lib.conversation_log import ConversationLog
+from lib.api_client import get_api_client
+from lib.artifacts import render_artifact_download, container_file_url
+from components.live_response import LiveResponse
 import requests
 
 API_BASE_URL = get_api_base_url()
 
+# Requests one turn may make while client-side tools keep asking for continuations
+MAX_TURN_STEPS = 8
+
+# Wall-clock budget for a whole turn, tool calls included
+TURN_DEADLINE_SECONDS = 300
+
+# (connect, read) timeouts for the turn stream. The read timeout outlasts the slowest
+# server-side tool (a 60 s scrape_websites batch); the backend also pings every 10 s
+TURN_STREAM_TIMEOUT = (10, 90)
+
 
 def reset_conversation():
     """Reset the conversation"""
@@ -17,8 +32,9 @@ def reset_conversation():
             "content": [{"type": "output_text", "text": INITIAL_MESSAGE.strip()}],
         }
     ]
-    st.session_state.conversation_items = []
+    st.session_state.conversation_items = ConversationLog()
     st.session_state.is_assistant_loading = False
+    reset_conversation_state()
 
 
 def render():
@@ -39,11 +55,12 @@ def render():
     else:
         st.info("No messages yet. Start a conversation!")
     
-    # Loading indicator
+    # Stream the pending turn into a live assistant bubble below the history
     if st.session_state.is_assistant_loading:
         with st.chat_message("assistant"):
+            live = LiveResponse()
             with st.spinner("Assistant is thinking..."):
-                st.empty()
+                process_messages(live)
     
     # Input area
     st.markdown("---")
@@ -91,118 +108,38 @@ def handle_send_message(message: str):
     else:
         print(f"Skipped duplicate user message")
 
+    # The rerun that follows renders the message, then streams the response below it
     st.session_state.is_assistant_loading = True
 
-    # Process messages
-    process_messages()
 
+def process_messages(live=None):
+    """Run the assistant turn, mirroring the stream into `live` if given.
 
-def process_messages():
-    """Process messages and get assistant response"""
-    tools_state = get_tools_state()
-    
+    Client-side function calls need another request with their outputs; these
+    steps run in a loop bounded by MAX_TURN_STEPS and TURN_DEADLINE_SECONDS,
+    each one closing its response before the next starts.
+    """
     try:
-        # Check if backend is available first
-        try:
-            health_check = requests.get(f"{API_BASE_URL}/health", timeout=2)
-            if health_check.status_code != 200:
-                st.error("Backend server is not responding. Please ensure the backend is running on port 8000.")
-                st.session_state.is_assistant_loading = False
-                return
-        except requests.exceptions.RequestException:
+        # Backend availability is known from recent calls; /health is only probed when that is stale
+        if not get_api_client().is_healthy():
             st.error(f"❌ Cannot connect to backend at {API_BASE_URL}. Please ensure the backend is running.")
             st.info("💡 Start the backend with: `cd backend && uvicorn main:app --reload --port 8000`")
             st.session_state.is_assistant_loading = False
             return
-        
-        # Filter out incomplete function calls (function_calls without matching outputs)
-        # The Responses API requires that every function_call has a corresponding function_call_output
-        filtered_items = []
-        function_call_call_ids = set()
-        
-        # First pass: collect all function_call call_ids
-        for item in st.session_state.conversation_items:
-            if item.get("type") == "function_call":
-                call_id = item.get("call_id")
-                if call_id:
-                    function_call_call_ids.add(call_id)
-        
-        # Second pass: only include items that are complete
-        for item in st.session_state.conversation_items:
-            item_type = item.get("type")
-            
-            # Always include non-function-call items
-            if item_type != "function_call" and item_type != "function_call_output":
-                filtered_items.append(item)
-            # Include function_call only if it has a matching output
-            elif item_type == "function_call":
-                call_id = item.get("call_id")
-                # Check if there's a matching function_call_output
-                has_output = any(
-                    output_item.get("type") == "function_call_output" and output_item.get("call_id") == call_id
-                    for output_item in st.session_state.conversation_items
-                )
-                if has_output:
-                    filtered_items.append(item)
-                else:
-                    print(f"  ⚠️ Filtering out incomplete function_call: call_id={call_id}")
-            # Include function_call_output only if its function_call is included
-            elif item_type == "function_call_output":
-                call_id = item.get("call_id")
-                if call_id in function_call_call_ids:
-                    # Check if the corresponding function_call is in filtered_items
-                    has_function_call = any(
-                        fc_item.get("type") == "function_call" and fc_item.get("call_id") == call_id
-                        for fc_item in filtered_items
-                    )
-                    if has_function_call:
-                        filtered_items.append(item)
-                    else:
-                        print(f"  ⚠️ Filtering out orphaned function_call_output: call_id={call_id}")
-                else:
-                    print(f"  ⚠️ Filtering out function_call_output with unknown call_id: call_id={call_id}")
-        
-        # Debug: Print filtered conversation items before sending
-        print(f"\nSending {len(filtered_items)} filtered conversation items to API (from {len(st.session_state.conversation_items)} total)")
-        for i, item in enumerate(filtered_items):
-            item_type = item.get("type")
-            if not item_type:
-                # No type means it's a user/assistant message in Responses API format
-                role = item.get("role", "unknown")
-                content_preview = str(item.get("content", ""))[:50]
-                print(f"  Item {i}: role={role}, content={content_preview}...")
-            elif item_type == "function_call":
-                call_id = item.get("call_id", "N/A")
-                name = item.get("name", "N/A")
-                print(f"  Item {i}: type={item_type}, call_id={call_id}, name={name}")
-            elif item_type == "function_call_output":
-                call_id = item.get("call_id", "N/A")
-                output = item.get("output", "")
-                output_len = len(output)
-                print(f"  Item {i}: type={item_type}, call_id={call_id}, output_len={output_len}")
-            else:
-                call_id = item.get("call_id", "N/A")
-                print(f"  Item {i}: type={item_type}, call_id={call_id}")
-        
-        response = requests.post(
-            f"{API_BASE_URL}/api/turn_response",
-            json={
-                "messages": filtered_items,
-                "toolsState": tools_state,
-            },
-            stream=True,
-            headers={"Content-Type": "application/json"},
-            timeout=30,
-        )
-        
-        if not response.ok:
-            st.error(f"Error: {response.status_code} - {response.text}")
-            st.session_state.is_assistant_loading = False
-            return
-        
-        # Process streaming response
-        from lib.assistant import process_messages_streamlit_realtime
-        process_messages_streamlit_realtime(response)
+
+        deadline = time.monotonic() + TURN_DEADLINE_SECONDS
+        for step in range(MAX_TURN_STEPS):
+            if time.monotonic() >= deadline:
+                add_turn_notice(f"Stopped after {TURN_DEADLINE_SECONDS} seconds, the turn took too long.")
+                break
+            needs_continuation = run_turn_step(live, deadline)
+            if needs_continuation is None:
+                return
+            if not needs_continuation:
+                break
+            print(f"Step {step + 1} done, continuing with the tool outputs")
+        else:
+            add_turn_notice(f"Stopped after {MAX_TURN_STEPS} tool steps.")
         st.session_state.is_assistant_loading = False
         
         # Debug: Print message count
@@ -224,14 +161,101 @@ def process_messages():
         st.session_state.is_assistant_loading = False
 
 
+def run_turn_step(live, deadline):
+    """Send the conversation, stream one response and run its function calls.
+    Returns True if the model needs another request to continue, None if the request failed."""
+    from lib.assistant import process_messages_streamlit_realtime
+
+    tools_state = get_tools_state()
+    if st.session_state.last_response_id and st.session_state.conversation_items.unpaired_calls:
+        # A function call was never answered (e.g. the stream broke while tools ran),
+        # so the last response can't be chained on: send the full history instead
+        from utils.state import reset_conversation_state
+        print("  ⚠️ Unanswered function calls, falling back to full history")
+        reset_conversation_state()
+    use_conversation_state = bool(
+        st.session_state.conversation_state_enabled and st.session_state.last_response_id
+    )
+    if use_conversation_state:
+        # The backend already holds everything up to the last response
+        filtered_items = get_new_input_items()
+    else:
+        filtered_items = st.session_state.conversation_items.complete_items()
+    
+    # Debug: Print filtered conversation items before sending
+    print(f"\nSending {len(filtered_items)} filtered conversation items to API (from {len(st.session_state.conversation_items)} total)")
+    for i, item in enumerate(filtered_items):
+        item_type = item.get("type")
+        if not item_type:
+            # No type means it's a user/assistant message in Responses API format
+            role = item.get("role", "unknown")
+            content_preview = str(item.get("content", ""))[:50]
+            print(f"  Item {i}: role={role}, content={content_preview}...")
+        elif item_type == "function_call":
+            call_id = item.get("call_id", "N/A")
+            name = item.get("name", "N/A")
+            print(f"  Item {i}: type={item_type}, call_id={call_id}, name={name}")
+        elif item_type == "function_call_output":
+            call_id = item.get("call_id", "N/A")
+            output = item.get("output", "")
+            output_len = len(output)
+            print(f"  Item {i}: type={item_type}, call_id={call_id}, output_len={output_len}")
+        else:
+            call_id = item.get("call_id", "N/A")
+            print(f"  Item {i}: type={item_type}, call_id={call_id}")
+    
+    # The response is closed when the step ends, releasing its connection and buffers
+    with get_api_client().post(
+        "/api/turn_response",
+        json={
+            "messages": filtered_items,
+            "toolsState": tools_state,
+            "conversationId": st.session_state.conversation_id,
+            "previousResponseId": st.session_state.last_response_id if use_conversation_state else None,
+        },
+        stream=True,
+        headers={"Content-Type": "application/json"},
+        timeout=TURN_STREAM_TIMEOUT,
+    ) as response:
+        if not response.ok:
+            st.error(f"Error: {response.status_code} - {response.text}")
+            st.session_state.is_assistant_loading = False
+            return None
+        return process_messages_streamlit_realtime(response, live, deadline)
+
+
+def add_turn_notice(text: str):
+    """Tell the user in the chat why the turn ended early"""
+    print(text)
+    add_chat_message({
+        "type": "message",
+        "role": "assistant",
+        "content": [{"type": "output_text", "text": f"⚠️ {text}"}],
+    })
+
+
+# Items the client adds to a conversation; everything else comes from the model
+CLIENT_INPUT_ITEM_TYPES = {"function_call_output", "mcp_approval_response"}
+
+
+def get_new_input_items():
+    """Get the client-side items added since the last completed response.
+    Model output (messages, function_calls, ...) is already part of that response."""
+    new_items = st.session_state.conversation_items[st.session_state.sent_item_count:]
+    return [
+        item for item in new_items
+        if item.get("role") == "user" or item.get("type") in CLIENT_INPUT_ITEM_TYPES
+    ]
+
+
 def render_message_item(item, idx):
     """Render a single message item"""
     item_type = item.get("type", "unknown")
     
     if item_type == "message":
-        render_message(item)
+        render_message(item, idx)
     elif item_type == "tool_call":
-        render_tool_call(item)
+        render_tool_call(item, idx)
     elif item_type == "mcp_list_tools":
         render_mcp_tools_list(item)
     elif item_type == "mcp_approval_request":
@@ -242,7 +266,7 @@ def render_message_item(item, idx):
         st.json(item)
 
 
-def render_message(item):
+def render_message(item, idx=0):
     """Render a message"""
     role = item.get("role", "assistant")
     
@@ -283,10 +307,10 @@ def render_message(item):
             
             # Render annotations if present
             if annotations:
-                render_annotations(annotations)
+                render_annotations(annotations, idx)
 
 
-def render_tool_call(item):
+def render_tool_call(item, idx=0):
     """Render a tool call"""
     tool_type = item.get("tool_type", "unknown")
     status = item.get("status", "in_progress")
@@ -329,16 +353,13 @@ def render_tool_call(item):
         # Show files
         if item.get("files"):
             for f in item["files"]:
-                file_url = f"{API_BASE_URL}/api/container_files/content?file_id={f['file_id']}"
-                if f.get("container_id"):
-                    file_url += f"&container_id={f['container_id']}"
-                if f.get("filename"):
-                    file_url += f"&filename={f['filename']}"
-                st.download_button(
+                # Fetched on click only, then cached - reruns don't re-download history
+                render_artifact_download(
                     label=f"Download {f.get('filename', f['file_id'])}",
-                    data=requests.get(file_url).content,
+                    url=container_file_url(f["file_id"], f.get("container_id"), f.get("filename")),
                     file_name=f.get("filename", "file"),
                     mime=f.get("mime_type", "application/octet-stream"),
+                    key=f"tool_file_{idx}_{f['file_id']}",
                 )
 
 
@@ -373,26 +394,23 @@ def handle_approval_response(approve: bool, approval_id: str):
     }
     
     st.session_state.conversation_items.append(approval_item)
-    process_messages()
+    st.session_state.is_assistant_loading = True
+    st.rerun()
 
 
-def render_annotations(annotations):
+def render_annotations(annotations, idx=0):
     """Render annotations"""
-    for annotation in annotations:
+    for annotation_idx, annotation in enumerate(annotations):
         if annotation["type"] == "file_citation":
             st.caption(f"📄 File: {annotation.get('filename', 'Unknown')}")
         elif annotation["type"] == "url_citation":
             st.markdown(f"[🔗 {annotation.get('title', 'Link')}]({annotation.get('url', '#')})")
         elif annotation["type"] == "container_file_citation":
             file_id = annotation.get("fileId", "")
-            file_url = f"{API_BASE_URL}/api/container_files/content?file_id={file_id}"
-            if annotation.get("containerId"):
-                file_url += f"&container_id={annotation['containerId']}"
-            if annotation.get("filename"):
-                file_url += f"&filename={annotation['filename']}"
-            st.download_button(
+            render_artifact_download(
                 label=f"📎 {annotation.get('filename', file_id)}",
-                data=requests.get(file_url).content,
+                url=container_file_url(file_id, annotation.get("containerId"), annotation.get("filename")),
                 file_name=annotation.get("filename", "file"),
+                mime="application/octet-stream",
+                key=f"annotation_file_{idx}_{annotation_idx}",
             )
-
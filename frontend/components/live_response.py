@@ -0,0 +1,115 @@
+"""Live view of the assistant response while it streams in"""
+import json
+import time
+import streamlit as st
+from lib.text_buffer import TextBuffer
+from lib.partial_json import IncrementalJSONParser
+
+# Re-render the growing text at most this often; deltas arriving in between are batched
+RENDER_INTERVAL_SECONDS = 0.05
+
+# Output items shown as tool progress, with their labels
+TOOL_ITEM_LABELS = {
+    "function_call": "Function",
+    "web_search_call": "Web search",
+    "file_search_call": "File search",
+    "code_interpreter_call": "Code interpreter",
+    "mcp_call": "MCP",
+    "shell_call": "Shell",
+    "apply_patch_call": "Apply patch",
+}
+
+# Longest argument preview shown next to a running tool
+ARGUMENT_PREVIEW_CHARS = 120
+
+ARGUMENT_DELTA_EVENTS = ("response.function_call_arguments.delta", "response.mcp_call_arguments.delta")
+
+
+class LiveResponse:
+    """Placeholders that show text deltas and tool progress as events are dispatched.
+
+    Session state is still updated by the handlers in lib/assistant.py; this only
+    mirrors the stream on screen so the first tokens appear as soon as the
+    backend sends them. The final rerun renders the complete history as usual.
+    """
+
+    def __init__(self):
+        self._tools_placeholder = st.empty()
+        self._text_placeholder = st.empty()
+        self._text = TextBuffer()
+        self._tools = {}
+        self._last_render = 0.0
+        self._dirty = False
+        self._arguments = {}
+        self._last_tools_render = 0.0
+
+    def handle(self, data):
+        """Update the view for one decoded stream event"""
+        event = data.get("event")
+        event_data = data.get("data") or {}
+
+        if event == "response.output_text.delta":
+            delta = event_data.get("delta")
+            if isinstance(delta, str) and delta:
+                self._text.append(delta)
+                self._dirty = True
+                self._render_text()
+        elif event == "response.output_item.added":
+            item = event_data.get("item") or {}
+            if item.get("type") == "message" and self._text:
+                # A new message after tool calls continues below the earlier text
+                self._text.append("\n\n")
+            elif item.get("type") in TOOL_ITEM_LABELS:
+                self._set_tool(item, "running")
+        elif event == "response.output_item.done":
+            item = event_data.get("item") or {}
+            if item.get("type") in TOOL_ITEM_LABELS:
+                # The preview is only shown while the call streams
+                self._arguments.pop(item.get("id"), None)
+                self._set_tool(item, "done")
+        elif event in ARGUMENT_DELTA_EVENTS:
+            parser = self._arguments.setdefault(event_data.get("item_id"), IncrementalJSONParser())
+            parser.feed(event_data.get("delta") or "")
+            now = time.monotonic()
+            if now - self._last_tools_render >= RENDER_INTERVAL_SECONDS:
+                self._render_tools()
+        elif event == "function_call_output.in_progress":
+            self._set_tool({"id": event_data.get("item_id"), "type": "function_call", "name": event_data.get("name")}, "executing")
+        elif event == "function_call_output.done":
+            self._set_tool({"id": event_data.get("item_id"), "type": "function_call"}, "completed")
+
+    def _set_tool(self, item, state):
+        item_id = item.get("id")
+        tool = self._tools.setdefault(item_id, {"label": TOOL_ITEM_LABELS[item["type"]], "name": ""})
+        tool["name"] = item.get("name") or item.get("server_label") or tool["name"]
+        tool["state"] = state
+        self._render_tools()
+
+    def _render_tools(self):
+        icons = {"running": "⏳", "done": "✅", "executing": "⚙️", "completed": "✅"}
+        lines = []
+        for item_id, tool in self._tools.items():
+            line = f"{icons[tool['state']]} {tool['label']}{': ' + tool['name'] if tool['name'] else ''} - {tool['state']}"
+            parser = self._arguments.get(item_id)
+            if parser is not None and tool["state"] == "running":
+                # Best-effort view of the arguments streamed so far
+                preview = json.dumps(parser.getvalue(), ensure_ascii=False)
+                if len(preview) > ARGUMENT_PREVIEW_CHARS:
+                    preview = preview[:ARGUMENT_PREVIEW_CHARS] + "…"
+                line += " `" + preview.replace("`", "'") + "`"
+            lines.append(line)
+        self._tools_placeholder.caption("  \n".join(lines))
+        self._last_tools_render = time.monotonic()
+
+    def _render_text(self, force=False):
+        now = time.monotonic()
+        if not self._dirty or (not force and now - self._last_render < RENDER_INTERVAL_SECONDS):
+            return
+        self._text_placeholder.markdown(self._text.getvalue() + ("" if force else " ▌"))
+        self._last_render = now
+        self._dirty = False
+
+    def finish(self):
+        """Show whatever arrived since the last throttled render"""
+        self._dirty = self._dirty or bool(self._text)
+        self._render_text(force=True)
@@ -1,7 +1,7 @@
 """Tools panel sidebar"""
 import streamlit as st
-import requests
 from utils.state import get_tools_state
+from lib.api_client import get_api_client
 from utils.config import get_api_base_url
 
 API_BASE_URL = get_api_base_url()
@@ -35,6 +35,16 @@ def render():
         if web_search_enabled:
             render_web_search_config()
     
+    # Conversation state
+    with st.sidebar.expander("🧵 Conversation", expanded=False):
+        conversation_state_enabled = st.checkbox(
+            "Keep conversation state on the server",
+            value=st.session_state.conversation_state_enabled,
+            key="conversation_state_checkbox",
+            help="Send only new messages each turn and chain on the previous response",
+        )
+        st.session_state.conversation_state_enabled = conversation_state_enabled
+    
     # Code Interpreter
     with st.sidebar.expander("🐍 Code Interpreter", expanded=False):
         code_interpreter_enabled = st.checkbox(
@@ -78,7 +88,21 @@ def render():
         st.session_state.functions_enabled = functions_enabled
         
         if functions_enabled:
-            st.info("Available functions: get_weather, get_joke, scrape_website (with JavaScript rendering)")
+            st.info("Available functions: get_weather, get_joke, scrape_website (with JavaScript rendering), scrape_websites (several pages at once)")
+            server_tool_execution = st.checkbox(
+                "Run functions on the backend",
+                value=st.session_state.server_tool_execution,
+                key="server_tool_execution_checkbox",
+                help="Execute function calls inside the backend stream instead of from this app",
+            )
+            st.session_state.server_tool_execution = server_tool_execution
+            parallel_tool_calls = st.checkbox(
+                "Allow parallel function calls",
+                value=st.session_state.parallel_tool_calls,
+                key="parallel_tool_calls_checkbox",
+                help="Let the model request several independent calls at once and run them concurrently",
+            )
+            st.session_state.parallel_tool_calls = parallel_tool_calls
     
     # MCP
     with st.sidebar.expander("🔌 MCP", expanded=False):
@@ -116,6 +140,18 @@ def render():
         else:
             st.warning("Google OAuth not configured. Set GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET.")
 
+    # Backend call latency
+    with st.sidebar.expander("📈 Backend Latency", expanded=False):
+        latency_stats = get_api_client().get_latency_stats()
+        if latency_stats:
+            st.dataframe(
+                [{"endpoint": endpoint, **stats} for endpoint, stats in latency_stats.items()],
+                hide_index=True,
+                use_container_width=True,
+            )
+        else:
+            st.info("No backend calls yet")
+
 
 def render_file_search_setup():
     """Render file search setup"""
@@ -148,8 +184,8 @@ def render_file_search_setup():
 def retrieve_vector_store(store_id: str):
     """Retrieve vector store by ID"""
     try:
-        response = requests.get(
-            f"{API_BASE_URL}/api/vector_stores/retrieve_store",
+        response = get_api_client().get(
+            "/api/vector_stores/retrieve_store",
             params={"vector_store_id": store_id},
         )
         if response.ok:
@@ -173,8 +209,8 @@ def upload_file(uploaded_file, store_name: str):
         file_base64 = base64.b64encode(file_content).decode("utf-8")
         
         # Upload file
-        response = requests.post(
-            f"{API_BASE_URL}/api/vector_stores/upload_file",
+        response = get_api_client().post(
+            "/api/vector_stores/upload_file",
             json={
                 "fileObject": {
                     "name": uploaded_file.name,
@@ -200,8 +236,8 @@ def upload_file(uploaded_file, store_name: str):
             vector_store_id = st.session_state.vector_store["id"]
         else:
             # Create new store
-            create_response = requests.post(
-                f"{API_BASE_URL}/api/vector_stores/create_store",
+            create_response = get_api_client().post(
+                "/api/vector_stores/create_store",
                 json={"name": store_name},
             )
             if create_response.ok:
@@ -214,8 +250,8 @@ def upload_file(uploaded_file, store_name: str):
             return
         
         # Add file to vector store
-        add_response = requests.post(
-            f"{API_BASE_URL}/api/vector_stores/add_file",
+        add_response = get_api_client().post(
+            "/api/vector_stores/add_file",
             json={
                 "fileId": file_id,
                 "vectorStoreId": vector_store_id,
@@ -327,7 +363,7 @@ def render_mcp_config():
 def check_google_status():
     """Check Google OAuth status"""
     try:
-        response = requests.get(f"{API_BASE_URL}/api/google/status")
+        response = get_api_client().get("/api/google/status")
         if response.ok:
             data = response.json()
             st.session_state.google_oauth_connected = data.get("connected", False)
@@ -0,0 +1,128 @@
+"""Shared HTTP client for the backend API"""
+import threading
+import time
+from collections import deque
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.config import get_api_base_url
+
+# After any answer from the backend it is assumed up for this long; /health is only probed once it expires
+HEALTH_TTL_SECONDS = 30
+
+HEALTH_PROBE_TIMEOUT = 2
+
+# Keep-alive connections kept per host (function calls run on several threads at once)
+POOL_MAXSIZE = 16
+
+# Connection failures are retried for every method (nothing was sent yet), and
+# 502/503/504 answers for idempotent methods. Read errors are never retried: a
+# timed-out tool call may still be running on the backend.
+MAX_RETRIES = 2
+
+# Function endpoints can run for a long time, so only connection failures are retried there
+FUNCTIONS_PATH = "/api/functions/"
+
+# Recent latencies kept per endpoint
+LATENCY_SAMPLES = 200
+
+
+class APIClient:
+    """One pooled keep-alive session to the backend, with passive health tracking.
+
+    Every call counts as a health check: a response of any status marks the
+    backend as up, a connection failure or timeout marks it as down.
+    is_healthy() only sends a /health probe when nothing has been heard
+    from the backend for HEALTH_TTL_SECONDS.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        # The session is shared by every user of this app: never keep a cookie from one for another
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        retry = Retry(
+            total=MAX_RETRIES,
+            connect=MAX_RETRIES,
+            read=False,
+            status=MAX_RETRIES,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        connect_retry = Retry(total=MAX_RETRIES, connect=MAX_RETRIES, read=False, status=0, backoff_factor=0.2)
+        # The longest mounted prefix wins, so function calls get connect-only retries
+        self.session.mount(
+            self.base_url + FUNCTIONS_PATH,
+            HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE, max_retries=connect_retry),
+        )
+        self._lock = threading.Lock()
+        self._last_ok = 0.0
+        self._latencies: Dict[str, deque] = {}
+        self._errors: Dict[str, int] = {}
+
+    def url(self, path: str) -> str:
+        return path if "://" in path else f"{self.base_url}{path}"
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Send a request to a backend path (or full URL), recording latency and health.
+        With stream=True the latency is the time until the response headers arrived."""
+        endpoint = f"{method} {urlsplit(self.url(path)).path}"
+        started = time.monotonic()
+        try:
+            response = self.session.request(method, self.url(path), **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            with self._lock:
+                self._last_ok = 0.0
+                self._errors[endpoint] = self._errors.get(endpoint, 0) + 1
+            raise
+        finished = time.monotonic()
+        with self._lock:
+            self._last_ok = finished
+            samples = self._latencies.setdefault(endpoint, deque(maxlen=LATENCY_SAMPLES))
+            samples.append((finished - started) * 1000)
+        return response
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def is_healthy(self) -> bool:
+        """Whether the backend is reachable, probing /health only if its last answer is too old"""
+        if time.monotonic() - self._last_ok < HEALTH_TTL_SECONDS:
+            return True
+        try:
+            return self.get("/health", timeout=HEALTH_PROBE_TIMEOUT).status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+
+    def get_latency_stats(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Count, errors and latency percentiles (ms) of recent calls per endpoint"""
+        with self._lock:
+            snapshot = {endpoint: sorted(samples) for endpoint, samples in self._latencies.items()}
+            errors = dict(self._errors)
+        stats = {}
+        for endpoint in sorted(set(snapshot) | set(errors)):
+            samples = snapshot.get(endpoint, [])
+            stats[endpoint] = {
+                "calls": len(samples),
+                "errors": errors.get(endpoint, 0),
+                "p50_ms": round(samples[len(samples) // 2], 1) if samples else None,
+                "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1) if samples else None,
+            }
+        return stats
+
+
+@st.cache_resource
+def get_api_client() -> APIClient:
+    """One client per Streamlit server process, shared by every rerun and session"""
+    return APIClient(get_api_base_url())
@@ -0,0 +1,101 @@
+"""Lazy, cached downloads of generated files (container file artifacts)"""
+import threading
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import urlencode
+import requests
+import streamlit as st
+from utils.config import get_api_base_url
+from lib.api_client import get_api_client
+
+# Fetched artifact bytes kept across reruns (and sessions), least recently used evicted first
+ARTIFACT_CACHE_MAX_BYTES = 100 * 1024 * 1024
+
+ARTIFACT_FETCH_TIMEOUT = 60
+
+
+class ArtifactCache:
+    """Size-bounded LRU of downloaded file bytes keyed by URL"""
+
+    def __init__(self, max_bytes: int = ARTIFACT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key: str, data: bytes):
+        # Files bigger than the whole cache are only offered through the direct link
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+@st.cache_resource
+def get_artifact_cache() -> ArtifactCache:
+    """One cache per Streamlit server process, shared by every rerun"""
+    return ArtifactCache()
+
+
+def container_file_url(file_id: str, container_id: Optional[str] = None, filename: Optional[str] = None) -> str:
+    params = {"file_id": file_id}
+    if container_id:
+        params["container_id"] = container_id
+    if filename:
+        params["filename"] = filename
+    return f"{get_api_base_url()}/api/container_files/content?{urlencode(params)}"
+
+
+def fetch_artifact(url: str) -> bytes:
+    """Download an artifact once; later calls are served from the cache"""
+    cache = get_artifact_cache()
+    data = cache.get(url)
+    if data is None:
+        response = get_api_client().get(url, timeout=ARTIFACT_FETCH_TIMEOUT)
+        response.raise_for_status()
+        data = response.content
+        cache.put(url, data)
+    return data
+
+
+def render_artifact_download(label: str, url: str, file_name: str, mime: str, key: str):
+    """Download control that only fetches the file when asked to.
+
+    Until the bytes are cached it shows a fetch button and a direct link (the
+    browser downloads from the backend without going through Streamlit);
+    afterwards a regular download button, so reruns never re-download.
+    """
+    data = get_artifact_cache().get(url)
+    if data is None:
+        col_fetch, col_link = st.columns(2)
+        with col_fetch:
+            if st.button(f"⬇️ {label}", key=f"{key}_fetch"):
+                try:
+                    with st.spinner(f"Downloading {file_name}..."):
+                        data = fetch_artifact(url)
+                except requests.exceptions.RequestException as e:
+                    st.error(f"Download failed: {e}")
+        with col_link:
+            st.link_button("Open direct link", url)
+    if data is not None:
+        st.download_button(
+            label=f"💾 Save {label}",
+            data=data,
+            file_name=file_name,
+            mime=mime,
+            key=f"{key}_download",
+        )
@@ -1,145 +1,113 @@
 """Assistant message processing for Streamlit"""
 import streamlit as st
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from lib.sse import iter_sse_events
+from lib.partial_json import parse_partial_json
+from lib.api_client import get_api_client
+from utils.state import add_chat_message, find_chat_message, append_stream_text, append_stream_json, flush_stream_text
 
+# Maximum number of queued function calls executed at the same time
+FUNCTION_CALL_CONCURRENCY = 4
 
-def parse_partial_json(json_str):
-    """Parse partial JSON safely"""
-    try:
-        return json.loads(json_str)
-    except json.JSONDecodeError:
-        # Try to fix common issues
-        json_str = json_str.strip()
-        if not json_str.startswith("{"):
-            json_str = "{" + json_str
-        if not json_str.endswith("}"):
-            json_str = json_str + "}"
-        try:
-            return json.loads(json_str)
-        except:
-            return {}
+# Cheap, idempotent functions that may start as soon as their streamed arguments form a complete object
+SPECULATIVE_FUNCTIONS = {"get_weather", "get_joke"}
+
+
+@st.cache_resource
+def get_speculation_executor():
+    """Worker threads for speculative function calls, shared by every session"""
+    return ThreadPoolExecutor(max_workers=FUNCTION_CALL_CONCURRENCY)
 
 
 def process_messages_streamlit(response):
     """Process streaming messages from API response (non-realtime version)"""
-    buffer = ""
-    
-    for line in response.iter_lines():
-        if line:
-            decoded = line.decode("utf-8")
-            buffer += decoded
-            
-            # Process complete SSE messages
-            lines = buffer.split("\n\n")
-            buffer = lines.pop() if lines else ""
-            
-            for line in lines:
-                if line.startswith("data: "):
-                    data_str = line[6:]
-                    if data_str == "[DONE]":
-                        return
-                    
-                    try:
-                        data = json.loads(data_str)
-                        handle_event(data)
-                    except json.JSONDecodeError:
-                        continue
-
-
-def process_messages_streamlit_realtime(response):
-    """Process streaming messages from API response"""
+    for sse_event in iter_sse_events(response.iter_content(chunk_size=None)):
+        if sse_event.data == "[DONE]":
+            break
+        try:
+            data = json.loads(sse_event.data)
+            handle_event(data)
+        except json.JSONDecodeError:
+            continue
+    flush_stream_text()
+
+
+def process_messages_streamlit_realtime(response, live=None, deadline=None):
+    """Process one streamed response, dispatching each event as it arrives.
+
+    Returns True when client-side function outputs were added and the model
+    needs another request to continue; the caller's turn loop makes it.
+    Stops reading once time.monotonic() passes deadline.
+    """
     import streamlit as st
-    
-    # Process all events first, then rerun once at the end
-    # Streamlit doesn't support true real-time updates during blocking operations
-    buffer = ""
+
     event_count = 0
+    needs_continuation = False
     
     print("Starting to process stream...")
+    st.session_state.pending_function_calls = []
     
     try:
-        # Read the stream content
-        raw_content = b""
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk:
-                raw_content += chunk
-        
-        # Decode the content
-        content = raw_content.decode("utf-8")
-        print(f"Received {len(content)} characters of stream data")
+        # chunk_size=None hands over data as the server flushes it instead of waiting for 8 KB
+        for sse_event in iter_sse_events(response.iter_content(chunk_size=None)):
+            data_str = sse_event.data
+            if data_str == "[DONE]":
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                print("Turn deadline reached, stopping the stream")
+                st.session_state.pending_function_calls = []
+                st.session_state.needs_continuation = False
+                break
+
+            if not data_str:
+                continue
+
+            try:
+                data = json.loads(data_str)
+            except json.JSONDecodeError as e:
+                # Log the error for debugging
+                print(f"JSON decode error: {e}")
+                print(f"  Data: {data_str[:200]}")
+                continue
+
+            event_count += 1
+            event_type = data.get('event', 'unknown')
+            if event_type != "response.output_text.delta":
+                print(f"Parsed event #{event_count}: {event_type}")
 
-        # Split by double newlines (SSE format)
-        messages = content.split("\n\n")
-        print(f"Found {len(messages)} potential SSE messages")
+            # If it's an unknown event, print the data to see what the error is
+            if event_type == 'unknown':
+                print(f"  Unknown event data: {data_str[:500]}")
 
-        for msg in messages:
-            if not msg.strip():
+            try:
+                handle_event(data)
+                if live is not None:
+                    live.handle(data)
+            except Exception as e:
+                print(f"Error handling event {event_type}: {e}")
+                import traceback
+                traceback.print_exc()
+                # Continue processing other events
                 continue
 
-            # Look for data lines
-            for line in msg.split("\n"):
-                line = line.strip()
-                if line.startswith("data: "):
-                    data_str = line[6:].strip()
-                    
-                    if data_str == "[DONE]":
-                        print(f"Stream complete. Processed {event_count} events.")
-                        print(f"Final chat_messages count: {len(st.session_state.chat_messages)}")
-                        return
-                    
-                    if not data_str:
-                        continue
-                    
-                    try:
-                        data = json.loads(data_str)
-                        event_count += 1
-                        event_type = data.get('event', 'unknown')
-                        print(f"Parsed event #{event_count}: {event_type}")
-
-                        # If it's an unknown event, print the data to see what the error is
-                        if event_type == 'unknown':
-                            print(f"  Unknown event data: {data_str[:500]}")
-
-                        try:
-                            handle_event(data)
-                        except Exception as e:
-                            print(f"Error handling event {event_type}: {e}")
-                            import traceback
-                            traceback.print_exc()
-                            # Continue processing other events
-                            continue
-                    except json.JSONDecodeError as e:
-                        # Log the error for debugging
-                        print(f"JSON decode error: {e}")
-                        print(f"  Data: {data_str[:200]}")
-                        continue
+        # Materialize the text streamed into messages before anything reads it
+        flush_stream_text()
+        if live is not None:
+            live.finish()
         
         print(f"Stream ended. Processed {event_count} events.")
         print(f"Final chat_messages count: {len(st.session_state.chat_messages)}")
-        for i, msg in enumerate(st.session_state.chat_messages):
-            print(f"  Message {i}: type={msg.get('type')}, role={msg.get('role')}, has_content={bool(msg.get('content'))}")
-        
-        # Debug: Print conversation_items before continuation check
         print(f"Final conversation_items count: {len(st.session_state.conversation_items)}")
-        for i, item in enumerate(st.session_state.conversation_items):
-            item_type = item.get("type", "unknown")
-            call_id = item.get("call_id", "N/A")
-            role = item.get("role", "N/A")
-            print(f"  Item {i}: type={item_type}, role={role}, call_id={call_id}")
         
-        # Verify that all function_calls have matching outputs before continuing
-        incomplete_function_calls = []
-        for item in st.session_state.conversation_items:
-            if item.get("type") == "function_call":
-                call_id = item.get("call_id")
-                # Check if there's a matching function_call_output
-                has_output = any(
-                    output_item.get("type") == "function_call_output" and output_item.get("call_id") == call_id
-                    for output_item in st.session_state.conversation_items
-                )
-                if not has_output:
-                    incomplete_function_calls.append(call_id)
-                    print(f"  WARNING: Function call {call_id} has no output!")
+        # Run the function calls collected from this response together
+        execute_pending_function_calls()
+
+        # Every function_call needs its output before continuing; the log tracks them as they are added
+        incomplete_function_calls = list(st.session_state.conversation_items.unpaired_calls)
+        for call_id in incomplete_function_calls:
+            print(f"  WARNING: Function call {call_id} has no output!")
 
         # Only continue if there are no incomplete function calls
         needs_cont = hasattr(st.session_state, 'needs_continuation') and st.session_state.needs_continuation
@@ -150,26 +118,20 @@ def process_messages_streamlit_realtime(response):
             st.session_state.needs_continuation = False
         elif needs_cont:
             st.session_state.needs_continuation = False
-            # Trigger another API call
-            from components.chat import process_messages
-            print("Function call completed, making another API request with tool output...")
+            print("Function call completed, another API request with the tool output is needed")
             print(f"  Conversation items before continuation: {len(st.session_state.conversation_items)}")
-            process_messages()
+            needs_continuation = True
         
-        # If no events were processed, try alternative parsing
         if event_count == 0:
-            print("No events found with standard SSE parsing. Trying alternative...")
-            # Try parsing the entire content as JSON
-            try:
-                data = json.loads(content)
-                print(f"Parsed as single JSON: {type(data)}")
-            except:
-                pass
+            print("No events found in the stream")
         
     except Exception as e:
         print(f"Error processing stream: {e}")
         import traceback
         traceback.print_exc()
+        flush_stream_text()
+
+    return needs_continuation
 
 
 def handle_event(data):
@@ -181,6 +143,16 @@ def handle_event(data):
     if event and event not in ["response.output_text.delta"]:  # Skip frequent delta events
         print(f"Processing event: {event}")
     
+    # A chained turn was rejected (the previous response expired, is unknown or
+    # has unanswered calls; the backend already dropped its id): start a new
+    # server-side conversation so the next turn sends the full history
+    error_text = str(data.get("error") or (event_data.get("error") if isinstance(event_data, dict) else "") or "")
+    chain_rejected = data.get("conversation_reset") or "previous_response" in error_text
+    if chain_rejected and st.session_state.get("last_response_id"):
+        from utils.state import reset_conversation_state
+        print(f"  ⚠️ Conversation state lost, falling back to full history: {error_text}")
+        reset_conversation_state()
+
     # Handle error events
     if event == "unknown" or "error" in str(event).lower():
         error_msg = event_data.get("error") or str(event_data)
@@ -223,6 +195,12 @@ def handle_event(data):
         handle_function_call_arguments_delta(event_data)
     elif event == "response.function_call_arguments.done":
         handle_function_call_arguments_done(event_data)
+    elif event == "function_call_output.in_progress":
+        handle_function_call_output_in_progress(event_data)
+    elif event == "function_call_output.done":
+        handle_function_call_output_done(event_data)
+    elif event == "turn.step_limit":
+        handle_turn_step_limit(event_data)
     elif event == "response.mcp_call_arguments.delta":
         handle_mcp_call_arguments_delta(event_data)
     elif event == "response.mcp_call_arguments.done":
@@ -264,18 +242,18 @@ def handle_output_text_delta(data):
 
     if isinstance(delta, str) and delta:
         # Find or create assistant message
-        last_msg = None
-        for msg in reversed(st.session_state.chat_messages):
-            if msg.get("type") == "message" and msg.get("role") == "assistant":
-                # Match by item_id if provided, otherwise use the last assistant message
-                if not item_id or msg.get("id") == item_id or not msg.get("id"):
-                    last_msg = msg
-                    break
+        last_msg = find_chat_message(item_id, "message")
+        if last_msg is None:
+            for msg in reversed(st.session_state.chat_messages):
+                if msg.get("type") == "message" and msg.get("role") == "assistant":
+                    # Match by item_id if provided, otherwise use the last assistant message
+                    if not item_id or msg.get("id") == item_id or not msg.get("id"):
+                        last_msg = msg
+                        break
         
         if last_msg:
             if "content" in last_msg and len(last_msg["content"]) > 0:
-                current_text = last_msg["content"][0].get("text", "")
-                last_msg["content"][0]["text"] = current_text + delta
+                append_stream_text(last_msg["content"][0], "text", delta)
             else:
                 last_msg["content"] = [{"type": "output_text", "text": delta}]
         else:
@@ -286,7 +264,7 @@ def handle_output_text_delta(data):
                 "id": item_id,
                 "content": [{"type": "output_text", "text": delta}],
             }
-            st.session_state.chat_messages.append(new_msg)
+            add_chat_message(new_msg)
 
 
 def handle_annotation_added(data):
@@ -295,12 +273,11 @@ def handle_annotation_added(data):
     item_id = data.get("item_id")
     
     # Find the message and add annotation
-    for msg in st.session_state.chat_messages:
-        if msg.get("id") == item_id and msg.get("type") == "message":
-            if "content" in msg and len(msg["content"]) > 0:
-                if "annotations" not in msg["content"][0]:
-                    msg["content"][0]["annotations"] = []
-                msg["content"][0]["annotations"].append(normalize_annotation(annotation))
+    msg = find_chat_message(item_id, "message")
+    if msg and "content" in msg and len(msg["content"]) > 0:
+        if "annotations" not in msg["content"][0]:
+            msg["content"][0]["annotations"] = []
+        msg["content"][0]["annotations"].append(normalize_annotation(annotation))
 
 
 def handle_output_item_added(data):
@@ -338,9 +315,10 @@ def handle_output_item_added(data):
         else:
             text = str(content) if content else ""
             annotations = []
-        st.session_state.chat_messages.append({
+        add_chat_message({
             "type": "message",
             "role": "assistant",
+            "id": item.get("id"),
             "content": [{
                 "type": "output_text",
                 "text": text,
@@ -355,7 +333,7 @@ def handle_output_item_added(data):
     elif item_type == "function_call":
         # Add to chat_messages for UI display only
         # The function_call will be added to conversation_items in handle_output_item_done
-        st.session_state.chat_messages.append({
+        add_chat_message({
             "type": "tool_call",
             "tool_type": "function_call",
             "status": "in_progress",
@@ -367,7 +345,7 @@ def handle_output_item_added(data):
         })
     
     elif item_type == "web_search_call":
-        st.session_state.chat_messages.append({
+        add_chat_message({
             "type": "tool_call",
             "tool_type": "web_search_call",
             "status": item.get("status", "in_progress"),
@@ -375,7 +353,7 @@ def handle_output_item_added(data):
         })
     
     elif item_type == "file_search_call":
-        st.session_state.chat_messages.append({
+        add_chat_message({
             "type": "tool_call",
             "tool_type": "file_search_call",
             "status": item.get("status", "in_progress"),
@@ -383,7 +361,7 @@ def handle_output_item_added(data):
         })
     
     elif item_type == "mcp_call":
-        st.session_state.chat_messages.append({
+        add_chat_message({
             "type": "tool_call",
             "tool_type": "mcp_call",
             "status": "in_progress",
@@ -395,7 +373,7 @@ def handle_output_item_added(data):
         })
     
     elif item_type == "code_interpreter_call":
-        st.session_state.chat_messages.append({
+        add_chat_message({
             "type": "tool_call",
             "tool_type": "code_interpreter_call",
             "status": item.get("status", "in_progress"),
@@ -405,7 +383,7 @@ def handle_output_item_added(data):
         })
 
     elif item_type == "shell_call":
-        st.session_state.chat_messages.append({
+        add_chat_message({
             "type": "tool_call",
             "tool_type": "shell_call",
             "status": item.get("status", "in_progress"),
@@ -415,7 +393,7 @@ def handle_output_item_added(data):
         })
 
     elif item_type == "apply_patch_call":
-        st.session_state.chat_messages.append({
+        add_chat_message({
             "type": "tool_call",
             "tool_type": "apply_patch_call",
             "status": item.get("status", "in_progress"),
@@ -435,12 +413,16 @@ def handle_output_item_done(data):
 
     print(f"handle_output_item_done: item_id={item_id}, item_type={item_type}")
 
-    # For function calls, this is where we execute them (after we have the correct call_id)
-    if item_type == "function_call":
-        import requests
-        from utils.config import get_api_base_url
-        import json
+    # The item is complete, so its streamed fields are final
+    done_msg = find_chat_message(item_id)
+    if done_msg is not None:
+        flush_stream_text(done_msg)
+        for part in done_msg.get("content") or []:
+            if isinstance(part, dict):
+                flush_stream_text(part)
 
+    # For function calls, this is where we queue them for execution (after we have the correct call_id)
+    if item_type == "function_call":
         call_id = item.get("call_id")
         function_name = item.get("name")
         arguments_str = item.get("arguments", "{}")
@@ -448,135 +430,36 @@ def handle_output_item_done(data):
         print(f"  Function call item done, call_id={call_id}, name={function_name}, item_id={item_id}")
 
         # Find the tool_call message and update it
-        msg = None
-        for m in st.session_state.chat_messages:
-            if m.get("id") == item_id and m.get("type") == "tool_call":
-                msg = m
-                msg["call_id"] = call_id
-                msg["arguments"] = arguments_str
-                try:
-                    msg["parsedArguments"] = json.loads(arguments_str)
-                except:
-                    msg["parsedArguments"] = {}
-                print(f"  Updated tool_call message with call_id={call_id}")
-                break
+        msg = find_chat_message(item_id, "tool_call")
+        if msg:
+            msg["call_id"] = call_id
+            msg["arguments"] = arguments_str
+            try:
+                msg["parsedArguments"] = json.loads(arguments_str)
+            except:
+                msg["parsedArguments"] = {}
+            print(f"  Updated tool_call message with call_id={call_id}")
 
         if not msg:
             print(f"  WARNING: Could not find tool_call message with id={item_id}")
             return
 
-        # Execute the function
-        parsed_args = msg.get("parsedArguments", {})
-        print(f"  Executing function {function_name} with call_id={call_id}")
-
-        try:
-            API_BASE_URL = get_api_base_url()
-            if function_name == "get_weather":
-                location = parsed_args.get("location", "")
-                unit = parsed_args.get("unit", "celsius")
-                response = requests.get(
-                    f"{API_BASE_URL}/api/functions/get_weather",
-                    params={"location": location, "unit": unit},
-                    timeout=10
-                )
-                if response.ok:
-                    tool_result = response.json()
-                else:
-                    tool_result = {"error": f"Function call failed: {response.status_code}", "details": response.text[:200]}
-            elif function_name == "get_joke":
-                response = requests.get(
-                    f"{API_BASE_URL}/api/functions/get_joke",
-                    timeout=10
-                )
-                if response.ok:
-                    tool_result = response.json()
-                else:
-                    tool_result = {"error": f"Function call failed: {response.status_code}", "details": response.text[:200]}
-            elif function_name == "scrape_website":
-                url = parsed_args.get("url", "")
-                wait_for_js = parsed_args.get("wait_for_js")
-                wait_timeout = parsed_args.get("wait_timeout")
-
-                params = {"url": url}
-                if wait_for_js is not None:
-                    params["wait_for_js"] = wait_for_js
-                if wait_timeout is not None:
-                    params["wait_timeout"] = wait_timeout
-
-                timeout_value = (wait_timeout if wait_timeout is not None else 30) + 10
-                print(f"  Calling scrape_website with params: {params}, timeout: {timeout_value}")
-                response = requests.get(
-                    f"{API_BASE_URL}/api/functions/scrape_website",
-                    params=params,
-                    timeout=timeout_value
-                )
-                if response.ok:
-                    tool_result = response.json()
-                else:
-                    error_text = response.text[:500] if response.text else "No error details"
-                    tool_result = {
-                        "error": f"Function call failed: {response.status_code}",
-                        "details": error_text,
-                        "url": url
-                    }
-                    print(f"  Scrape failed: {response.status_code} - {error_text}")
-            else:
-                tool_result = {"error": f"Unknown function: {function_name}"}
-
-            # Add function_call to conversation_items first
+        # The backend runs the function itself and streams function_call_output.done
+        if st.session_state.get("server_tool_execution"):
             st.session_state.conversation_items.append(dict(item))
-            print(f"  Added function_call to conversation_items: call_id={call_id}, name={function_name}")
-
-            # Add function_call_output
-            tool_output_item = {
-                "type": "function_call_output",
-                "call_id": str(call_id),
-                "status": "completed",
-                "output": json.dumps(tool_result),
-            }
-            st.session_state.conversation_items.append(tool_output_item)
-            output_str = json.dumps(tool_result)
-            output_preview = output_str[:100] + '...' if len(output_str) > 100 else output_str
-            print(f"  Added function_call_output: call_id={call_id}, output_len={len(output_str)}, preview={output_preview}")
-
-            # Update message with output
-            msg["status"] = "completed"
-            msg["output"] = json.dumps(tool_result)
-            msg["call_id"] = str(call_id)
-
-            # Trigger continuation
-            st.session_state.needs_continuation = True
-            print(f"  Set needs_continuation=True for function {function_name}")
-
-        except Exception as e:
-            print(f"Error executing function {function_name}: {e}")
-            import traceback
-            traceback.print_exc()
+            print(f"  Added function_call to conversation_items, backend will execute {function_name}")
+            return
 
-            # Add function_call to conversation_items first
-            st.session_state.conversation_items.append(dict(item))
-            print(f"  Added function_call to conversation_items (error case): call_id={call_id}, name={function_name}")
-
-            tool_output_item = {
-                "type": "function_call_output",
-                "call_id": str(call_id),
-                "status": "completed",
-                "output": json.dumps({"error": str(e)}),
-            }
-            st.session_state.conversation_items.append(tool_output_item)
-            msg["status"] = "completed"
-            msg["output"] = json.dumps({"error": str(e)})
-            msg["call_id"] = str(call_id)
-            st.session_state.needs_continuation = True
-            print(f"  Set needs_continuation=True after error for function {function_name}")
+        # Queue the call - all calls from this response run together once the stream ends
+        st.session_state.pending_function_calls.append((dict(item), msg))
+        print(f"  Queued function {function_name} with call_id={call_id}")
 
     # For MCP calls, update output if provided
     elif item_type == "mcp_call":
-        for msg in st.session_state.chat_messages:
-            if msg.get("id") == item_id and msg.get("type") == "tool_call":
-                msg["status"] = "completed"
-                msg["output"] = item.get("output")
-                break
+        msg = find_chat_message(item_id, "tool_call")
+        if msg:
+            msg["status"] = "completed"
+            msg["output"] = item.get("output")
         st.session_state.conversation_items.append(item)
 
     # For shell calls, add to conversation and trigger continuation to get output
@@ -585,14 +468,13 @@ def handle_output_item_done(data):
         print(f"  Shell call command: {item.get('action', {}).get('commands')}")
 
         # Update UI message
-        for msg in st.session_state.chat_messages:
-            if msg.get("id") == item_id and msg.get("type") == "tool_call":
-                command = item.get("action", {}).get("commands", [])
-                if command:
-                    msg["command"] = command[0] if isinstance(command, list) else command
-                # Mark as completed - shell has executed, we'll get output in continuation
-                msg["status"] = "completed"
-                break
+        msg = find_chat_message(item_id, "tool_call")
+        if msg:
+            command = item.get("action", {}).get("commands", [])
+            if command:
+                msg["command"] = command[0] if isinstance(command, list) else command
+            # Mark as completed - shell has executed, we'll get output in continuation
+            msg["status"] = "completed"
 
         # Clean the shell_call item - remove fields that OpenAI doesn't accept in input
         clean_item = dict(item)
@@ -609,13 +491,12 @@ def handle_output_item_done(data):
 
     # For apply_patch calls, update output if provided
     elif item_type == "apply_patch_call":
-        for msg in st.session_state.chat_messages:
-            if msg.get("id") == item_id and msg.get("type") == "tool_call":
-                msg["status"] = "completed"
-                output = item.get("output")
-                if output:
-                    msg["output"] = output
-                break
+        msg = find_chat_message(item_id, "tool_call")
+        if msg:
+            msg["status"] = "completed"
+            output = item.get("output")
+            if output:
+                msg["output"] = output
         st.session_state.conversation_items.append(item)
 
     # For other item types, add to conversation_items
@@ -628,13 +509,27 @@ def handle_function_call_arguments_delta(data):
     delta = data.get("delta", "")
     item_id = data.get("item_id")
     
-    for msg in st.session_state.chat_messages:
-        if msg.get("id") == item_id and msg.get("type") == "tool_call":
-            msg["arguments"] = msg.get("arguments", "") + delta
-            try:
-                msg["parsedArguments"] = parse_partial_json(msg["arguments"])
-            except:
-                pass
+    msg = find_chat_message(item_id, "tool_call")
+    if msg:
+        append_stream_text(msg, "arguments", delta)
+        # Parsed incrementally: each delta is scanned once, not the whole string again
+        parser = append_stream_json(msg, "parsedArguments", delta)
+        if parser.done and parser.error is None and not st.session_state.get("server_tool_execution"):
+            start_speculative_call(msg, parser.getvalue())
+
+
+def start_speculative_call(msg, arguments):
+    """Start an idempotent function while the model is still streaming its call.
+
+    execute_pending_function_calls reuses the result if the final arguments
+    are the same, and cancels the call otherwise.
+    """
+    calls = st.session_state.setdefault("speculative_calls", {})
+    if msg.get("name") not in SPECULATIVE_FUNCTIONS or not isinstance(arguments, dict) or msg["id"] in calls:
+        return
+    print(f"  Speculatively starting {msg.get('name')} {arguments}")
+    future = get_speculation_executor().submit(call_function, msg.get("name"), arguments, get_api_client())
+    calls[msg["id"]] = (arguments, future)
 
 
 def handle_function_call_arguments_done(data):
@@ -646,11 +541,196 @@ def handle_function_call_arguments_done(data):
     final_args = data.get("arguments", "")
 
     # Find and update the message with final arguments
-    for msg in st.session_state.chat_messages:
-        if msg.get("id") == item_id and msg.get("type") == "tool_call":
-            msg["arguments"] = final_args
-            msg["parsedArguments"] = parse_partial_json(final_args)
-            break
+    msg = find_chat_message(item_id, "tool_call")
+    if msg:
+        flush_stream_text(msg)
+        msg["arguments"] = final_args
+        msg["parsedArguments"] = parse_partial_json(final_args)
+
+
+def handle_function_call_output_in_progress(data):
+    """Handle a function call the backend has started executing"""
+    item_id = data.get("item_id")
+    print(f"  Backend executing {data.get('name')} (call_id={data.get('call_id')})")
+
+    msg = find_chat_message(item_id, "tool_call")
+    if msg:
+        msg["status"] = "in_progress"
+
+
+def handle_function_call_output_done(data):
+    """Handle a function call output produced by the backend"""
+    item = data.get("item", {})
+    item_id = data.get("item_id")
+
+    # Keep the output in history so later turns stay valid
+    st.session_state.conversation_items.append(item)
+    print(f"  Added backend function_call_output: call_id={item.get('call_id')}")
+
+    msg = find_chat_message(item_id, "tool_call")
+    if msg:
+        msg["status"] = "completed"
+        msg["output"] = item.get("output")
+        msg["call_id"] = item.get("call_id")
+
+
+def handle_turn_step_limit(data):
+    """The backend reached its tool step limit and ended the turn without running the last calls.
+    Those calls stay unanswered, so the next turn drops them and resends the full history."""
+    text = f"Stopped after {data.get('max_steps')} tool steps, the last function calls were not run."
+    print(f"  ⚠️ {text} call_ids={data.get('call_ids')}")
+    add_chat_message({
+        "type": "message",
+        "role": "assistant",
+        "content": [{"type": "output_text", "text": f"⚠️ {text}"}],
+    })
+
+
+def call_function(function_name, parsed_args, client):
+    """Call a function tool endpoint on the backend through the shared API client and return its result"""
+    if function_name == "get_weather":
+        location = parsed_args.get("location", "")
+        unit = parsed_args.get("unit", "celsius")
+        response = client.get(
+            "/api/functions/get_weather",
+            params={"location": location, "unit": unit},
+            timeout=10
+        )
+        if response.ok:
+            return response.json()
+        return {"error": f"Function call failed: {response.status_code}", "details": response.text[:200]}
+    elif function_name == "get_joke":
+        response = client.get(
+            "/api/functions/get_joke",
+            timeout=10
+        )
+        if response.ok:
+            return response.json()
+        return {"error": f"Function call failed: {response.status_code}", "details": response.text[:200]}
+    elif function_name == "scrape_website":
+        url = parsed_args.get("url", "")
+        wait_for_js = parsed_args.get("wait_for_js")
+        wait_timeout = parsed_args.get("wait_timeout")
+
+        params = {"url": url}
+        if wait_for_js is not None:
+            params["wait_for_js"] = wait_for_js
+        if wait_timeout is not None:
+            params["wait_timeout"] = wait_timeout
+        if parsed_args.get("render_profile"):
+            params["render_profile"] = parsed_args["render_profile"]
+        if parsed_args.get("wait_for_selector"):
+            params["wait_for_selector"] = parsed_args["wait_for_selector"]
+
+        timeout_value = (wait_timeout if wait_timeout is not None else 30) + 10
+        print(f"  Calling scrape_website with params: {params}, timeout: {timeout_value}")
+        response = client.get(
+            "/api/functions/scrape_website",
+            params=params,
+            timeout=timeout_value
+        )
+        if response.ok:
+            return response.json()
+        error_text = response.text[:500] if response.text else "No error details"
+        print(f"  Scrape failed: {response.status_code} - {error_text}")
+        return {
+            "error": f"Function call failed: {response.status_code}",
+            "details": error_text,
+            "url": url
+        }
+    elif function_name == "scrape_websites":
+        urls = parsed_args.get("urls") or []
+        params = [("urls", url) for url in urls]
+        if parsed_args.get("wait_for_js") is not None:
+            params.append(("wait_for_js", parsed_args["wait_for_js"]))
+        if parsed_args.get("render_profile"):
+            params.append(("render_profile", parsed_args["render_profile"]))
+
+        print(f"  Calling scrape_websites for {len(urls)} URL(s)")
+        # The backend streams one JSON line per page as it finishes
+        results = []
+        with client.get(
+            "/api/functions/scrape_websites",
+            params=params,
+            stream=True,
+            timeout=70
+        ) as response:
+            if not response.ok:
+                return {"error": f"Function call failed: {response.status_code}", "details": response.text[:500]}
+            for line in response.iter_lines():
+                if line:
+                    result = json.loads(line)
+                    print(f"  Scraped [{result.get('index')}] {result.get('url')}: {result.get('status', 'success')}")
+                    results.append(result)
+        return {"results": sorted(results, key=lambda result: result.get("index", 0))}
+    return {"error": f"Unknown function: {function_name}"}
+
+
+def execute_pending_function_calls():
+    """Run the function calls queued during the stream concurrently.
+
+    Independent calls (e.g. weather for several cities) overlap instead of
+    paying the sum of their latencies. Outputs are added to the conversation
+    together so a single continuation request carries all of them.
+    """
+    pending = st.session_state.pending_function_calls
+    st.session_state.pending_function_calls = []
+    speculative = st.session_state.get("speculative_calls") or {}
+    st.session_state.speculative_calls = {}
+
+    # Speculative calls are reused when the model finished them with the same arguments
+    started = []
+    for item, msg in pending:
+        arguments, future = speculative.pop(item.get("id"), (None, None))
+        if future is not None and arguments != msg.get("parsedArguments"):
+            print(f"  Discarding speculative {item.get('name')}: final arguments differ")
+            future.cancel()
+            future = None
+        started.append(future)
+    for _, future in speculative.values():
+        future.cancel()
+    if not pending:
+        return
+
+    # Resolved here: worker threads have no Streamlit script context
+    client = get_api_client()
+
+    def run(item, msg, future):
+        try:
+            if future is not None:
+                return future.result()
+            return call_function(item.get("name"), msg.get("parsedArguments", {}), client)
+        except Exception as e:
+            print(f"Error executing function {item.get('name')}: {e}")
+            return {"error": str(e)}
+
+    # Worker threads only do HTTP - session state is updated on this thread
+    print(f"Executing {len(pending)} function call(s) with up to {FUNCTION_CALL_CONCURRENCY} in parallel")
+    with ThreadPoolExecutor(max_workers=min(FUNCTION_CALL_CONCURRENCY, len(pending))) as executor:
+        results = list(executor.map(run, [item for item, _ in pending], [msg for _, msg in pending], started))
+
+    for (item, msg), tool_result in zip(pending, results):
+        call_id = str(item.get("call_id"))
+        output_str = json.dumps(tool_result)
+
+        # Add function_call to conversation_items first, then its output
+        st.session_state.conversation_items.append(item)
+        st.session_state.conversation_items.append({
+            "type": "function_call_output",
+            "call_id": call_id,
+            "status": "completed",
+            "output": output_str,
+        })
+        output_preview = output_str[:100] + '...' if len(output_str) > 100 else output_str
+        print(f"  Added function_call_output: call_id={call_id}, output_len={len(output_str)}, preview={output_preview}")
+
+        # Update message with output
+        msg["status"] = "completed"
+        msg["output"] = output_str
+        msg["call_id"] = call_id
+
+    # Trigger continuation
+    st.session_state.needs_continuation = True
 
 
 def handle_mcp_call_arguments_delta(data):
@@ -658,13 +738,11 @@ def handle_mcp_call_arguments_delta(data):
     delta = data.get("delta", "")
     item_id = data.get("item_id")
     
-    for msg in st.session_state.chat_messages:
-        if msg.get("id") == item_id and msg.get("type") == "tool_call":
-            msg["arguments"] = msg.get("arguments", "") + delta
-            try:
-                msg["parsedArguments"] = parse_partial_json(msg["arguments"])
-            except:
-                pass
+    msg = find_chat_message(item_id, "tool_call")
+    if msg:
+        append_stream_text(msg, "arguments", delta)
+        # Parsed incrementally: each delta is scanned once, not the whole string again
+        append_stream_json(msg, "parsedArguments", delta)
 
 
 def handle_mcp_call_arguments_done(data):
@@ -672,11 +750,12 @@ def handle_mcp_call_arguments_done(data):
     item_id = data.get("item_id")
     final_args = data.get("arguments", "")
     
-    for msg in st.session_state.chat_messages:
-        if msg.get("id") == item_id and msg.get("type") == "tool_call":
-            msg["arguments"] = final_args
-            msg["parsedArguments"] = parse_partial_json(final_args)
-            msg["status"] = "completed"
+    msg = find_chat_message(item_id, "tool_call")
+    if msg:
+        flush_stream_text(msg)
+        msg["arguments"] = final_args
+        msg["parsedArguments"] = parse_partial_json(final_args)
+        msg["status"] = "completed"
 
 
 def handle_web_search_completed(data):
@@ -684,10 +763,10 @@ def handle_web_search_completed(data):
     item_id = data.get("item_id")
     output = data.get("output")
     
-    for msg in st.session_state.chat_messages:
-        if msg.get("id") == item_id and msg.get("type") == "tool_call":
-            msg["status"] = "completed"
-            msg["output"] = output
+    msg = find_chat_message(item_id, "tool_call")
+    if msg:
+        msg["status"] = "completed"
+        msg["output"] = output
 
 
 def handle_file_search_completed(data):
@@ -695,10 +774,10 @@ def handle_file_search_completed(data):
     item_id = data.get("item_id")
     output = data.get("output")
     
-    for msg in st.session_state.chat_messages:
-        if msg.get("id") == item_id and msg.get("type") == "tool_call":
-            msg["status"] = "completed"
-            msg["output"] = output
+    msg = find_chat_message(item_id, "tool_call")
+    if msg:
+        msg["status"] = "completed"
+        msg["output"] = output
 
 
 def handle_code_interpreter_code_delta(data):
@@ -706,13 +785,9 @@ def handle_code_interpreter_code_delta(data):
     delta = data.get("delta", "")
     item_id = data.get("item_id")
     
-    for msg in reversed(st.session_state.chat_messages):
-        if (msg.get("type") == "tool_call" and
-            msg.get("tool_type") == "code_interpreter_call" and
-            msg.get("id") == item_id and
-            msg.get("status") != "completed"):
-            msg["code"] = msg.get("code", "") + delta
-            break
+    msg = find_chat_message(item_id, "tool_call")
+    if msg and msg.get("tool_type") == "code_interpreter_call" and msg.get("status") != "completed":
+        append_stream_text(msg, "code", delta)
 
 
 def handle_code_interpreter_code_done(data):
@@ -720,33 +795,37 @@ def handle_code_interpreter_code_done(data):
     code = data.get("code", "")
     item_id = data.get("item_id")
     
-    for msg in reversed(st.session_state.chat_messages):
-        if (msg.get("type") == "tool_call" and
-            msg.get("tool_type") == "code_interpreter_call" and
-            msg.get("id") == item_id):
-            msg["code"] = code
-            msg["status"] = "completed"
-            break
+    msg = find_chat_message(item_id, "tool_call")
+    if msg and msg.get("tool_type") == "code_interpreter_call":
+        flush_stream_text(msg)
+        msg["code"] = code
+        msg["status"] = "completed"
 
 
 def handle_code_interpreter_completed(data):
     """Handle code interpreter completed"""
     item_id = data.get("item_id")
     
-    for msg in st.session_state.chat_messages:
-        if msg.get("id") == item_id and msg.get("type") == "tool_call":
-            msg["status"] = "completed"
+    msg = find_chat_message(item_id, "tool_call")
+    if msg:
+        msg["status"] = "completed"
 
 
 def handle_response_completed(data):
     """Handle response completed"""
     response = data.get("response", {})
     output = response.get("output", [])
+
+    # Conversation-state mode: the next turn chains on this response and only
+    # sends the client items added after this point
+    if response.get("id"):
+        st.session_state.last_response_id = response.get("id")
+        st.session_state.sent_item_count = len(st.session_state.conversation_items)
     
     # Handle MCP tools list
     for item in output:
         if item.get("type") == "mcp_list_tools":
-            st.session_state.chat_messages.append({
+            add_chat_message({
                 "type": "mcp_list_tools",
                 "id": item.get("id"),
                 "server_label": item.get("server_label"),
@@ -754,7 +833,7 @@ def handle_response_completed(data):
             })
         
         elif item.get("type") == "mcp_approval_request":
-            st.session_state.chat_messages.append({
+            add_chat_message({
                 "type": "mcp_approval_request",
                 "id": item.get("id"),
                 "server_label": item.get("server_label"),
@@ -775,13 +854,9 @@ def handle_shell_call_command_delta(data):
     delta = data.get("delta", "")
     item_id = data.get("item_id")
 
-    for msg in reversed(st.session_state.chat_messages):
-        if (msg.get("type") == "tool_call" and
-            msg.get("tool_type") == "shell_call" and
-            msg.get("id") == item_id and
-            msg.get("status") != "completed"):
-            msg["command"] = msg.get("command", "") + delta
-            break
+    msg = find_chat_message(item_id, "tool_call")
+    if msg and msg.get("tool_type") == "shell_call" and msg.get("status") != "completed":
+        append_stream_text(msg, "command", delta)
 
 
 def handle_shell_call_command_done(data):
@@ -790,12 +865,10 @@ def handle_shell_call_command_done(data):
     command = data.get("command", "")
     item_id = data.get("item_id")
 
-    for msg in reversed(st.session_state.chat_messages):
-        if (msg.get("type") == "tool_call" and
-            msg.get("tool_type") == "shell_call" and
-            msg.get("id") == item_id):
-            msg["command"] = command
-            break
+    msg = find_chat_message(item_id, "tool_call")
+    if msg and msg.get("tool_type") == "shell_call":
+        flush_stream_text(msg)
+        msg["command"] = command
 
 
 def handle_shell_call_output_delta(data):
@@ -806,13 +879,9 @@ def handle_shell_call_output_delta(data):
     item_id = data.get("item_id")
 
     # Find the shell_call message and append output
-    for msg in reversed(st.session_state.chat_messages):
-        if (msg.get("type") == "tool_call" and
-            msg.get("tool_type") == "shell_call" and
-            msg.get("id") == item_id):
-            current_output = msg.get("output", "")
-            msg["output"] = current_output + delta
-            break
+    msg = find_chat_message(item_id, "tool_call")
+    if msg and msg.get("tool_type") == "shell_call":
+        append_stream_text(msg, "output", delta)
 
 
 def handle_shell_call_output_done(data):
@@ -822,11 +891,11 @@ def handle_shell_call_output_done(data):
     output = data.get("output", "")
     item_id = data.get("item_id")
 
-    for msg in st.session_state.chat_messages:
-        if msg.get("id") == item_id and msg.get("type") == "tool_call":
-            msg["output"] = output
-            msg["status"] = "completed"
-            break
+    msg = find_chat_message(item_id, "tool_call")
+    if msg:
+        flush_stream_text(msg)
+        msg["output"] = output
+        msg["status"] = "completed"
 
 
 def handle_shell_call_completed(data):
@@ -842,12 +911,13 @@ def handle_shell_call_completed(data):
     if output:
         print(f"  Output type: {type(output)}, preview: {str(output)[:200]}")
 
-    for msg in st.session_state.chat_messages:
-        if msg.get("id") == item_id and msg.get("type") == "tool_call":
-            msg["status"] = "completed"
-            if output:
-                msg["output"] = output
-                print(f"  Updated shell message with output")
+    msg = find_chat_message(item_id, "tool_call")
+    if msg:
+        flush_stream_text(msg)
+        msg["status"] = "completed"
+        if output:
+            msg["output"] = output
+            print(f"  Updated shell message with output")
 
 
 def handle_apply_patch_call_completed(data):
@@ -855,10 +925,10 @@ def handle_apply_patch_call_completed(data):
     item_id = data.get("item_id")
     output = data.get("output")
 
-    for msg in st.session_state.chat_messages:
-        if msg.get("id") == item_id and msg.get("type") == "tool_call":
-            msg["status"] = "completed"
-            msg["output"] = output
+    msg = find_chat_message(item_id, "tool_call")
+    if msg:
+        msg["status"] = "completed"
+        msg["output"] = output
 
 
 def normalize_annotation(annotation):
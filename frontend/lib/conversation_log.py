@@ -0,0 +1,62 @@
+"""Conversation items with function calls paired to their outputs"""
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+
+class ConversationLog(list):
+    """The list of conversation items, indexed by call_id as items are appended.
+
+    Pairing a function_call with its function_call_output happens once, on
+    append, so checking for unpaired calls is O(1) and building the items to
+    send only filters when something is actually unpaired. Items are only
+    ever appended; a new conversation starts a new log.
+    """
+
+    def __init__(self, items: Iterable[Dict[str, Any]] = ()):
+        super().__init__()
+        self._calls: Dict[Any, Dict[str, Any]] = {}
+        self._outputs: Dict[Any, Dict[str, Any]] = {}
+        # Calls still waiting for their output, and outputs whose call isn't logged
+        self.unpaired_calls: Set[Any] = set()
+        self.orphan_outputs: Set[Any] = set()
+        self.extend(items)
+
+    def append(self, item: Dict[str, Any]):
+        super().append(item)
+        item_type = item.get("type")
+        call_id = item.get("call_id")
+        if item_type == "function_call":
+            self._calls[call_id] = item
+            if call_id in self._outputs:
+                self.orphan_outputs.discard(call_id)
+            else:
+                self.unpaired_calls.add(call_id)
+        elif item_type == "function_call_output":
+            self._outputs[call_id] = item
+            if call_id in self._calls:
+                self.unpaired_calls.discard(call_id)
+            else:
+                self.orphan_outputs.add(call_id)
+
+    def extend(self, items: Iterable[Dict[str, Any]]):
+        for item in items:
+            self.append(item)
+
+    def get_call(self, call_id) -> Optional[Dict[str, Any]]:
+        return self._calls.get(call_id)
+
+    def get_output(self, call_id) -> Optional[Dict[str, Any]]:
+        return self._outputs.get(call_id)
+
+    def complete_items(self) -> List[Dict[str, Any]]:
+        """The items to send: every function_call must have its output and every output its call"""
+        if not self.unpaired_calls and not self.orphan_outputs:
+            return list(self)
+        for call_id in self.unpaired_calls:
+            print(f"  ⚠️ Filtering out incomplete function_call: call_id={call_id}")
+        for call_id in self.orphan_outputs:
+            print(f"  ⚠️ Filtering out function_call_output with unknown call_id: call_id={call_id}")
+        return [
+            item for item in self
+            if not (item.get("type") == "function_call" and item.get("call_id") in self.unpaired_calls)
+            and not (item.get("type") == "function_call_output" and item.get("call_id") in self.orphan_outputs)
+        ]
@@ -0,0 +1,277 @@
+"""Incremental JSON parser for streamed tool-call arguments"""
+import json
+import re
+from typing import Any, List, Optional
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRING_SPECIAL = re.compile(r'["\\]')
+_NUMBER_CHARS = re.compile(r"[0-9eE+\-.]*")
+_LITERAL_CHARS = re.compile(r"[a-z]*")
+
+_LITERALS = {"true": True, "false": False, "null": None}
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+# What a container frame expects next
+_KEY, _COLON, _VALUE, _COMMA = "key", "colon", "value", "comma"
+
+
+class _Frame:
+    __slots__ = ("container", "state", "key")
+
+    def __init__(self, container):
+        self.container = container
+        self.state = _KEY if isinstance(container, dict) else _VALUE
+        self.key: Optional[str] = None
+
+
+class IncrementalJSONParser:
+    """Parse a JSON document fed in arbitrary pieces, keeping state between feeds.
+
+    Every character is scanned once: objects and arrays are built in place as
+    their members complete, and the unfinished token (a string, number or
+    literal) is kept in chunks. getvalue() returns the best-effort object so
+    far, with a partial string value shown as received and a member whose key
+    is still incomplete left out. Invalid input stops the parser and sets
+    error; the value parsed until then stays available.
+    """
+
+    def __init__(self):
+        self._stack: List[_Frame] = []
+        self._root: Any = None
+        self._has_root = False
+        self._token: Optional[str] = None  # "string", "key", "number" or "literal"
+        self._chunks: List[str] = []
+        self._escape = ""
+        self._surrogates = False
+        self.done = False
+        self.error: Optional[str] = None
+
+    def feed(self, text: str):
+        """Consume the next piece of the document"""
+        pos = 0
+        end = len(text)
+        while pos < end and self.error is None:
+            if self._token is not None:
+                pos = self._continue_token(text, pos)
+            else:
+                pos = _WHITESPACE.match(text, pos).end()
+                if pos < end:
+                    pos = self._structural(text, pos)
+
+    def getvalue(self) -> Any:
+        """The value parsed so far (the same live object while containers are open)"""
+        if self._token == "string":
+            self._set_slot(self._string_value(final=False))
+        elif self._token in ("number", "literal"):
+            partial = self._scalar_value("".join(self._chunks))
+            if partial is not _INVALID:
+                self._set_slot(partial)
+        return self._root
+
+    def _structural(self, text: str, pos: int) -> int:
+        char = text[pos]
+        frame = self._stack[-1] if self._stack else None
+        if frame is None and self._has_root:
+            return self._fail(f"Unexpected {char!r} after the document")
+
+        if frame is not None and frame.state == _KEY:
+            if char == '"':
+                self._start_token("key")
+            elif char == "}" and not frame.container:
+                self._close()
+            else:
+                return self._fail(f"Expected an object key, got {char!r}")
+        elif frame is not None and frame.state == _COLON:
+            if char != ":":
+                return self._fail(f"Expected ':', got {char!r}")
+            frame.state = _VALUE
+        elif frame is not None and frame.state == _COMMA:
+            closing = "}" if isinstance(frame.container, dict) else "]"
+            if char == ",":
+                frame.state = _KEY if closing == "}" else _VALUE
+            elif char == closing:
+                self._close()
+            else:
+                return self._fail(f"Expected ',' or {closing!r}, got {char!r}")
+        elif char == "]" and frame is not None and isinstance(frame.container, list) and not frame.container:
+            self._close()
+        elif char == "{" or char == "[":
+            container = {} if char == "{" else []
+            self._put(container)
+            self._stack.append(_Frame(container))
+        elif char == '"':
+            self._put("")
+            self._start_token("string")
+        elif char == "-" or char.isdigit():
+            self._put(None)
+            self._start_token("number")
+            return pos
+        elif char in "tfn":
+            self._put(None)
+            self._start_token("literal")
+            return pos
+        else:
+            return self._fail(f"Unexpected {char!r}")
+        return pos + 1
+
+    def _continue_token(self, text: str, pos: int) -> int:
+        if self._token in ("string", "key"):
+            return self._continue_string(text, pos)
+        pattern = _NUMBER_CHARS if self._token == "number" else _LITERAL_CHARS
+        stop = pattern.match(text, pos).end()
+        self._chunks.append(text[pos:stop])
+        if stop < len(text):
+            # A delimiter ends the token; it is handled as structure next
+            self._finish_scalar()
+        return stop
+
+    def _continue_string(self, text: str, pos: int) -> int:
+        end = len(text)
+        while pos < end:
+            if self._escape:
+                pos = self._continue_escape(text, pos)
+                if self.error is not None:
+                    return end
+                continue
+            match = _STRING_SPECIAL.search(text, pos)
+            if match is None:
+                self._chunks.append(text[pos:])
+                return end
+            stop = match.start()
+            if stop > pos:
+                self._chunks.append(text[pos:stop])
+            if text[stop] == "\\":
+                self._escape = "\\"
+                pos = stop + 1
+            else:
+                self._finish_string()
+                return stop + 1
+        return end
+
+    def _continue_escape(self, text: str, pos: int) -> int:
+        if self._escape == "\\":
+            char = text[pos]
+            if char == "u":
+                self._escape = "\\u"
+            elif char in _ESCAPES:
+                self._chunks.append(_ESCAPES[char])
+                self._escape = ""
+            else:
+                self._fail(f"Invalid escape '\\{char}'")
+            return pos + 1
+        # \uXXXX, possibly split across feeds
+        needed = 6 - len(self._escape)
+        self._escape += text[pos:pos + needed]
+        pos += min(needed, len(text) - pos)
+        if len(self._escape) == 6:
+            try:
+                code = int(self._escape[2:], 16)
+            except ValueError:
+                self._fail(f"Invalid escape {self._escape!r}")
+                return pos
+            self._surrogates = self._surrogates or 0xD800 <= code <= 0xDFFF
+            self._chunks.append(chr(code))
+            self._escape = ""
+        return pos
+
+    def _start_token(self, token: str):
+        self._token = token
+        self._chunks = []
+        self._escape = ""
+        self._surrogates = False
+
+    def _string_value(self, final: bool) -> str:
+        chunks = self._chunks
+        if len(chunks) > 1:
+            chunks[:] = ["".join(chunks)]
+        value = chunks[0] if chunks else ""
+        if self._surrogates:
+            # Escaped surrogate pairs (😀) combine into one character
+            value = value.encode("utf-16", "surrogatepass").decode("utf-16", "strict" if final else "replace")
+        return value
+
+    def _finish_string(self):
+        try:
+            value = self._string_value(final=True)
+        except UnicodeDecodeError:
+            self._fail("Invalid surrogate pair")
+            return
+        token, self._token = self._token, None
+        self._chunks = []
+        if token == "key":
+            frame = self._stack[-1]
+            frame.key = value
+            frame.state = _COLON
+        else:
+            self._set_slot(value)
+            self._completed()
+
+    def _finish_scalar(self):
+        value = self._scalar_value("".join(self._chunks))
+        if value is _INVALID:
+            self._fail(f"Invalid value {''.join(self._chunks)!r}")
+            return
+        self._token = None
+        self._chunks = []
+        self._set_slot(value)
+        self._completed()
+
+    def _scalar_value(self, raw: str) -> Any:
+        if self._token == "literal":
+            return _LITERALS.get(raw, _INVALID)
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return _INVALID
+
+    def _put(self, value: Any):
+        """Place a new value in the open container (or as the root)"""
+        if not self._stack:
+            self._root = value
+            self._has_root = True
+            return
+        frame = self._stack[-1]
+        if isinstance(frame.container, dict):
+            frame.container[frame.key] = value
+        else:
+            frame.container.append(value)
+        frame.state = _COMMA
+
+    def _set_slot(self, value: Any):
+        """Replace the value most recently placed by _put"""
+        if not self._stack:
+            self._root = value
+            return
+        frame = self._stack[-1]
+        if isinstance(frame.container, dict):
+            frame.container[frame.key] = value
+        else:
+            frame.container[-1] = value
+
+    def _completed(self):
+        if self._stack:
+            self._stack[-1].state = _COMMA
+        else:
+            self.done = True
+
+    def _close(self):
+        self._stack.pop()
+        if not self._stack:
+            self.done = True
+
+    def _fail(self, message: str) -> int:
+        self.error = message
+        self._token = None
+        return 0
+
+
+# Marks a number or literal that is not (yet) valid
+_INVALID = object()
+
+
+def parse_partial_json(json_str: str) -> Any:
+    """Best-effort value of a possibly truncated JSON document ({} if there is none)"""
+    parser = IncrementalJSONParser()
+    parser.feed(json_str)
+    value = parser.getvalue()
+    return {} if value is None and not parser.done else value
@@ -0,0 +1,114 @@
+"""Incremental Server-Sent Events decoder"""
+from typing import Iterable, Iterator, List, Optional
+
+_BOM = b"\xef\xbb\xbf"
+
+
+class SSEEvent:
+    """One dispatched event: its type, data (multi-line data joined with newlines), id and retry"""
+
+    __slots__ = ("event", "data", "id", "retry")
+
+    def __init__(self, event: str, data: str, id: Optional[str], retry: Optional[int]):
+        self.event = event
+        self.data = data
+        self.id = id
+        self.retry = retry
+
+    def __repr__(self):
+        return f"SSEEvent(event={self.event!r}, data={self.data[:40]!r}, id={self.id!r}, retry={self.retry!r})"
+
+
+class SSEDecoder:
+    """Decode an SSE byte stream chunk by chunk, following the WHATWG event-stream rules.
+
+    Bytes are appended to a bytearray and every byte is scanned once: each
+    feed decodes the newly completed lines straight from the buffer through a
+    memoryview, and only the unterminated tail is kept for the next feed.
+    Handles CRLF/LF/CR line endings (also split across chunks), comments,
+    multi-line data, event, id and retry fields.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._started = False
+        self._pending_cr = False
+        self._event_type = ""
+        self._data: List[str] = []
+        self.last_event_id: Optional[str] = None
+        self.retry: Optional[int] = None
+
+    def feed(self, chunk: bytes) -> Iterator[SSEEvent]:
+        """Add received bytes and yield every event they complete"""
+        if not chunk:
+            return
+        if not self._started:
+            self._buffer += chunk
+            if len(self._buffer) < len(_BOM) and _BOM.startswith(bytes(self._buffer)):
+                return
+            self._started = True
+            if self._buffer.startswith(_BOM):
+                del self._buffer[:len(_BOM)]
+            chunk = bytes(self._buffer)
+            self._buffer.clear()
+
+        # A CRLF split across chunks is one line ending, not two
+        if self._pending_cr and chunk[:1] == b"\n":
+            chunk = chunk[1:]
+        self._pending_cr = chunk[-1:] == b"\r"
+        if b"\r" in chunk:
+            chunk = chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+        # The buffered tail has no newline, so only the new bytes are searched
+        scan = len(self._buffer)
+        self._buffer += chunk
+        end = self._buffer.rfind(b"\n", scan)
+        if end < 0:
+            return
+        # Complete lines end on a character boundary: decode them in one pass straight
+        # from the buffer and keep only the unterminated tail for the next feed
+        with memoryview(self._buffer) as view:
+            text = str(view[:end], "utf-8", "replace")
+        del self._buffer[:end + 1]
+
+        data = self._data
+        for line in text.split("\n"):
+            if not line:
+                event = self._dispatch()
+                if event is not None:
+                    yield event
+            elif line.startswith("data: "):
+                # Fast path for the line almost every event consists of
+                data.append(line[6:])
+            elif line[0] != ":":  # ":" starts a comment (keep-alives)
+                self._process_field(line)
+
+    def _process_field(self, line: str):
+        field, _, value = line.partition(":")
+        if value[:1] == " ":
+            value = value[1:]
+        if field == "data":
+            self._data.append(value)
+        elif field == "event":
+            self._event_type = value
+        elif field == "id":
+            if "\0" not in value:
+                self.last_event_id = value
+        elif field == "retry":
+            if value.isascii() and value.isdigit():
+                self.retry = int(value)
+
+    def _dispatch(self) -> Optional[SSEEvent]:
+        event_type, self._event_type = self._event_type, ""
+        if not self._data:
+            return None
+        data = "\n".join(self._data)
+        self._data.clear()
+        return SSEEvent(event_type or "message", data, self.last_event_id, self.retry)
+
+
+def iter_sse_events(chunks: Iterable[bytes]) -> Iterator[SSEEvent]:
+    """Decode an iterable of byte chunks (e.g. response.iter_content(None)) into events"""
+    decoder = SSEDecoder()
+    for chunk in chunks:
+        yield from decoder.feed(chunk)
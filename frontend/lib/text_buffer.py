@@ -0,0 +1,39 @@
+"""Append-only text buffer for streamed deltas"""
+from typing import List
+
+
+class TextBuffer:
+    """Text built from a list of chunks, joined only when it is read.
+
+    Appending a delta is O(len(delta)) instead of copying the whole text
+    each time; getvalue() joins the pending chunks once and keeps the
+    result, so reading it again without new deltas is free.
+    """
+
+    __slots__ = ("_chunks", "_length")
+
+    def __init__(self, initial: str = ""):
+        self._chunks: List[str] = [initial] if initial else []
+        self._length = len(initial)
+
+    def append(self, text: str):
+        if text:
+            self._chunks.append(text)
+            self._length += len(text)
+
+    def getvalue(self) -> str:
+        chunks = self._chunks
+        if not chunks:
+            return ""
+        if len(chunks) > 1:
+            chunks[:] = ["".join(chunks)]
+        return chunks[0]
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def __str__(self):
+        return self.getvalue()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules import each other as top-level packages (lib, utils, components), as when run from frontend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
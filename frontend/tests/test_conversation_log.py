@@ -0,0 +1,38 @@
+from lib.conversation_log import ConversationLog
+
+
+def call(call_id):
+    return {"type": "function_call", "call_id": call_id, "name": "get_joke", "arguments": "{}"}
+
+
+def output(call_id):
+    return {"type": "function_call_output", "call_id": call_id, "output": "{}"}
+
+
+def test_calls_pair_with_their_outputs():
+    user = {"role": "user", "content": "jokes"}
+    log = ConversationLog([user, call("a")])
+    assert log.unpaired_calls == {"a"}
+
+    log.append(output("a"))
+    assert not log.unpaired_calls and not log.orphan_outputs
+    assert log.get_call("a") == call("a") and log.get_output("a") == output("a")
+    assert log.complete_items() == [user, call("a"), output("a")]
+
+
+def test_output_before_its_call_pairs_once_the_call_arrives():
+    log = ConversationLog([output("a")])
+    assert log.orphan_outputs == {"a"}
+    log.append(call("a"))
+    assert not log.orphan_outputs and not log.unpaired_calls
+    assert log.complete_items() == [output("a"), call("a")]
+
+
+def test_complete_items_leaves_out_unpaired_items():
+    user = {"role": "user", "content": "jokes"}
+    log = ConversationLog([user, call("a"), output("a"), call("b"), output("x")])
+    assert log.unpaired_calls == {"b"}
+    assert log.orphan_outputs == {"x"}
+    assert log.complete_items() == [user, call("a"), output("a")]
+    # Filtering does not change the log itself
+    assert len(log) == 5
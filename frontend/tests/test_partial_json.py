@@ -0,0 +1,78 @@
+import json
+import random
+import pytest
+from lib.partial_json import IncrementalJSONParser, parse_partial_json
+
+DOCUMENTS = [
+    {"location": "San Francisco, CA", "unit": "celsius"},
+    {"urls": ["https://example.com/a", "https://example.org/b"], "wait_for_js": True, "render_profile": "text"},
+    {"nested": {"list": [1, -2.5, 3e10, None, False, {"deep": []}], "empty": {}}, "n": 0},
+    {"escapes": "quote \" backslash \\ slash / tab \t newline \n", "unicode": "café 😀  "},
+    [1, "two", [3, [4]], {"five": 5}],
+    "just a string",
+    -12.5e-3,
+    None,
+]
+
+
+def feed_in_random_chunks(text, rng):
+    parser = IncrementalJSONParser()
+    pos = 0
+    while pos < len(text):
+        size = rng.randint(1, 6)
+        parser.feed(text[pos:pos + size])
+        pos += size
+        # Reading the value mid-stream must not disturb the parse
+        parser.getvalue()
+    return parser
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_random_chunks_match_json_loads(document):
+    rng = random.Random(42)
+    for ensure_ascii in (True, False):
+        text = json.dumps(document, ensure_ascii=ensure_ascii, indent=rng.choice([None, 2]))
+        for _ in range(50):
+            parser = feed_in_random_chunks(text, rng)
+            assert parser.error is None
+            # A bare number or literal could still continue, so only containers and strings know they are done
+            assert parser.done or not isinstance(document, (dict, list, str))
+            assert parser.getvalue() == json.loads(text)
+
+
+def test_partial_values():
+    assert parse_partial_json('{"location": "San Fr') == {"location": "San Fr"}
+    # A key that is still streaming is left out
+    assert parse_partial_json('{"location": "Paris", "un') == {"location": "Paris"}
+    assert parse_partial_json('{"location": "Paris", "unit":') == {"location": "Paris"}
+    assert parse_partial_json('{"a": [1, {"b"') == {"a": [1, {}]}
+    assert parse_partial_json('{"count": 12') == {"count": 12}
+    assert parse_partial_json('{"count": -') == {"count": None}
+    assert parse_partial_json('{"ok": tr') == {"ok": None}
+    assert parse_partial_json('{"urls": ["https://a", "https://b') == {"urls": ["https://a", "https://b"]}
+    assert parse_partial_json("") == {}
+
+
+def test_unicode_escape_split_across_feeds():
+    parser = IncrementalJSONParser()
+    for piece in ['{"city": "Caf', "\\", "u00", "e", '9"}']:
+        parser.feed(piece)
+    assert parser.getvalue() == {"city": "Café"}
+
+
+def test_surrogate_pair_split_across_feeds():
+    parser = IncrementalJSONParser()
+    parser.feed('{"emoji": "\\ud83d')
+    # Half a pair is shown as a replacement character until the rest arrives
+    assert parser.getvalue() == {"emoji": "�"}
+    parser.feed('\\ude00 ok"}')
+    assert parser.done and parser.getvalue() == {"emoji": "😀 ok"}
+
+
+@pytest.mark.parametrize("text", ['{"a" 1}', '{"a": 1,, "b": 2}', "[1 2]", '{"a": nope}', '"\\x"', "{} {}", '"\\ud83d"'])
+def test_invalid_input_sets_error(text):
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    if parser.error is None:
+        parser.feed(" ")
+    assert parser.error is not None
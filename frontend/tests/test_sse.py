@@ -0,0 +1,73 @@
+import json
+import random
+import pytest
+from lib.sse import SSEDecoder, iter_sse_events
+
+STREAM = (
+    b"\xef\xbb\xbf"
+    b": keep-alive\n\n"
+    b'data: {"event": "response.output_text.delta", "data": {"delta": "caf\xc3\xa9 \xf0\x9f\x98\x80"}}\n\n'
+    b"event: update\r\nid: 7\r\ndata: line one\r\ndata: line two\r\n\r\n"
+    b": ping\r\r"
+    b"retry: 1500\rdata:no space\r\r"
+    b"data\n\n"
+    b"id: 8\nevent: ignored\n\n"
+    b"data: [DONE]\n\n"
+)
+
+
+def summary(events):
+    return [(event.event, event.data, event.id, event.retry) for event in events]
+
+
+def split_randomly(data, rng):
+    chunks, pos = [], 0
+    while pos < len(data):
+        size = rng.randint(1, 7)
+        chunks.append(data[pos:pos + size])
+        pos += size
+    return chunks
+
+
+def test_whole_stream():
+    assert summary(iter_sse_events([STREAM])) == [
+        ("message", '{"event": "response.output_text.delta", "data": {"delta": "café 😀"}}', None, None),
+        ("update", "line one\nline two", "7", None),
+        ("message", "no space", "7", 1500),
+        ("message", "", "7", 1500),
+        ("message", "[DONE]", "8", 1500),
+    ]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_chunks_match_whole_stream_decoding(seed):
+    rng = random.Random(seed)
+    expected = summary(iter_sse_events([STREAM]))
+    assert summary(iter_sse_events(split_randomly(STREAM, rng))) == expected
+    # Single bytes split every CRLF and every multi-byte character
+    assert summary(iter_sse_events(STREAM[i:i + 1] for i in range(len(STREAM)))) == expected
+
+
+def test_crlf_split_across_chunks_is_one_line_ending():
+    decoder = SSEDecoder()
+    assert list(decoder.feed(b"data: a\r")) == []
+    assert list(decoder.feed(b"\n")) == []
+    assert summary(decoder.feed(b"\r\ndata: b\r\n\r\n")) == [("message", "a", None, None), ("message", "b", None, None)]
+
+
+def test_lone_cr_ends_lines():
+    decoder = SSEDecoder()
+    assert summary(decoder.feed(b"data: a\r\r")) == [("message", "a", None, None)]
+
+
+def test_comment_keep_alives_dispatch_nothing():
+    decoder = SSEDecoder()
+    assert list(decoder.feed(b": ping\n\n: ping\n\n")) == []
+    events = list(decoder.feed(b'data: {"event": "x", "data": {}}\n\n'))
+    assert [json.loads(event.data) for event in events] == [{"event": "x", "data": {}}]
+
+
+def test_unterminated_event_is_not_dispatched():
+    decoder = SSEDecoder()
+    assert list(decoder.feed(b"data: partial")) == []
+    assert summary(decoder.feed(b"\n\n")) == [("message", "partial", None, None)]
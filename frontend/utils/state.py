@@ -1,6 +1,10 @@
 """Session state management for Streamlit app"""
 import streamlit as st
+import uuid
 from config.constants import INITIAL_MESSAGE, default_vector_store
+from lib.text_buffer import TextBuffer
+from lib.partial_json import IncrementalJSONParser
+from lib.conversation_log import ConversationLog
 
 
 def init_session_state():
@@ -15,12 +19,21 @@ def init_session_state():
             }
         ]
     
-    if "conversation_items" not in st.session_state:
-        st.session_state.conversation_items = []
+    # Also upgrades a plain list left in the session by an earlier version
+    if not isinstance(st.session_state.get("conversation_items"), ConversationLog):
+        st.session_state.conversation_items = ConversationLog(st.session_state.get("conversation_items") or [])
     
     if "is_assistant_loading" not in st.session_state:
         st.session_state.is_assistant_loading = False
     
+    # Conversation-state mode: the backend chains turns with previous_response_id
+    # and we only send the items added since the last completed response
+    if "conversation_state_enabled" not in st.session_state:
+        st.session_state.conversation_state_enabled = True
+    
+    if "conversation_id" not in st.session_state:
+        reset_conversation_state()
+    
     # Tools state
     if "web_search_enabled" not in st.session_state:
         st.session_state.web_search_enabled = True  # Enabled by default
@@ -31,6 +44,9 @@ def init_session_state():
     if "functions_enabled" not in st.session_state:
         st.session_state.functions_enabled = True  # Enabled by default
     
+    if "server_tool_execution" not in st.session_state:
+        st.session_state.server_tool_execution = True  # Run function tools on the backend
+    
     if "code_interpreter_enabled" not in st.session_state:
         st.session_state.code_interpreter_enabled = True  # Enabled by default
 
@@ -62,6 +78,12 @@ def init_session_state():
     if "needs_continuation" not in st.session_state:
         st.session_state.needs_continuation = False
     
+    if "pending_function_calls" not in st.session_state:
+        st.session_state.pending_function_calls = []
+    
+    if "parallel_tool_calls" not in st.session_state:
+        st.session_state.parallel_tool_calls = True  # Let the model request several calls at once
+    
     if "mcp_config" not in st.session_state:
         st.session_state.mcp_config = {
             "server_label": "",
@@ -77,12 +99,80 @@ def init_session_state():
         st.session_state.google_oauth_configured = False
 
 
+def reset_conversation_state():
+    """Start a new server-side conversation, so the next turn sends the full history"""
+    st.session_state.conversation_id = uuid.uuid4().hex
+    st.session_state.last_response_id = None
+    st.session_state.sent_item_count = 0
+    st.session_state.stream_buffers = {}
+
+
+def add_chat_message(message):
+    """Append a message to the chat and index it by item id"""
+    st.session_state.chat_messages.append(message)
+    if message.get("id"):
+        _get_chat_message_index()[message["id"]] = message
+
+
+def find_chat_message(item_id, message_type=None):
+    """Find the chat message for an item id in constant time (None if there is none)"""
+    if not item_id:
+        return None
+    message = _get_chat_message_index().get(item_id)
+    if message is None or (message_type and message.get("type") != message_type):
+        return None
+    return message
+
+
+def _get_chat_message_index():
+    messages = st.session_state.chat_messages
+    # Rebuilt whenever chat_messages is replaced (e.g. the conversation was reset)
+    if st.session_state.get("chat_message_index_owner") is not messages:
+        st.session_state.chat_message_index = {
+            message["id"]: message for message in messages if message.get("id")
+        }
+        st.session_state.chat_message_index_owner = messages
+    return st.session_state.chat_message_index
+
+
+def append_stream_text(target, key, delta):
+    """Buffer a streamed delta for target[key]; the field is only updated by flush_stream_text"""
+    _get_stream_buffer(target, key, lambda: TextBuffer(target.get(key) or "")).append(delta)
+
+
+def append_stream_json(target, key, delta):
+    """Feed a streamed JSON delta to the incremental parser behind target[key] and return the parser"""
+    parser = _get_stream_buffer(target, key, IncrementalJSONParser)
+    parser.feed(delta)
+    return parser
+
+
+def _get_stream_buffer(target, key, factory):
+    buffers = st.session_state.setdefault("stream_buffers", {})
+    entry = buffers.get((id(target), key))
+    if entry is None:
+        entry = buffers[(id(target), key)] = (target, key, factory())
+    return entry[2]
+
+
+def flush_stream_text(target=None):
+    """Write buffered deltas into their fields, for one target dict or for all of them"""
+    buffers = st.session_state.get("stream_buffers")
+    if not buffers:
+        return
+    for buffer_key in [k for k in buffers if target is None or k[0] == id(target)]:
+        buffer_target, key, text = buffers.pop(buffer_key)
+        buffer_target[key] = text.getvalue()
+
+
 def get_tools_state():
     """Get current tools state as dict"""
     return {
         "webSearchEnabled": st.session_state.web_search_enabled,
         "fileSearchEnabled": st.session_state.file_search_enabled,
         "functionsEnabled": st.session_state.functions_enabled,
+        "serverToolExecution": st.session_state.server_tool_execution,
+        "parallelToolCalls": st.session_state.parallel_tool_calls,
         "codeInterpreterEnabled": st.session_state.code_interpreter_enabled,
         "shellEnabled": st.session_state.shell_enabled,
         "applyPatchEnabled": st.session_state.apply_patch_enabled,